@@ -0,0 +1,89 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Dict, Iterable, List, Optional
+
+from api.base_api import BaseAPI
+from api.hh_api import HeadHunterAPI, SearchResult
+from api.rate_limiter import RateLimiter
+
+
+class AsyncHeadHunterAPI(BaseAPI):
+    """
+    Асинхронный вариант HeadHunterAPI для больших пачек запросов.
+    Запросы выполняются в собственном пуле потоков поверх общей keep-alive сессии,
+    размер пула задает глобальный лимит одновременных запросов.
+    """
+
+    def __init__(
+        self,
+        concurrency: int = 10,
+        max_pages: int = 20,
+        max_workers: int = 4,
+        rate_limiter: Optional[RateLimiter] = None,
+    ):
+        self.concurrency = concurrency
+        self.max_pages = max_pages
+        self.max_workers = max_workers
+        self.rate_limiter = rate_limiter
+        self.client = self._connect()
+        # Все запросы пачки идут через общий ограничитель клиента
+        self.rate_limiter = self.client.rate_limiter
+        self._executor = ThreadPoolExecutor(max_workers=concurrency)
+
+    def _connect(self) -> HeadHunterAPI:
+        # Каждый запрос может параллельно качать страницы, пул соединений рассчитываем на всех
+        return HeadHunterAPI(
+            max_pages=self.max_pages,
+            max_workers=self.max_workers,
+            pool_size=self.concurrency * self.max_workers,
+            rate_limiter=self.rate_limiter,
+        )
+
+    async def get_vacancies(
+        self, query: str, max_pages: Optional[int] = None, filters: Optional[Dict] = None
+    ) -> List[Dict]:
+        """
+        Получает вакансии по запросу, не блокируя цикл событий
+        :param query: поисковый запрос
+        :param max_pages: ограничение на количество страниц
+        :param filters: дополнительные параметры поиска, как у HeadHunterAPI
+        :return: список вакансий в том же формате, что и у HeadHunterAPI
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self._executor, partial(self.client.get_vacancies, query, max_pages, filters)
+        )
+
+    async def search(
+        self, query: str, max_pages: Optional[int] = None, filters: Optional[Dict] = None
+    ) -> SearchResult:
+        """
+        Получает вакансии вместе с итогами поиска, не блокируя цикл событий.
+        Итоги возвращаются каждому вызову отдельно, поэтому параллельные поиски не мешают друг другу.
+        :param query: поисковый запрос
+        :param max_pages: ограничение на количество страниц
+        :param filters: дополнительные параметры поиска, как у HeadHunterAPI
+        :return: результат поиска, как у HeadHunterAPI.search
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, partial(self.client.search, query, max_pages, filters))
+
+    async def gather_vacancies(self, queries: Iterable[str], max_pages: Optional[int] = None) -> List[List[Dict]]:
+        """
+        Выполняет пачку запросов параллельно (не больше concurrency одновременно)
+        :param queries: поисковые запросы
+        :param max_pages: ограничение на количество страниц для каждого запроса
+        :return: списки вакансий в порядке запросов
+        """
+        return list(await asyncio.gather(*(self.get_vacancies(query, max_pages) for query in queries)))
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=True)
+        self.client.close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        self.close()
@@ -1,4 +1,5 @@
 from abc import ABC, abstractmethod
+from typing import Awaitable, Dict, Optional, Union
 
 
 class BaseAPI(ABC):
@@ -7,5 +8,8 @@ class BaseAPI(ABC):
         pass
 
     @abstractmethod
-    def get_vacancies(self, query: str) -> list:
+    def get_vacancies(
+        self, query: str, max_pages: Optional[int] = None, filters: Optional[Dict] = None
+    ) -> Union[list, Awaitable[list]]:
+        # Синхронные клиенты возвращают список, асинхронные - корутину со списком
         pass
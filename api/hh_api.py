@@ -1,46 +1,313 @@
 import requests
-from typing import List, Dict
+from requests.adapters import HTTPAdapter
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Iterator, List, Dict, Optional
+import json
 import logging
+import time
+
+from api.base_api import BaseAPI
+from api.rate_limiter import RETRY_STATUSES, RateLimiter
+from api.response_cache import ResponseCache
+
+try:
+    # urllib3 распаковывает br, только если установлен brotli
+    import brotli  # type: ignore[import-not-found]  # noqa: F401
+    ACCEPT_ENCODING = "gzip, deflate, br"
+except ImportError:
+    ACCEPT_ENCODING = "gzip, deflate"
 
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 
-class HeadHunterAPI:
-    def __init__(self):
+@dataclass
+class SearchResult:
+    """
+    Итоги одного поиска: вакансии, сколько нашлось по запросу и какие страницы не загрузились.
+    Возвращается каждому вызову отдельно, поэтому параллельные поиски одного клиента не мешают друг другу.
+    """
+
+    items: List[Dict] = field(default_factory=list)
+    found: int = 0
+    failed_pages: List[int] = field(default_factory=list)
+    # Выдача обрезана лимитом страниц API
+    truncated: bool = False
+    # Выдача дочитана до конца без исключений
+    finished: bool = False
+
+    @property
+    def complete(self) -> bool:
+        """
+        :return: True, если получена вся выдача: без ошибок и без обрезки лимитом
+        """
+        return self.finished and not self.truncated and not self.failed_pages
+
+
+class HeadHunterAPI(BaseAPI):
+    def __init__(
+        self,
+        max_pages: int = 20,
+        max_workers: int = 4,
+        pool_size: int = 10,
+        rate_limiter: Optional[RateLimiter] = None,
+        cache: Optional[ResponseCache] = None,
+    ):
         self.base_url = "https://api.hh.ru/vacancies"  # Базовый URL API
         self.headers = {
-            "User-Agent": "Mozilla/5.0"  # Добавляем заголовок для корректной работы
+            "User-Agent": "Mozilla/5.0",  # Добавляем заголовок для корректной работы
+            "Accept-Encoding": ACCEPT_ENCODING,
+            "Connection": "keep-alive",
         }
+        self.per_page = 100
+        # API hh.ru отдает не больше 2000 вакансий (20 страниц по 100) на один запрос
+        self.max_pages = max_pages
+        self.max_workers = max_workers
+        # Пул соединений должен вмещать все параллельные загрузки страниц
+        self.pool_size = max(pool_size, max_workers)
+        # Ограничитель можно передать снаружи, чтобы несколько клиентов делили одну квоту
+        self.rate_limiter = rate_limiter or RateLimiter()
+        self.cache = cache
+        self.session = self._connect()
+
+    def _connect(self) -> requests.Session:
+        """
+        Создает долгоживущую сессию с пулом keep-alive соединений
+        :return: сессия, через которую идут все запросы клиента
+        """
+        session = requests.Session()
+        session.headers.update(self.headers)
+        adapter = HTTPAdapter(pool_connections=self.pool_size, pool_maxsize=self.pool_size)
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        return session
+
+    def close(self) -> None:
+        self.session.close()
+        if self.cache is not None:
+            self.cache.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
 
-    def get_vacancies(self, query: str) -> List[Dict]:
+    def get_vacancies(
+        self, query: str, max_pages: Optional[int] = None, filters: Optional[Dict] = None
+    ) -> List[Dict]:
+        """
+        Получает вакансии по запросу со всех страниц выдачи
+        :param query: поисковый запрос
+        :param max_pages: ограничение на количество страниц (по умолчанию self.max_pages)
+        :param filters: дополнительные параметры поиска API (date_from, order_by и т.п.)
+        :return: список вакансий в порядке страниц
+        """
+        return self.search(query, max_pages, filters).items
+
+    def search(self, query: str, max_pages: Optional[int] = None, filters: Optional[Dict] = None) -> SearchResult:
+        """
+        Получает вакансии по запросу вместе с итогами поиска
+        :param query: поисковый запрос
+        :param max_pages: ограничение на количество страниц (по умолчанию self.max_pages)
+        :param filters: дополнительные параметры поиска API (date_from, date_to, order_by и т.п.)
+        :return: результат поиска; complete показывает, получена ли выдача целиком
+        """
+        result = SearchResult()
         try:
-            response = requests.get(
-                self.base_url,
-                params={
-                    "text": query,
-                    "per_page": 100,
-                    "area": 1,  # Москва и МО (можно убрать, если не нужно)
-                },
-                headers=self.headers,
+            result.items = list(self.iter_vacancies(query, max_pages, filters, result))
+
+        except Exception as e:
+            logger.error(f"Произошла ошибка: {e}")
+            result.items = []
+        return result
+
+    def iter_vacancies(
+        self,
+        query: str,
+        max_pages: Optional[int] = None,
+        filters: Optional[Dict] = None,
+        result: Optional[SearchResult] = None,
+    ) -> Iterator[Dict]:
+        """
+        Выдает вакансии по одной, страница за страницей, по мере их загрузки.
+        Пока вызывающий код обрабатывает страницу, следующие уже загружаются,
+        при этом в памяти держится не больше max_workers страниц.
+        :param query: поисковый запрос
+        :param max_pages: ограничение на количество страниц (по умолчанию self.max_pages)
+        :param filters: дополнительные параметры поиска API
+        :param result: объект, в который записываются итоги поиска (найдено, ошибки, обрезка)
+        :return: генератор вакансий в порядке страниц
+        """
+        search = SearchResult() if result is None else result
+
+        first_page = self._get_page(query, 0, filters)
+        if first_page is None:
+            search.failed_pages.append(0)
+            search.finished = True
+            return
+
+        # Сколько страниц реально есть в выдаче и сколько мы готовы забрать
+        limit = self.max_pages if max_pages is None else max_pages
+        pages_found = int(first_page.get("pages", 1) or 1)
+        total_pages = min(pages_found, limit)
+        search.found = int(first_page.get("found") or 0)
+        # Выдача обрезана, если страниц больше лимита или найдено больше, чем помещается на страницы
+        search.truncated = pages_found > total_pages or search.found > total_pages * self.per_page
+        if total_pages <= 1:
+            yield from first_page["items"]
+            search.finished = True
+            return
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            # Окно загрузок: страницы запрашиваются заранее, но отдаются строго по порядку
+            pages = range(1, total_pages)
+            window = deque(
+                (page, executor.submit(self._get_page, query, page, filters)) for page in pages[:self.max_workers]
             )
+            next_pages = iter(pages[self.max_workers:])
+
+            yield from first_page["items"]
+            del first_page
+
+            while window:
+                loaded, future = window.popleft()
+                page_data = future.result()
+                page = next(next_pages, None)
+                if page is not None:
+                    window.append((page, executor.submit(self._get_page, query, page, filters)))
+                if page_data is not None:
+                    yield from page_data["items"]
+                else:
+                    search.failed_pages.append(loaded)
 
-            response.raise_for_status()  # Проверяем статус ответа
+        search.finished = True
 
-            data = response.json()
+    def _get_page(self, query: str, page: int, filters: Optional[Dict] = None) -> Optional[Dict]:
+        """
+        Загружает одну страницу выдачи
+        :param query: поисковый запрос
+        :param page: номер страницы (с нуля)
+        :param filters: дополнительные параметры поиска
+        :return: ответ API или None при ошибке
+        """
+        params = {
+            "text": query,
+            "per_page": self.per_page,
+            "area": 1,  # Москва и МО (можно убрать, если не нужно)
+        }
+        if filters:
+            params.update(filters)
+        if page:
+            params["page"] = page
+
+        try:
+            data = self._fetch_json(self.base_url, params)
 
             # Проверяем структуру ответа
             if isinstance(data, dict) and "items" in data:
-                return data["items"]
+                return data
 
             logger.error("Неверный формат ответа от API")
-            return []
+            return None
 
         except requests.RequestException as e:
-            logger.error(f"Ошибка при запросе к API: {e}")
-            return []
+            logger.error(f"Ошибка при запросе к API (страница {page}): {e}")
+            return None
 
-        except Exception as e:
-            logger.error(f"Произошла ошибка: {e}")
-            return []
+    def get_vacancy(self, vacancy_id: str) -> Optional[Dict]:
+        """
+        Получает полное описание вакансии (/vacancies/{id})
+        :param vacancy_id: идентификатор вакансии
+        :return: данные вакансии или None
+        """
+        try:
+            data = self._fetch_json(f"{self.base_url}/{vacancy_id}", {})
+
+            if isinstance(data, dict) and "id" in data:
+                return data
+
+            logger.error("Неверный формат ответа от API")
+            return None
+
+        except requests.RequestException as e:
+            logger.error(f"Ошибка при запросе вакансии {vacancy_id}: {e}")
+            return None
+
+    def _fetch_json(self, url: str, params: Dict) -> Any:
+        """
+        Получает разобранный JSON-ответ, используя кэш, если он подключен.
+        Свежий ответ берется из кэша без запроса, устаревший перепроверяется по ETag/Last-Modified.
+        :param url: адрес запроса
+        :param params: параметры запроса
+        :return: разобранный ответ
+        """
+        cache = self.cache
+        entry = cache.get(url, params) if cache is not None else None
+        if cache is not None and entry is not None and cache.is_fresh(entry):
+            return json.loads(entry.body)
+
+        headers = {}
+        if entry is not None:
+            if entry.etag:
+                headers["If-None-Match"] = entry.etag
+            if entry.last_modified:
+                headers["If-Modified-Since"] = entry.last_modified
+
+        response = self._request(url, params, headers)
+        if cache is not None and entry is not None and response.status_code == 304:
+            cache.touch(url, params)
+            return json.loads(entry.body)
+
+        response.raise_for_status()  # Проверяем статус ответа
+
+        data = response.json()
+        if cache is not None:
+            cache.put(
+                url,
+                params,
+                response.content,
+                etag=response.headers.get("ETag"),
+                last_modified=response.headers.get("Last-Modified"),
+            )
+        return data
+
+    def _request(self, url: str, params: Dict, headers: Optional[Dict] = None) -> requests.Response:
+        """
+        Выполняет запрос в рамках квоты, повторяя его при 429/5xx и обрывах соединения
+        :param url: адрес запроса
+        :param params: параметры запроса
+        :param headers: дополнительные заголовки запроса
+        :return: последний полученный ответ
+        """
+        kwargs: Dict[str, Any] = {"params": params}
+        if headers:
+            kwargs["headers"] = headers
+
+        attempt = 0
+        while True:
+            self.rate_limiter.acquire()
+            try:
+                response = self.session.get(url, **kwargs)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                if attempt >= self.rate_limiter.max_retries:
+                    raise
+                delay = self.rate_limiter.backoff(attempt)
+                if delay is None:
+                    # Без Retry-After backoff всегда возвращает число, проверка только сужает тип
+                    raise
+                logger.warning(f"Ошибка соединения, повтор через {delay:.1f} с: {e}")
+            else:
+                if response.status_code not in RETRY_STATUSES or attempt >= self.rate_limiter.max_retries:
+                    return response
+                delay = self.rate_limiter.backoff(attempt, response.headers.get("Retry-After"))
+                if delay is None:
+                    logger.warning(f"API вернул {response.status_code} и просит ждать слишком долго, запрос прерван")
+                    return response
+                logger.warning(f"API вернул {response.status_code}, повтор через {delay:.1f} с")
+
+            time.sleep(delay)
+            attempt += 1
@@ -0,0 +1,119 @@
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from typing import Dict, Optional
+
+# Статусы, при которых запрос имеет смысл повторить
+RETRY_STATUSES = {429, 502, 503, 504}
+
+
+class RateLimiter:
+    """
+    Token bucket с экспоненциальной задержкой для повторов.
+    Один экземпляр можно разделять между потоками и клиентами, чтобы
+    все запросы страниц и поисковых запросов укладывались в общую квоту.
+    """
+
+    def __init__(
+        self,
+        rate: float = 10.0,
+        burst: int = 10,
+        max_retries: int = 5,
+        backoff_base: float = 0.5,
+        backoff_max: float = 30.0,
+        max_retry_after: float = 300.0,
+    ):
+        """
+        :param rate: сколько запросов в секунду разрешено в среднем
+        :param burst: сколько запросов можно сделать подряд без ожидания
+        :param max_retries: сколько раз повторять запрос при 429/5xx
+        :param backoff_base: начальная задержка перед повтором, сек
+        :param backoff_max: максимальная задержка перед повтором, сек
+        :param max_retry_after: сколько секунд готовы ждать по Retry-After; если сервер просит
+                                ждать дольше, повтор не выполняется
+        """
+        self.rate = rate
+        self.burst = burst
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.max_retry_after = max_retry_after
+
+        self._lock = threading.Lock()
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        # После 429 с Retry-After притормаживаем всех, а не только получивший ответ поток
+        self._blocked_until = 0.0
+
+        self.requests = 0
+        self.throttled = 0
+        self.retried = 0
+
+    def _reserve(self) -> float:
+        """
+        Резервирует токен и возвращает, сколько нужно подождать до его появления
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            # Токен берем в долг: ожидающие потоки выстраиваются в очередь без повторных проверок
+            self._tokens -= 1
+            self.requests += 1
+
+            wait = max(0.0, -self._tokens / self.rate, self._blocked_until - now)
+            if wait > 0:
+                self.throttled += 1
+            return wait
+
+    def acquire(self) -> None:
+        """
+        Блокирует поток, пока запрос не уложится в квоту
+        """
+        wait = self._reserve()
+        if wait > 0:
+            time.sleep(wait)
+
+    def backoff(self, attempt: int, retry_after: Optional[str] = None) -> Optional[float]:
+        """
+        Считает задержку перед повтором и приостанавливает выдачу токенов на это время.
+        Retry-After соблюдается точно: повтор раньше срока сервер снова отклонит
+        :param attempt: номер попытки (с нуля)
+        :param retry_after: значение заголовка Retry-After, если сервер его прислал
+        :return: задержка в секундах или None, если сервер просит ждать дольше max_retry_after
+        """
+        delay = self._parse_retry_after(retry_after)
+        if delay is not None and delay > self.max_retry_after:
+            return None
+        if delay is None:
+            # Экспоненциальная задержка с джиттером, чтобы потоки не повторяли запросы синхронно
+            delay = min(self.backoff_max, self.backoff_base * 2 ** attempt)
+            delay = random.uniform(delay / 2, delay)
+
+        with self._lock:
+            self.retried += 1
+            self._blocked_until = max(self._blocked_until, time.monotonic() + delay)
+        return delay
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "requests": self.requests,
+                "throttled": self.throttled,
+                "retried": self.retried,
+            }
+
+    def _parse_retry_after(self, retry_after: Optional[str]) -> Optional[float]:
+        # Retry-After бывает либо числом секунд, либо HTTP-датой
+        if not retry_after:
+            return None
+        try:
+            return max(0.0, float(retry_after))
+        except ValueError:
+            pass
+        try:
+            retry_at = parsedate_to_datetime(retry_after)
+            return max(0.0, retry_at.timestamp() - time.time())
+        except (TypeError, ValueError):
+            return None
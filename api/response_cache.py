@@ -0,0 +1,216 @@
+import atexit
+import hashlib
+import json
+import os
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, Optional
+
+
+@dataclass
+class CacheEntry:
+    body: bytes
+    etag: Optional[str]
+    last_modified: Optional[str]
+    stored_at: float
+
+
+class ResponseCache:
+    """
+    Дисковый кэш ответов API.
+    Тела ответов хранятся сжатыми в отдельных файлах, метаданные (ETag, Last-Modified,
+    время сохранения и последнего обращения) - в общем index.json.
+    Индекс переписывается не на каждое изменение, а пачками: после save_every изменений,
+    раз в save_interval секунд, при flush()/close() и при завершении процесса.
+    Индекс в памяти упорядочен по давности обращения, а общий размер ответов считается
+    по ходу изменений, поэтому запись в кэш не перебирает весь индекс.
+    """
+
+    def __init__(
+        self,
+        directory: str = ".cache/hh",
+        ttl: float = 3600,
+        max_bytes: int = 50 * 1024 * 1024,
+        save_every: int = 100,
+        save_interval: float = 10.0,
+    ):
+        """
+        :param directory: каталог кэша
+        :param ttl: сколько секунд ответ считается свежим без перепроверки
+        :param max_bytes: предельный размер сжатых ответов, сверх него вытесняются самые старые
+        :param save_every: после скольких изменений индекс сохраняется на диск
+        :param save_interval: сколько секунд изменения индекса могут не сохраняться
+        """
+        self._directory = directory
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.save_every = save_every
+        self.save_interval = save_interval
+        self._index_file = os.path.join(directory, "index.json")
+        self._lock = threading.Lock()
+        self._dirty = 0
+        self._saved_at = time.monotonic()
+        # Обработчик завершения процесса регистрируется, только пока есть несохраненные изменения:
+        # он держит ссылку на кэш, и без этого кэш не освобождался бы до выхода из программы
+        self._exit_hook = False
+
+        os.makedirs(directory, exist_ok=True)
+        # Ключ -> метаданные, от давно не использованных записей к недавним
+        self._index = self._load_index()
+        self._total = sum(meta["size"] for meta in self._index.values())
+
+    @staticmethod
+    def make_key(url: str, params: Dict) -> str:
+        # Порядок и тип параметров не должны влиять на ключ: {"page": 1} и {"page": "1"} - один запрос
+        normalized = sorted((str(name), str(value)) for name, value in params.items())
+        raw = json.dumps([url, normalized], ensure_ascii=False)
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def get(self, url: str, params: Dict) -> Optional[CacheEntry]:
+        """
+        Возвращает сохраненный ответ (в том числе устаревший - его можно перепроверить)
+        :return: запись кэша или None
+        """
+        key = self.make_key(url, params)
+        with self._lock:
+            meta = self._index.get(key)
+            if meta is None:
+                return None
+
+            # Устаревшую запись без валидаторов перепроверить нельзя, она только занимает место
+            if not self._is_fresh(meta) and not (meta["etag"] or meta["last_modified"]):
+                self._remove(key)
+                self._changed()
+                return None
+
+            try:
+                with open(self._body_path(key), "rb") as file:
+                    body = zlib.decompress(file.read())
+            except (OSError, zlib.error):
+                self._remove(key)
+                self._changed()
+                return None
+
+            # Время обращения тоже сохраняется: по нему вытесняются записи и в следующих запусках
+            meta["accessed"] = time.time()
+            self._index.move_to_end(key)
+            self._changed()
+            return CacheEntry(body, meta["etag"], meta["last_modified"], meta["stored_at"])
+
+    def is_fresh(self, entry: CacheEntry) -> bool:
+        return time.time() - entry.stored_at < self.ttl
+
+    def put(
+        self,
+        url: str,
+        params: Dict,
+        body: bytes,
+        etag: Optional[str] = None,
+        last_modified: Optional[str] = None,
+    ) -> None:
+        """
+        Сохраняет ответ и вытесняет давно не использованные записи, если кэш переполнен
+        """
+        key = self.make_key(url, params)
+        compressed = zlib.compress(body)
+        now = time.time()
+        with self._lock:
+            with open(self._body_path(key), "wb") as file:
+                file.write(compressed)
+            old = self._index.pop(key, None)
+            if old is not None:
+                self._total -= old["size"]
+            self._total += len(compressed)
+            self._index[key] = {
+                "etag": etag,
+                "last_modified": last_modified,
+                "stored_at": now,
+                "accessed": now,
+                "size": len(compressed),
+            }
+            self._evict()
+            self._changed()
+
+    def touch(self, url: str, params: Dict) -> None:
+        """
+        Продлевает свежесть записи после ответа 304 Not Modified
+        """
+        key = self.make_key(url, params)
+        with self._lock:
+            meta = self._index.get(key)
+            if meta is not None:
+                meta["stored_at"] = meta["accessed"] = time.time()
+                self._index.move_to_end(key)
+                self._changed()
+
+    def clear(self) -> None:
+        with self._lock:
+            for key in list(self._index):
+                self._remove(key)
+            self._save_index()
+
+    def flush(self) -> None:
+        """
+        Сохраняет несохраненные изменения индекса
+        """
+        with self._lock:
+            # Каталог могли удалить раньше, чем сработал обработчик завершения процесса
+            if self._dirty and os.path.isdir(self._directory):
+                self._save_index()
+
+    def close(self) -> None:
+        self.flush()
+
+    def _changed(self) -> None:
+        self._dirty += 1
+        if self._dirty >= self.save_every or time.monotonic() - self._saved_at >= self.save_interval:
+            self._save_index()
+        elif not self._exit_hook:
+            atexit.register(self.flush)
+            self._exit_hook = True
+
+    def _is_fresh(self, meta: Dict) -> bool:
+        return time.time() - meta["stored_at"] < self.ttl
+
+    def _evict(self) -> None:
+        # Вытесняем записи, к которым дольше всего не обращались, пока кэш не уложится в лимит
+        while self._total > self.max_bytes and self._index:
+            self._remove(next(iter(self._index)))
+
+    def _remove(self, key: str) -> None:
+        meta = self._index.pop(key, None)
+        if meta is not None:
+            self._total -= meta["size"]
+        try:
+            os.remove(self._body_path(key))
+        except FileNotFoundError:
+            pass
+
+    def _body_path(self, key: str) -> str:
+        return os.path.join(self._directory, f"{key}.zlib")
+
+    def _load_index(self) -> "OrderedDict[str, Dict]":
+        try:
+            with open(self._index_file, "r", encoding="utf-8") as file:
+                index = json.load(file)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return OrderedDict()
+        if not isinstance(index, dict):
+            return OrderedDict()
+        # Порядок давности обращения восстанавливается одной сортировкой при загрузке
+        return OrderedDict(sorted(index.items(), key=lambda item: item[1]["accessed"]))
+
+    def _save_index(self) -> None:
+        tmp_file = f"{self._index_file}.tmp"
+        with open(tmp_file, "w", encoding="utf-8") as file:
+            # json.dumps работает в C-кодировщике, json.dump в файл - заметно медленнее
+            file.write(json.dumps(self._index))
+        os.replace(tmp_file, self._index_file)
+        self._dirty = 0
+        self._saved_at = time.monotonic()
+        if self._exit_hook:
+            atexit.unregister(self.flush)
+            self._exit_hook = False
@@ -0,0 +1,38 @@
+"""
+Сравнение скорости восстановления вакансий из записей хранилища:
+Vacancy.from_dict (через _format_salary) и Vacancy.from_records (без повторной проверки).
+
+Запуск: python -m benchmarks.bench_vacancy_load [количество записей]
+"""
+import sys
+import timeit
+
+from src.vacancy import Vacancy
+
+
+def make_records(count: int) -> list:
+    salaries = [
+        {"from": 100000, "to": 150000, "currency": "RUR"},
+        {"from": 90000, "currency": "RUR"},
+        {"to": 3000, "currency": "USD", "gross": True},
+        None,
+    ]
+    return [
+        Vacancy(
+            f"Вакансия {i}", f"https://hh.ru/vacancy/{i}", salaries[i % len(salaries)], "Описание", area="Москва"
+        ).to_record()
+        for i in range(count)
+    ]
+
+
+def main(count: int = 100_000, repeat: int = 3) -> None:
+    records = make_records(count)
+    from_dict = min(timeit.repeat(lambda: [Vacancy.from_dict(record) for record in records], number=1, repeat=repeat))
+    from_records = min(timeit.repeat(lambda: Vacancy.from_records(records), number=1, repeat=repeat))
+    print(f"Записей: {count}")
+    print(f"Vacancy.from_dict:    {from_dict:.3f} с")
+    print(f"Vacancy.from_records: {from_records:.3f} с ({from_dict / from_records:.1f}x быстрее)")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100_000)
@@ -1,7 +1,10 @@
 from api.hh_api import HeadHunterAPI
+from api.response_cache import ResponseCache
 from src.vacancy import Vacancy
 from src.json_storage import JSONStorage
-from src.helpers import print_vacancies, sort_vacancies_by_salary
+from src.buffered_storage import BufferedStorage
+from src.helpers import print_vacancies
+from src.analytics import SalaryAnalytics, print_salary_stats
 import sys
 
 
@@ -9,93 +12,88 @@ def main():
     print("Приветствуем в системе поиска вакансий!")
 
     # Инициализация компонентов
-    api = HeadHunterAPI()
-    storage = JSONStorage()
-
-    while True:
-        print("\nВыберите действие:")
-        print("1. Поиск новых вакансий")
-        print("2. Показать топ вакансий по зарплате")
-        print("3. Поиск по ключевым словам")
-        print("4. Выход")
-
-        choice = input("Ваш выбор: ")
-
-        if choice == '1':
-            query = input("Введите поисковый запрос: ")
-            try:
-                vacancies_data = api.get_vacancies(query)
-
-                # Проверяем, что получили список
-                if not isinstance(vacancies_data, list):
-                    print("Ошибка получения данных от API")
-                    continue
-
-                # Фильтруем только валидные вакансии
-                vacancies = [
-                    Vacancy(
-                        name=data.get('name', 'Не указано'),
-                        url=data.get('alternate_url', 'Не указано'),
-                        salary=data.get('salary', 'Зарплата не указана'),  # Передаем словарь зарплаты
-                        description=data.get('snippet', {}).get('responsibility', 'Описание отсутствует')
+    api = HeadHunterAPI(cache=ResponseCache())
+    # Изменения копятся в буфере и записываются в файл пачками
+    storage = BufferedStorage(JSONStorage())
+
+    # Буфер сбрасывается в файл при любом выходе из цикла, в том числе по Ctrl+C и sys.exit
+    try:
+        while True:
+            print("\nВыберите действие:")
+            print("1. Поиск новых вакансий")
+            print("2. Показать топ вакансий по зарплате")
+            print("3. Поиск по ключевым словам")
+            print("5. Статистика по зарплатам")
+            print("4. Выход")
+
+            choice = input("Ваш выбор: ")
+
+            if choice == '1':
+                query = input("Введите поисковый запрос: ")
+                try:
+                    # Хранилище забирает вакансии прямо из потока страниц и сохраняет их одной записью
+                    added = storage.add_vacancies(
+                        Vacancy.from_hh_item(data).to_record()
+                        for data in api.iter_vacancies(query)
+                        if isinstance(data, dict)
                     )
-                    for data in vacancies_data if isinstance(data, dict)
-                ]
-
-                for vacancy in vacancies:
-                    storage.add_vacancy(vacancy.to_dict())
-                print(f"Найдено и сохранено {len(vacancies)} вакансий")
-
-            except Exception as e:
-                print(f"Ошибка при получении данных: {e}")
-
-        elif choice == '2':
-            try:
-                top_n = int(input("Введите количество вакансий для отображения в топе: "))
-                vacancies = storage.get_vacancies()
-
-                # Проверяем, что данные корректны
-                if not isinstance(vacancies, list):
-                    print("Ошибка: некорректные данные в хранилище")
-                    continue
-
-                # Преобразуем словари в объекты Vacancy
-                vacancies = [Vacancy(**v) for v in vacancies if isinstance(v, dict)]
-
-                # Сортируем только если есть вакансии
-                if vacancies:
-                    sorted_vacancies = sort_vacancies_by_salary(vacancies)
-                    top_vacancies = sorted_vacancies[:top_n]
-                    print(f"\nТоп-{top_n} вакансий по зарплате:")
-                    print_vacancies(top_vacancies)
-
-                else:
-                    print("Вакансии не найдены")
-
-            except ValueError:
-                print("Ошибка: введите число")
-
-            except Exception as e:
-                print(f"Произошла ошибка: {e}")
-
-        elif choice == '3':
-            try:
-                keyword = input("Введите ключевое слово для поиска: ")
-                vacancies = storage.filter_vacancies(keyword=keyword)
-                if vacancies:
-                    print(f"\nНайдено {len(vacancies)} вакансий по запросу '{keyword}':")
-                    print_vacancies([Vacancy(**v) for v in vacancies])
-                else:
-                    print("Вакансии не найдены")
-            except Exception as e:
-                print(f"Произошла ошибка: {e}")
-
-        elif choice == '4':
-            print("До свидания!")
-            sys.exit(0)
-
-        else:
-            print("Неверный выбор. Попробуйте снова.")
+                    print(f"Сохранено {added} новых вакансий")
+
+                except Exception as e:
+                    print(f"Ошибка при получении данных: {e}")
+
+            elif choice == '2':
+                try:
+                    top_n = int(input("Введите количество вакансий для отображения в топе: "))
+                    # Хранилище отдает топ по индексу зарплат, без сортировки всех вакансий
+                    top_vacancies = Vacancy.from_records(storage.top_by_salary(top_n))
+
+                    if top_vacancies:
+                        print(f"\nТоп-{top_n} вакансий по зарплате:")
+                        print_vacancies(top_vacancies)
+
+                    else:
+                        print("Вакансии не найдены")
+
+                except ValueError:
+                    print("Ошибка: введите число")
+
+                except Exception as e:
+                    print(f"Произошла ошибка: {e}")
+
+            elif choice == '3':
+                try:
+                    keyword = input("Введите ключевые слова для поиска (OR - любое из слов): ")
+                    vacancies = storage.filter_vacancies(keyword=keyword)
+                    if vacancies:
+                        print(f"\nНайдено {len(vacancies)} вакансий по запросу '{keyword}':")
+                        print_vacancies(Vacancy.from_records(vacancies))
+                    else:
+                        print("Вакансии не найдены")
+                except Exception as e:
+                    print(f"Произошла ошибка: {e}")
+
+            elif choice == '4':
+                print("До свидания!")
+                sys.exit(0)
+
+            elif choice == '5':
+                try:
+                    analytics = SalaryAnalytics.from_records(storage.iter_vacancies())
+                    if analytics.with_salary:
+                        print_salary_stats(analytics)
+                    else:
+                        print("Нет вакансий с указанной зарплатой")
+                except ImportError as e:
+                    print(e)
+                except Exception as e:
+                    print(f"Произошла ошибка: {e}")
+
+            else:
+                print("Неверный выбор. Попробуйте снова.")
+    finally:
+        storage.close()
+        api.close()
 
 
 if __name__ == "__main__":
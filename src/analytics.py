@@ -0,0 +1,126 @@
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from src.vacancy_table import VacancyTable
+
+try:
+    import numpy as np
+except ImportError:  # numpy - необязательная зависимость, нужна только для аналитики
+    np = None  # type: ignore[assignment]
+
+DEFAULT_PERCENTILES = (10, 25, 50, 75, 90)
+
+
+def _require_numpy() -> None:
+    if np is None:
+        raise ImportError("Для статистики по зарплатам нужен numpy: pip install numpy")
+
+
+class SalaryAnalytics:
+    """
+    Статистика по зарплатам всего хранилища. Записи один раз раскладываются по колонкам
+    VacancyTable, колонки оборачиваются массивами numpy без копирования, и дальше
+    перцентили, медианы по группам и гистограммы считаются векторно, без циклов по вакансиям.
+    Зарплата не указана - NaN.
+    """
+
+    def __init__(self, table: VacancyTable):
+        _require_numpy()
+        self.salaries = np.frombuffer(table.salary_column("mid"), dtype=np.float64)
+        codes, self.currencies = table.category_column("currency")
+        self.currency_codes = np.frombuffer(codes, dtype=np.dtype(f"i{codes.itemsize}"))
+        codes, self.areas = table.category_column("area")
+        self.area_codes = np.frombuffer(codes, dtype=np.dtype(f"i{codes.itemsize}"))
+
+    @classmethod
+    def from_records(cls, records: Iterable[Dict]) -> "SalaryAnalytics":
+        """
+        :param records: записи хранилища (например, storage.iter_vacancies())
+        """
+        _require_numpy()
+        # Для статистики нужны только зарплаты, валюта и регион: текстовые колонки не строим
+        return cls(VacancyTable.from_records(records, text_columns=False))
+
+    def __len__(self) -> int:
+        return len(self.salaries)
+
+    @property
+    def with_salary(self) -> int:
+        return int(np.count_nonzero(~np.isnan(self.salaries)))
+
+    def percentiles(
+        self, percentiles: Sequence[float] = DEFAULT_PERCENTILES, currency: Optional[str] = None
+    ) -> Dict[float, float]:
+        """
+        Перцентили зарплат
+        :param percentiles: уровни в процентах
+        :param currency: учитывать только вакансии в этой валюте
+        :return: уровень -> зарплата (пустой словарь, если зарплат нет)
+        """
+        values = self._salaries(currency)
+        if not len(values):
+            return {}
+        return dict(zip(percentiles, np.percentile(values, percentiles).tolist()))
+
+    def median_by(self, column: str = "currency", currency: Optional[str] = None) -> Dict[Optional[str], float]:
+        """
+        Медиана зарплаты по группам за один проход: значения сортируются по (группа, зарплата),
+        и медианы всех групп берутся по границам групп в отсортированном массиве
+        :param column: "currency" или "area"
+        :param currency: учитывать только вакансии в этой валюте (для сравнения регионов)
+        :return: значение группы -> медиана
+        """
+        if column == "currency":
+            codes, values = self.currency_codes, self.currencies
+        else:
+            codes, values = self.area_codes, self.areas
+        mask = self._mask(currency)
+        salaries, codes = self.salaries[mask], codes[mask]
+        if not len(salaries):
+            return {}
+
+        order = np.lexsort((salaries, codes))
+        salaries, codes = salaries[order], codes[order]
+        starts = np.flatnonzero(np.r_[True, codes[1:] != codes[:-1]])
+        counts = np.diff(np.r_[starts, len(codes)])
+        medians = (salaries[starts + (counts - 1) // 2] + salaries[starts + counts // 2]) / 2
+        return {values[code]: median for code, median in zip(codes[starts].tolist(), medians.tolist())}
+
+    def histogram(self, bins: int = 10, currency: Optional[str] = None) -> Tuple[List[int], List[float]]:
+        """
+        Гистограмма зарплат
+        :return: количество вакансий в каждом интервале и границы интервалов
+        """
+        counts, edges = np.histogram(self._salaries(currency), bins=bins)
+        return counts.tolist(), edges.tolist()
+
+    def _mask(self, currency: Optional[str] = None):
+        mask = ~np.isnan(self.salaries)
+        if currency is not None:
+            code = self.currencies.index(currency) if currency in self.currencies else -1
+            mask &= self.currency_codes == code
+        return mask
+
+    def _salaries(self, currency: Optional[str] = None):
+        return self.salaries[self._mask(currency)]
+
+
+def _format_number(value: float) -> str:
+    return f"{value:,.0f}".replace(",", " ")
+
+
+def print_salary_stats(analytics: SalaryAnalytics, bins: int = 5) -> None:
+    print(f"Всего вакансий: {len(analytics)}, с указанной зарплатой: {analytics.with_salary}")
+    # Зарплаты в разных валютах не сравнимы, поэтому статистика считается по каждой валюте отдельно
+    for currency, median in analytics.median_by("currency").items():
+        print(f"\nВалюта {currency}, медиана: {_format_number(median)}")
+        levels = analytics.percentiles(currency=currency)
+        print("Перцентили: " + ", ".join(f"p{level} {_format_number(value)}" for level, value in levels.items()))
+        print("Медиана по регионам:")
+        for area, area_median in analytics.median_by("area", currency=currency).items():
+            print(f"  {area or 'Не указан'}: {_format_number(area_median)}")
+        print("Распределение:")
+        counts, edges = analytics.histogram(bins, currency=currency)
+        widest = max(counts)
+        for count, low, high in zip(counts, edges, edges[1:]):
+            bar = "#" * round(30 * count / widest)
+            print(f"  {_format_number(low)} - {_format_number(high)}: {bar} {count}")
@@ -1,4 +1,7 @@
 from abc import ABC, abstractmethod
+from typing import Iterable, Iterator, List, Optional, Set
+
+from src.helpers import filter_records, top_vacancies_by_salary
 
 
 class BaseStorage(ABC):
@@ -6,10 +9,99 @@ class BaseStorage(ABC):
     def add_vacancy(self, vacancy: dict):
         pass
 
+    def add_vacancies(self, vacancies: Iterable[dict]) -> int:
+        """
+        Добавляет пачку вакансий. Хранилища переопределяют метод, чтобы сохранять пачку
+        за одну операцию записи; по умолчанию вакансии добавляются по одной.
+        :param vacancies: вакансии (можно передать генератор)
+        :return: количество обработанных вакансий
+        """
+        count = 0
+        for vacancy in vacancies:
+            self.add_vacancy(vacancy)
+            count += 1
+        return count
+
+    def upsert_vacancies(self, vacancies: Iterable[dict]) -> int:
+        """
+        Добавляет новые вакансии и обновляет существующие (по URL). Хранилища переопределяют
+        метод, чтобы сохранять пачку за одну операцию; по умолчанию измененные вакансии
+        удаляются и добавляются заново.
+        :param vacancies: вакансии для сохранения
+        :return: количество добавленных или измененных вакансий
+        """
+        stored = {vacancy["url"]: vacancy for vacancy in self.iter_vacancies()}
+        changed = {}
+        for vacancy in vacancies:
+            if stored.get(vacancy["url"]) != vacancy:
+                changed[vacancy["url"]] = vacancy
+        if not changed:
+            return 0
+        self.delete_vacancies([url for url in changed if url in stored])
+        self.add_vacancies(list(changed.values()))
+        return len(changed)
+
     @abstractmethod
     def get_vacancies(self) -> list:
         pass
 
+    def iter_vacancies(self) -> Iterator[dict]:
+        """
+        Выдает вакансии по одной. Хранилища, умеющие читать данные потоково, переопределяют метод.
+        """
+        yield from self.get_vacancies()
+
+    def filter_vacancies(
+        self,
+        keyword: Optional[str] = None,
+        min_salary: Optional[int] = None,
+        max_salary: Optional[int] = None,
+    ) -> List[dict]:
+        """
+        Фильтрует вакансии по заданным параметрам, читая хранилище потоком
+        :param keyword: слова для поиска в названии и описании
+        :param min_salary: минимальная зарплата
+        :param max_salary: максимальная зарплата
+        :return: отфильтрованный список вакансий
+        """
+        return list(filter_records(self.iter_vacancies(), keyword, min_salary, max_salary))
+
+    def top_by_salary(self, n: int) -> List[dict]:
+        """
+        Возвращает n вакансий с самой высокой зарплатой (вакансии без зарплаты - в конце).
+        Хранилища с индексом по зарплате переопределяют метод.
+        :param n: количество вакансий
+        :return: вакансии по убыванию зарплаты
+        """
+        return top_vacancies_by_salary(self.iter_vacancies(), n)
+
+    def get_vacancy(self, url: str) -> Optional[dict]:
+        """
+        Ищет вакансию по URL. Хранилища с индексом по URL переопределяют метод,
+        по умолчанию хранилище просматривается целиком.
+        :param url: ссылка на вакансию
+        :return: запись вакансии или None
+        """
+        return next((vacancy for vacancy in self.iter_vacancies() if vacancy.get("url") == url), None)
+
+    def existing_urls(self, urls: Iterable[str]) -> Set[str]:
+        """
+        Проверяет, какие из URL уже есть в хранилище. Хранилища переопределяют метод,
+        чтобы проверять пачку за одно обращение; по умолчанию URL ищутся по одному.
+        :param urls: ссылки на вакансии
+        :return: ссылки, для которых в хранилище есть вакансия
+        """
+        return {url for url in urls if self.get_vacancy(url) is not None}
+
     @abstractmethod
-    def delete_vacancy(self, vacancy_id: int):
+    def delete_vacancy(self, url: str):
         pass
+
+    def delete_vacancies(self, urls: Iterable[str]) -> int:
+        """
+        Удаляет пачку вакансий. Хранилища переопределяют метод, чтобы удалять пачку
+        за одну операцию записи; по умолчанию вакансии удаляются по одной.
+        :param urls: ссылки на вакансии
+        :return: количество удаленных вакансий
+        """
+        return sum(1 for url in urls if self.delete_vacancy(url))
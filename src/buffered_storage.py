@@ -0,0 +1,177 @@
+import threading
+import time
+from itertools import islice
+from typing import Dict, Iterable, Iterator, List, Optional
+
+from src.base_storage import BaseStorage
+
+
+class BufferedStorage(BaseStorage):
+    """
+    Отложенная запись поверх любого хранилища: добавления и удаления копятся в памяти
+    и применяются одной групповой записью (delete_vacancies + add_vacancies), когда
+    в буфере набирается max_pending операций, самая старая операция ждет дольше max_delay
+    секунд, при явном вызове flush() или при выходе из контекстного менеджера.
+    Сброс всегда выполняется в потоке вызывающего кода (фонового таймера нет), поэтому
+    подходят и хранилища, привязанные к своему потоку, как SQLiteStorage. Срок max_delay
+    проверяется при следующем добавлении или удалении.
+    Чтение видит несохраненные изменения: get_vacancies и iter_vacancies применяют буфер
+    к данным хранилища, а filter_vacancies и top_by_salary сначала сбрасывают буфер,
+    чтобы пользоваться индексами хранилища (и порядком по релевантности).
+    """
+
+    def __init__(self, storage: BaseStorage, max_pending: int = 500, max_delay: float = 5.0):
+        """
+        :param storage: хранилище, в которое сбрасываются изменения
+        :param max_pending: сколько операций накопить до сброса
+        :param max_delay: сколько секунд изменения могут ждать в буфере; None - без ограничения
+        """
+        self.storage = storage
+        self.max_pending = max_pending
+        self.max_delay = max_delay
+
+        self._lock = threading.RLock()
+        # URL -> запись, ожидающая добавления; порядок словаря - порядок добавления
+        self._adds: Dict[str, Dict] = {}
+        # URL, ожидающие удаления. Удаления применяются раньше добавлений,
+        # поэтому "удалить и добавить заново" дает новую запись
+        self._deletes: Dict[str, None] = {}
+        # Время (time.monotonic) самой старой несохраненной операции
+        self._oldest: Optional[float] = None
+
+    def __len__(self) -> int:
+        # Количество несохраненных операций
+        return len(self._adds) + len(self._deletes)
+
+    def add_vacancy(self, vacancy: Dict) -> None:
+        self.add_vacancies([vacancy])
+
+    def add_vacancies(self, vacancies: Iterable[Dict]) -> int:
+        """
+        Кладет вакансии в буфер. Как и хранилища, пропускает URL, который уже есть
+        в буфере или в хранилище, поэтому результат - число действительно новых вакансий.
+        Наличие в хранилище проверяется пачками по max_pending вакансий - одно обращение
+        к хранилищу на пачку, а не на каждую вакансию
+        :return: количество принятых в буфер вакансий
+        """
+        added = 0
+        vacancies = iter(vacancies)
+        while True:
+            # Пачка набирается без блокировки: генератор может долго ждать сеть,
+            # и другие потоки не должны ждать вместе с ним
+            batch = list(islice(vacancies, max(self.max_pending, 1)))
+            if not batch:
+                return added
+            with self._lock:
+                stored = self.storage.existing_urls(
+                    vacancy["url"] for vacancy in batch if vacancy["url"] not in self._deletes
+                )
+                for vacancy in batch:
+                    url = vacancy["url"]
+                    if url in self._adds or url in stored:
+                        continue
+                    self._adds[url] = vacancy
+                    # Сброс внутри пачки не должен пропустить повтор того же URL в ней
+                    stored.add(url)
+                    added += 1
+                    self._written()
+
+    def get_vacancy(self, url: str) -> Optional[Dict]:
+        """
+        Ищет вакансию по URL с учетом несохраненных изменений
+        :param url: ссылка на вакансию
+        :return: запись вакансии или None
+        """
+        with self._lock:
+            if url in self._adds:
+                return self._adds[url]
+            if url in self._deletes:
+                return None
+        return self.storage.get_vacancy(url)
+
+    def delete_vacancy(self, url: str) -> bool:
+        return self.delete_vacancies([url]) > 0
+
+    def delete_vacancies(self, urls: Iterable[str]) -> int:
+        """
+        Ставит удаление в буфер
+        :return: количество удаляемых вакансий, которые есть в буфере или хранилище
+        """
+        urls = list(dict.fromkeys(urls))
+        count = 0
+        with self._lock:
+            stored = self.storage.existing_urls(url for url in urls if url not in self._deletes)
+            for url in urls:
+                if url in self._adds or url in stored:
+                    count += 1
+                self._adds.pop(url, None)
+                self._deletes[url] = None
+                self._written()
+        return count
+
+    def flush(self) -> None:
+        """
+        Сбрасывает буфер в хранилище: одна пачка удалений и одна пачка добавлений.
+        Операция убирается из буфера только после успешной записи: если хранилище
+        выбросило исключение, несохраненные изменения остаются в буфере
+        """
+        with self._lock:
+            if self._deletes:
+                self.storage.delete_vacancies(list(self._deletes))
+                self._deletes = {}
+            if self._adds:
+                self.storage.add_vacancies(list(self._adds.values()))
+                self._adds = {}
+            self._oldest = None
+
+    def get_vacancies(self) -> List[Dict]:
+        return list(self.iter_vacancies())
+
+    def iter_vacancies(self) -> Iterator[Dict]:
+        # Снимок буфера: генератор не держит блокировку, пока его читают
+        with self._lock:
+            adds, deletes = dict(self._adds), set(self._deletes)
+        if not adds and not deletes:
+            yield from self.storage.iter_vacancies()
+            return
+
+        # Запись хранилища побеждает буферное добавление с тем же URL: при сбросе дубликат будет пропущен
+        for vacancy in self.storage.iter_vacancies():
+            if vacancy["url"] in deletes:
+                continue
+            adds.pop(vacancy["url"], None)
+            yield vacancy
+        yield from adds.values()
+
+    def filter_vacancies(
+        self,
+        keyword: Optional[str] = None,
+        min_salary: Optional[int] = None,
+        max_salary: Optional[int] = None,
+    ) -> List[Dict]:
+        # Сбрасываем буфер и пользуемся индексами хранилища, а не просматриваем все записи
+        with self._lock:
+            self.flush()
+            return self.storage.filter_vacancies(keyword, min_salary, max_salary)
+
+    def top_by_salary(self, n: int) -> List[Dict]:
+        with self._lock:
+            self.flush()
+            return self.storage.top_by_salary(n)
+
+    def close(self) -> None:
+        self.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def _written(self) -> None:
+        now = time.monotonic()
+        if self._oldest is None:
+            self._oldest = now
+        expired = self.max_delay is not None and now - self._oldest >= self.max_delay
+        if len(self) >= self.max_pending or expired:
+            self.flush()
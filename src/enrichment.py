@@ -0,0 +1,100 @@
+import html
+import re
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Dict, Iterable, List, Optional
+
+from api.hh_api import HeadHunterAPI
+from src.base_storage import BaseStorage
+from src.vacancy import Vacancy
+
+TAG_RE = re.compile(r"<[^>]+>")
+SPACES_RE = re.compile(r"\s+")
+
+
+def strip_html(text: Optional[str]) -> str:
+    # Описание вакансии приходит в HTML, в хранилище кладем простой текст
+    if not text:
+        return ""
+    return SPACES_RE.sub(" ", html.unescape(TAG_RE.sub(" ", text))).strip()
+
+
+def detail_to_record(detail: Dict) -> Dict:
+    """
+    Преобразует полное описание вакансии в запись хранилища
+    :param detail: ответ /vacancies/{id}
+    :return: запись с описанием, навыками, опытом и графиком
+    """
+    record = Vacancy(
+        name=detail.get("name") or "Не указано",
+        url=detail.get("alternate_url") or "Не указано",
+        salary=detail.get("salary") or "Зарплата не указана",
+        description=strip_html(detail.get("description")),
+        area=(detail.get("area") or {}).get("name"),
+    ).to_record()
+    record["key_skills"] = [skill["name"] for skill in detail.get("key_skills") or []]
+    record["experience"] = (detail.get("experience") or {}).get("name")
+    record["schedule"] = (detail.get("schedule") or {}).get("name")
+    return record
+
+
+class VacancyEnricher:
+    """
+    Догружает полные описания вакансий и сохраняет их в хранилище по мере получения.
+    В работе одновременно находится не больше 2 * max_workers вакансий, а в память
+    накапливается не больше batch_size записей, поэтому объем памяти не зависит от числа id.
+    Записи сравниваются с тем, что уже лежит в хранилище (upsert_vacancies), поэтому
+    неизменившиеся вакансии не перезаписываются.
+    """
+
+    def __init__(self, api: HeadHunterAPI, storage: BaseStorage, max_workers: int = 8, batch_size: int = 50):
+        self._api = api
+        self._storage = storage
+        self.max_workers = max_workers
+        self.batch_size = batch_size
+
+    def enrich(self, vacancy_ids: Iterable[str]) -> int:
+        """
+        Загружает подробности вакансий и обновляет их записи в хранилище
+        :param vacancy_ids: идентификаторы вакансий (можно передать генератор)
+        :return: количество сохраненных вакансий
+        """
+        saved = 0
+        batch: List[Dict] = []
+        ids = iter(vacancy_ids)
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            # Загрузка -> id вакансии, чтобы сообщить, какая из них не загрузилась
+            pending: Dict[Future, str] = {}
+            exhausted = False
+            while True:
+                # Подкладываем новые id, пока окно не заполнено
+                while not exhausted and len(pending) < self.max_workers * 2:
+                    vacancy_id = next(ids, None)
+                    if vacancy_id is None:
+                        exhausted = True
+                        break
+                    pending[executor.submit(self._api.get_vacancy, vacancy_id)] = vacancy_id
+
+                if not pending:
+                    break
+
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    vacancy_id = pending.pop(future)
+                    try:
+                        detail = future.result()
+                    except Exception as e:
+                        # Одна сломанная вакансия не должна прерывать загрузку остальных
+                        print(f"Ошибка при загрузке вакансии {vacancy_id}: {e}")
+                        continue
+                    # None - ошибка запроса, о ней уже сообщил клиент API
+                    if detail is not None:
+                        batch.append(detail_to_record(detail))
+
+                if len(batch) >= self.batch_size:
+                    saved += self._storage.upsert_vacancies(batch)
+                    batch = []
+
+        if batch:
+            saved += self._storage.upsert_vacancies(batch)
+        return saved
@@ -0,0 +1,73 @@
+import json
+import os
+import stat
+import tempfile
+from contextlib import contextmanager
+from typing import IO, Any, Callable, Iterator
+
+try:
+    import fcntl
+except ImportError:  # Windows: рекомендательных блокировок fcntl нет, работаем без них
+    fcntl = None  # type: ignore[assignment]
+
+
+@contextmanager
+def file_lock(filename: str, shared: bool = False) -> Iterator[None]:
+    """
+    Рекомендательная блокировка между процессами (fcntl.flock) на файле-спутнике filename.lock.
+    Блокируется отдельный файл, а не сам файл данных: файл данных подменяется через os.replace,
+    и блокировка на старом inode не защитила бы следующую запись.
+    :param filename: защищаемый файл
+    :param shared: разделяемая блокировка для чтения; по умолчанию - исключительная для записи
+    """
+    if fcntl is None:
+        yield
+        return
+
+    with open(f"{filename}.lock", "a") as lock_file:
+        fcntl.flock(lock_file.fileno(), fcntl.LOCK_SH if shared else fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+
+def atomic_write_json(filename: str, data: Any, **kwargs) -> None:
+    """
+    Записывает JSON во временный файл рядом с основным, сбрасывает его на диск и подменяет
+    им основной файл. Читатели видят либо старую, либо новую версию целиком, а после сбоя
+    питания на диске не остается пустого или недописанного файла.
+    :param filename: файл для записи
+    :param data: данные
+    :param kwargs: параметры json.dump
+    """
+    _atomic_write(filename, "w", lambda file: json.dump(data, file, **kwargs))
+
+
+def atomic_write_file(filename: str, write: Callable[[IO], None]) -> None:
+    """
+    То же, что atomic_write_json, для двоичного файла, который записывает сам вызывающий код
+    :param filename: файл для записи
+    :param write: функция, получающая временный файл, открытый в режиме "wb"; по нему можно
+                  перемещаться (seek), например чтобы дописать заголовок в конце
+    """
+    _atomic_write(filename, "wb", write)
+
+
+def _atomic_write(filename: str, mode: str, write: Callable[[IO], None]) -> None:
+    directory = os.path.dirname(os.path.abspath(filename))
+    # Уникальное имя: несколько процессов не пишут в один и тот же временный файл
+    fd, tmp_file = tempfile.mkstemp(prefix=f"{os.path.basename(filename)}.", suffix=".tmp", dir=directory)
+    try:
+        with os.fdopen(fd, mode, encoding=None if "b" in mode else "utf-8") as file:
+            if os.path.exists(filename):
+                # mkstemp создает файл с правами 0600 - сохраняем права основного файла
+                os.chmod(tmp_file, stat.S_IMODE(os.stat(filename).st_mode))
+            write(file)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(tmp_file, filename)
+    except BaseException:
+        if os.path.exists(tmp_file):
+            os.remove(tmp_file)
+        raise
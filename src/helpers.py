@@ -1,7 +1,12 @@
-from typing import Dict, List
+import heapq
+import re
+from typing import Dict, Iterable, Iterator, Optional, Union
 
+from src.text_index import matches
 from src.vacancy import Vacancy
 
+NUMBER_RE = re.compile(r"-?\d+(?:[.,]\d+)?")
+
 
 def format_salary(salary: str) -> str:
     # Преобразуем строку в число
@@ -10,6 +15,63 @@ def format_salary(salary: str) -> str:
     return "{:,}".format(number).replace(",", " ")
 
 
+def parse_salary_value(salary: Optional[str]) -> Optional[float]:
+    """
+    Получает числовое значение зарплаты из строки, сформированной Vacancy:
+    для вилки "100000 - 150000 RUB" - середину, для "до 150000 RUB" и "100000 RUB" - само число
+    :param salary: строка зарплаты
+    :return: число или None, если зарплата не указана
+    """
+    if not salary:
+        return None
+    # Пробелы внутри чисел убираем, а разделитель вилки заменяем, чтобы числа не склеились
+    text = salary.replace(" - ", "|").replace(" ", "")
+    numbers = [float(number.replace(",", ".")) for number in NUMBER_RE.findall(text)]
+    if not numbers:
+        return None
+    if len(numbers) >= 2:
+        return (numbers[0] + numbers[1]) / 2
+    return numbers[0]
+
+
+def record_salary(record: Dict) -> Optional[float]:
+    """
+    Числовая зарплата записи хранилища: сохраненное поле salary_mid,
+    а для записей старого формата - разбор строки зарплаты
+    """
+    if "salary_mid" in record:
+        return record["salary_mid"]
+    return parse_salary_value(record.get("salary"))
+
+
+def filter_records(
+    records: Iterable[Dict],
+    keyword: Optional[str] = None,
+    min_salary: Optional[int] = None,
+    max_salary: Optional[int] = None,
+) -> Iterator[Dict]:
+    """
+    Потоково фильтрует записи хранилища, не собирая их в список
+    :param records: записи (например, storage.iter_vacancies())
+    :param keyword: слова для поиска в названии и описании (OR - любая из групп слов)
+    :param min_salary: минимальная зарплата
+    :param max_salary: максимальная зарплата
+    :return: генератор подходящих записей
+    """
+    for record in records:
+        if min_salary is not None or max_salary is not None:
+            salary = record_salary(record)
+            if salary is None:
+                continue
+            if min_salary is not None and salary < min_salary:
+                continue
+            if max_salary is not None and salary > max_salary:
+                continue
+        if keyword and not matches(keyword, f"{record.get('name') or ''} {record.get('description') or ''}"):
+            continue
+        yield record
+
+
 def print_vacancies(vacancies: list) -> None:
     for vacancy in vacancies:
         try:
@@ -22,22 +84,30 @@ def print_vacancies(vacancies: list) -> None:
             print(f"Ошибка при выводе вакансии: {e}")
 
 
-def sort_vacancies_by_salary(vacancies: list) -> list:
-    def get_salary(vacancy):
-        try:
-            # Извлекаем числовое значение зарплаты
-            salary_str = vacancy.salary
-            if "Не указана" in salary_str:
-                return -1
-
-            # Ищем первое число в строке зарплаты
-            import re
-
-            numbers = re.findall(r"\d+", salary_str)
-            if numbers:
-                return int(numbers[0].replace(" ", ""))
-            return -1
-        except Exception:
-            return -1
-
-    return sorted(vacancies, key=get_salary, reverse=True)
+def salary_sort_key(vacancy: Union[Vacancy, Dict]) -> float:
+    """
+    Ключ сортировки по зарплате без разбора строк: у Vacancy берется уже посчитанное
+    числовое значение, у записи хранилища - поле salary_mid
+    :param vacancy: объект Vacancy или запись хранилища
+    :return: зарплата; вакансии без зарплаты получают -inf и оказываются в конце
+    """
+    if isinstance(vacancy, Vacancy):
+        salary = vacancy._extract_numeric_salary()
+    else:
+        salary = record_salary(vacancy)
+    return float("-inf") if salary is None else salary
+
+
+def sort_vacancies_by_salary(vacancies: Iterable) -> list:
+    return sorted(vacancies, key=salary_sort_key, reverse=True)
+
+
+def top_vacancies_by_salary(vacancies: Iterable, n: int) -> list:
+    """
+    Выбирает n вакансий с самой высокой зарплатой с помощью кучи размера n: O(N log n)
+    вместо полной сортировки, в памяти держится только n кандидатов
+    :param vacancies: объекты Vacancy или записи хранилища (можно передать генератор)
+    :param n: количество вакансий
+    :return: вакансии по убыванию зарплаты
+    """
+    return heapq.nlargest(n, vacancies, key=salary_sort_key)
@@ -1,71 +1,232 @@
+import atexit
 import json
 import os
-from typing import Dict, List, Optional
+from contextlib import contextmanager
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
 
+from src.base_storage import BaseStorage
+from src.file_lock import atomic_write_json, file_lock
+from src.helpers import filter_records, record_salary
+from src.salary_index import SalaryIndex
+from src.text_index import InvertedIndex, relevance
 
-class JSONStorage:
-    def __init__(self, filename: str = "vacancies.json"):
+
+class JSONStorage(BaseStorage):
+    def __init__(
+        self,
+        filename: str = "vacancies.json",
+        index_save_every: int = 100,
+        stream_threshold: Optional[int] = 256 * 1024 * 1024,
+    ):
+        """
+        :param filename: файл вакансий
+        :param index_save_every: через сколько изменений сохранять полнотекстовый индекс на диск;
+                                 остальные изменения сохраняются при flush(), close() и выходе из программы
+        :param stream_threshold: размер файла в байтах, начиная с которого filter_vacancies и top_by_salary
+                                 читают файл потоком, а не загружают его в память с индексами;
+                                 None - всегда пользоваться индексами
+        """
         self._filename = filename
-        # Проверяем существование файла при инициализации
-        if not os.path.exists(self._filename):
-            with open(self._filename, "w", encoding="utf-8") as f:
-                json.dump([], f)
+        self.index_save_every = index_save_every
+        self.stream_threshold = stream_threshold
+        # Индекс URL -> запись. Словарь сохраняет порядок добавления, поэтому он же служит
+        # списком вакансий: проверка дубликата, поиск и удаление выполняются за O(1)
+        self._index: Dict[str, Dict] = {}
+        # Записи без URL (например, добавленные в файл вручную) в индекс не попадают,
+        # но возвращаются при чтении и сохраняются обратно в файл
+        self._unindexed: List[Dict] = []
+        # Производные индексы строятся при первой необходимости и годятся, пока файл
+        # не изменился: отметка - inode, время изменения и размер файла, по которому они построены.
+        # Полнотекстовый индекс по названию и описанию хранится рядом с файлом вакансий
+        self._text_index_filename = f"{filename}.idx"
+        self._text_index: Optional[InvertedIndex] = None
+        # Сколько изменений индекса еще не сохранено на диск. Пока они есть, flush зарегистрирован
+        # в atexit; без несохраненных изменений хранилище не удерживается atexit и может быть удалено
+        self._text_index_changes = 0
+        self._exit_hook = False
+        self._salary_index: Optional[SalaryIndex] = None
+        self._indexes_signature: Optional[List[int]] = None
+        # Отметка версии файла, из которой прочитаны записи в self._index. Пока файл не изменился,
+        # повторные чтения не разбирают его заново; записи через этот же объект обновляют
+        # self._index на месте. Возвращаемые записи - общие с кэшем, изменять их нельзя
+        self._records_signature: Optional[List[int]] = None
+        # Несколько процессов могут работать с одним файлом: чтение идет под разделяемой
+        # блокировкой, а чтение-изменение-запись целиком - под исключительной
+        with file_lock(self._filename):
+            # Проверяем существование файла при инициализации
+            if not os.path.exists(self._filename):
+                atomic_write_json(self._filename, [])
 
     def add_vacancy(self, vacancy: Dict) -> None:
         try:
-            # Читаем существующие данные
-            with open(self._filename, "r+", encoding="utf-8") as file:
-                try:
-                    data = json.load(file)
-                except json.JSONDecodeError:
-                    data = []
-
+            with self._modifying():
                 # Проверяем дубликаты по URL
-                if not any(v["url"] == vacancy["url"] for v in data):
-                    data.append(vacancy)
-
-                # Перезаписываем файл
-                file.seek(0)
-                json.dump(data, file, ensure_ascii=False, indent=4)
-                file.truncate()
+                if vacancy["url"] not in self._index:
+                    self._put(vacancy)
+                    self._save()
         except Exception as e:
             print(f"Ошибка при сохранении: {e}")
 
+    def add_vacancies(self, vacancies: Iterable[Dict]) -> int:
+        """
+        Добавляет пачку вакансий: файл читается и перезаписывается один раз.
+        В отличие от add_vacancy, ошибка чтения или записи не печатается, а пробрасывается,
+        как в других хранилищах: вызывающий код (например, BufferedStorage) должен знать,
+        что пачка не сохранена
+        :param vacancies: вакансии (можно передать генератор)
+        :return: количество добавленных вакансий (дубликаты по URL пропускаются)
+        """
+        # Вакансии собираем до блокировки, чтобы не держать файл, пока генератор ходит в сеть
+        vacancies = list(vacancies)
+        with self._modifying():
+            added = 0
+            for vacancy in vacancies:
+                if vacancy["url"] not in self._index:
+                    self._put(vacancy)
+                    added += 1
+
+            if added:
+                self._save()
+            return added
+
+    def upsert_vacancies(self, vacancies: Iterable[Dict]) -> int:
+        """
+        Добавляет новые вакансии и обновляет существующие (по URL) за одну перезапись файла.
+        Ошибки пробрасываются, как в add_vacancies
+        :param vacancies: вакансии для сохранения
+        :return: количество добавленных или измененных вакансий
+        """
+        # Вакансии собираем до блокировки, чтобы не держать файл, пока генератор ходит в сеть
+        vacancies = list(vacancies)
+        with self._modifying():
+            changed = 0
+            for vacancy in vacancies:
+                if self._index.get(vacancy["url"]) != vacancy:
+                    self._put(vacancy)
+                    changed += 1
+
+            # Если ничего не изменилось, файл не трогаем
+            if changed:
+                self._save()
+            return changed
+
     def get_vacancies(self) -> List[Dict]:
         try:
-            with open(self._filename, "r", encoding="utf-8") as file:
-                data = json.load(file)
-                if isinstance(data, list):
-                    return data
-                return []
-        except FileNotFoundError:
-            return []
-        except json.JSONDecodeError:
-            return []
+            with file_lock(self._filename, shared=True):
+                self._load()
+                return list(self._index.values()) + self._unindexed
         except Exception as e:
             print(f"Ошибка при чтении данных: {e}")
             return []
 
-    def delete_vacancy(self, url: str) -> bool:
+    def iter_vacancies(self, chunk_size: int = 64 * 1024) -> Iterator[Dict]:
+        """
+        Читает вакансии из файла по одной, не загружая весь массив в память
+        :param chunk_size: размер блока чтения, байт
+        :return: генератор записей в порядке хранения
+        """
+        decoder = json.JSONDecoder()
         try:
-            with open(self._filename, "r+", encoding="utf-8") as file:
-                data = json.load(file)
-                original_length = len(data)
+            # Блокировка нужна только на время открытия: открытый файл - целая версия данных,
+            # запись подменяет файл через os.replace и не трогает уже открытый
+            with file_lock(self._filename, shared=True):
+                file = open(self._filename, "r", encoding="utf-8")
+            with file:
+                buffer = ""
+                position = 0
+                eof = False
+                started = False
 
-                # Фильтруем вакансии
-                data = [v for v in data if v["url"] != url]
+                while True:
+                    # Пропускаем пробелы и разделители между элементами массива
+                    while position < len(buffer) and buffer[position] in " \t\r\n,":
+                        position += 1
+                    if position < len(buffer):
+                        if not started:
+                            if buffer[position] != "[":
+                                return
+                            started = True
+                            position += 1
+                            continue
+                        if buffer[position] == "]":
+                            return
+                        try:
+                            record, end = decoder.raw_decode(buffer, position)
+                        except json.JSONDecodeError:
+                            # Элемент еще не дочитан целиком
+                            if eof:
+                                print("Ошибка при чтении данных: файл поврежден")
+                                return
+                        else:
+                            if end < len(buffer) or eof:
+                                yield record
+                                position = end
+                                continue
+                    elif eof:
+                        return
 
+                    # Дочитываем следующий блок, отбрасывая уже разобранную часть буфера
+                    chunk = file.read(chunk_size)
+                    eof = not chunk
+                    buffer = buffer[position:] + chunk
+                    position = 0
+        except FileNotFoundError:
+            return
+
+    def get_vacancy(self, url: str) -> Optional[Dict]:
+        """
+        Ищет вакансию по URL
+        :param url: ссылка на вакансию
+        :return: запись вакансии или None
+        """
+        try:
+            with file_lock(self._filename, shared=True):
+                self._load()
+                return self._index.get(url)
+        except Exception as e:
+            print(f"Ошибка при чтении данных: {e}")
+            return None
+
+    def existing_urls(self, urls: Iterable[str]) -> Set[str]:
+        """
+        Проверяет пачку URL за одно чтение под блокировкой
+        :param urls: ссылки на вакансии
+        :return: ссылки, для которых в файле есть вакансия
+        """
+        try:
+            with file_lock(self._filename, shared=True):
+                self._load()
+                return {url for url in urls if url in self._index}
+        except Exception as e:
+            print(f"Ошибка при чтении данных: {e}")
+            return set()
+
+    def delete_vacancy(self, url: str) -> bool:
+        try:
+            with self._modifying():
                 # Сохраняем изменения только если что-то изменилось
-                if len(data) < original_length:
-                    file.seek(0)
-                    json.dump(data, file, ensure_ascii=False, indent=4)
-                    file.truncate()
-                    return True
-                return False
+                if not self._remove(url):
+                    return False
+                self._save()
+                return True
         except Exception as e:
             print(f"Ошибка при удалении: {e}")
             return False
 
+    def delete_vacancies(self, urls: Iterable[str]) -> int:
+        """
+        Удаляет пачку вакансий за одну перезапись файла.
+        Ошибки пробрасываются, как в add_vacancies
+        :param urls: ссылки на вакансии
+        :return: количество удаленных вакансий
+        """
+        urls = list(urls)
+        with self._modifying():
+            deleted = sum(1 for url in urls if self._remove(url))
+            if deleted:
+                self._save()
+            return deleted
+
     def filter_vacancies(
         self,
         keyword: Optional[str] = None,
@@ -74,36 +235,270 @@ class JSONStorage:
     ) -> List[Dict]:
         """
         Фильтрует вакансии по заданным параметрам
-        :param keyword: ключевое слово для поиска в описании
+        :param keyword: слова для поиска в названии и описании; все слова должны встретиться,
+                        группы слов можно объединить через OR
         :param min_salary: минимальная зарплата
         :param max_salary: максимальная зарплата
-        :return: отфильтрованный список вакансий
+        :return: отфильтрованный список вакансий (при поиске по словам - по убыванию релевантности,
+                 по зарплате - по возрастанию зарплаты); для большого файла, читаемого потоком, -
+                 в порядке хранения
         """
-        vacancies = self.get_vacancies()
+        if self._streaming():
+            return super().filter_vacancies(keyword, min_salary, max_salary)
+        try:
+            with file_lock(self._filename, shared=True):
+                self._load()
+                if keyword:
+                    urls = [url for url, _ in self._search(keyword, min_salary, max_salary)]
+                elif min_salary is not None or max_salary is not None:
+                    # Вакансии без зарплаты в диапазон не попадают
+                    urls = self._salaries().range(min_salary, max_salary)
+                else:
+                    return list(self._index.values()) + self._unindexed
 
-        if keyword:
-            vacancies = [
-                v for v in vacancies if keyword.lower() in v["description"].lower()
-            ]
+                return [self._index[url] for url in urls]
+        except Exception as e:
+            print(f"Ошибка при поиске: {e}")
+            return []
 
-        if min_salary is not None:
-            vacancies = [v for v in vacancies if self._parse_salary(v) >= min_salary]
+    def search_vacancies(
+        self, keyword: str, min_salary: Optional[int] = None, max_salary: Optional[int] = None
+    ) -> List[Tuple[int, Dict]]:
+        """
+        Поиск по словам вместе со счетом релевантности, по которому filter_vacancies упорядочивает
+        результаты. Нужен, чтобы сливать результаты нескольких хранилищ (ShardedStorage),
+        не разбирая тексты вакансий заново
+        :param keyword: слова для поиска, как в filter_vacancies
+        :param min_salary: минимальная зарплата
+        :param max_salary: максимальная зарплата
+        :return: пары (счет, вакансия) по убыванию счета, в том числе для файла, читаемого потоком
+        """
+        if self._streaming():
+            # Индекса нет: счет считается по тексту, а сортировка устойчива - при равном счете порядок хранения
+            scored = []
+            for vacancy in filter_records(self.iter_vacancies(), None, min_salary, max_salary):
+                score = relevance(keyword, self._document_text(vacancy))
+                if score:
+                    scored.append((score, vacancy))
+            scored.sort(key=lambda item: -item[0])
+            return scored
+        try:
+            with file_lock(self._filename, shared=True):
+                self._load()
+                return [(score, self._index[url]) for url, score in self._search(keyword, min_salary, max_salary)]
+        except Exception as e:
+            print(f"Ошибка при поиске: {e}")
+            return []
+
+    def top_by_salary(self, n: int) -> List[Dict]:
+        """
+        Возвращает n вакансий с самой высокой зарплатой
+        :param n: количество вакансий
+        :return: вакансии по убыванию зарплаты, вакансии без зарплаты - в конце
+        """
+        if self._streaming():
+            return super().top_by_salary(n)
+        try:
+            with file_lock(self._filename, shared=True):
+                self._load()
+                return [self._index[url] for url in self._salaries().top(n)]
+        except Exception as e:
+            print(f"Ошибка при чтении данных: {e}")
+            return []
+
+    def flush(self) -> None:
+        """
+        Сохраняет на диск несохраненные изменения полнотекстового индекса
+        """
+        # Сохранять нечего, или файл вакансий уже удален (например, вместе с временным каталогом)
+        if self._text_index is None or not self._text_index_changes or not os.path.exists(self._filename):
+            self._text_index_saved()
+            return
+        try:
+            with file_lock(self._filename):
+                # Индекс сохраняем, только если он соответствует текущей версии файла;
+                # устаревший индекс следующий поиск все равно перестроит
+                signature = self._signature()
+                if signature == self._indexes_signature:
+                    self._save_text_index()
+                else:
+                    self._text_index_saved()
+        except Exception as e:
+            print(f"Ошибка при сохранении индекса: {e}")
+
+    def close(self) -> None:
+        self.flush()
+        self._text_index_saved()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def _read(self) -> List[Dict]:
+        try:
+            with open(self._filename, "r", encoding="utf-8") as file:
+                data = json.load(file)
+                if isinstance(data, list):
+                    return data
+                return []
+        except FileNotFoundError:
+            return []
+        except json.JSONDecodeError as e:
+            # Поврежденный файл нельзя считать пустым: следующая запись затерла бы все данные
+            raise ValueError(f"файл {self._filename} поврежден ({e})") from e
+
+    def _load(self) -> None:
+        # Файл не менялся с прошлого чтения (или нашей записи) - записи в памяти актуальны,
+        # стоимость проверки - один os.stat
+        signature = self._signature()
+        if signature is not None and signature == self._records_signature:
+            return
 
-        if max_salary is not None:
-            vacancies = [v for v in vacancies if self._parse_salary(v) <= max_salary]
+        # Производные индексы годятся, только если файл не менялся с момента их построения
+        if self._indexes_signature != signature:
+            self._text_index = None
+            self._salary_index = None
 
-        return vacancies
+        # Индекс строится один раз на каждое чтение файла и дальше обновляется при изменениях
+        self._index = {}
+        self._unindexed = []
+        self._records_signature = None
+        for vacancy in self._read():
+            if isinstance(vacancy, dict) and isinstance(vacancy.get("url"), str):
+                self._index.setdefault(vacancy["url"], vacancy)
+            else:
+                self._unindexed.append(vacancy)
+        self._records_signature = signature
 
-    def _parse_salary(self, vacancy: Dict) -> int:
+    @contextmanager
+    def _modifying(self) -> Iterator[None]:
         """
-        Парсит зарплату из строки в число
-        :param vacancy: словарь с данными вакансии
-        :return: зарплата в виде числа или 0 если не удалось распарсить
+        Чтение-изменение-запись под исключительной блокировкой. Записи и индексы в памяти
+        меняются до записи файла, поэтому при любой ошибке внутри блока (сбой записи,
+        вакансия без url на середине пачки) кэш сбрасывается, и следующее обращение
+        перечитает файл, а не увидит наполовину примененные изменения
         """
-        salary_str = vacancy.get("salary", "")
+        with file_lock(self._filename):
+            try:
+                self._load()
+                yield
+            except BaseException:
+                self._records_signature = self._indexes_signature = None
+                self._text_index = self._salary_index = None
+                self._text_index_saved()
+                raise
+
+    def _save(self) -> None:
+        self._write(list(self._index.values()) + self._unindexed)
+        self._records_signature = self._indexes_signature = self._signature()
+        if self._text_index is not None:
+            # Индекс на диске перезаписывается целиком, поэтому сохраняем его пачками изменений
+            self._text_index_changes += 1
+            if self._text_index_changes >= self.index_save_every:
+                self._save_text_index()
+            elif not self._exit_hook:
+                atexit.register(self.flush)
+                self._exit_hook = True
+
+    def _save_text_index(self) -> None:
+        if self._text_index is not None:
+            self._text_index.save(self._text_index_filename, self._indexes_signature)
+        self._text_index_saved()
+
+    def _text_index_saved(self) -> None:
+        # Несохраненных изменений больше нет - хук завершения программы не нужен
+        self._text_index_changes = 0
+        if self._exit_hook:
+            atexit.unregister(self.flush)
+            self._exit_hook = False
+
+    def _put(self, vacancy: Dict) -> None:
+        self._index[vacancy["url"]] = vacancy
+        if self._text_index is not None:
+            self._text_index.add(vacancy["url"], self._document_text(vacancy))
+        if self._salary_index is not None:
+            self._salary_index.add(vacancy["url"], self._salary_value(vacancy))
+
+    def _remove(self, url: str) -> bool:
+        if self._index.pop(url, None) is None:
+            return False
+        if self._text_index is not None:
+            self._text_index.remove(url)
+        if self._salary_index is not None:
+            self._salary_index.remove(url)
+        return True
+
+    def _search(
+        self, keyword: str, min_salary: Optional[int], max_salary: Optional[int]
+    ) -> List[Tuple[str, int]]:
+        # Вызывается под блокировкой после _load: пары (URL, счет) по убыванию счета
+        hits = self._text().search_with_scores(keyword)
+        if min_salary is not None or max_salary is not None:
+            salaries = self._salaries()
+            hits = [(url, score) for url, score in hits if self._in_range(salaries.get(url), min_salary, max_salary)]
+        return hits
+
+    def _text(self) -> InvertedIndex:
+        # Загружаем сохраненный индекс, а если он устарел - перестраиваем по текущим данным
+        if self._text_index is None:
+            signature = self._signature()
+            self._text_index = InvertedIndex.load(self._text_index_filename, signature)
+            if self._text_index is None:
+                self._text_index = InvertedIndex.build(
+                    (url, self._document_text(vacancy)) for url, vacancy in self._index.items()
+                )
+                self._text_index.save(self._text_index_filename, signature)
+            self._text_index_saved()
+            self._indexes_signature = signature
+        return self._text_index
+
+    def _salaries(self) -> SalaryIndex:
+        if self._salary_index is None:
+            self._salary_index = SalaryIndex.build(
+                (url, self._salary_value(vacancy)) for url, vacancy in self._index.items()
+            )
+            self._indexes_signature = self._signature()
+        return self._salary_index
+
+    @staticmethod
+    def _document_text(vacancy: Dict) -> str:
+        return f"{vacancy.get('name') or ''} {vacancy.get('description') or ''}"
+
+    def _streaming(self) -> bool:
+        # Индексы требуют держать в памяти все записи. Для большого файла, который еще не загружен,
+        # дешевле один потоковый проход: в памяти остаются только подходящие записи (или топ из n)
+        if self.stream_threshold is None:
+            return False
+        signature = self._signature()
+        if signature is None or signature == self._records_signature:
+            return False
+        return signature[2] > self.stream_threshold
+
+    def _signature(self) -> Optional[List[int]]:
         try:
-            # Упрощенный парсинг зарплаты
-            # В реальной реализации нужно учитывать разные форматы зарплат
-            return int("".join(filter(str.isdigit, salary_str)))
-        except ValueError:
-            return 0
+            stat = os.stat(self._filename)
+        except FileNotFoundError:
+            return None
+        # Запись идет через os.replace, поэтому каждая новая версия файла - новый inode:
+        # изменение не останется незамеченным, даже если время и размер совпали
+        return [stat.st_ino, stat.st_mtime_ns, stat.st_size]
+
+    def _write(self, data: List[Dict]) -> None:
+        # Пишем во временный файл и подменяем им основной: читатели никогда не видят файл наполовину записанным
+        atomic_write_json(self._filename, data, ensure_ascii=False, indent=4)
+
+    @staticmethod
+    def _salary_value(vacancy: Dict) -> Optional[float]:
+        return record_salary(vacancy)
+
+    @staticmethod
+    def _in_range(salary: Optional[float], min_salary: Optional[int], max_salary: Optional[int]) -> bool:
+        if salary is None:
+            return False
+        if min_salary is not None and salary < min_salary:
+            return False
+        if max_salary is not None and salary > max_salary:
+            return False
+        return True
@@ -0,0 +1,197 @@
+import json
+import os
+import threading
+from typing import Dict, Iterable, List, Optional
+
+from src.base_storage import BaseStorage
+from src.json_storage import JSONStorage
+
+# Ключ, которым помечается запись об удалении вакансии
+TOMBSTONE_KEY = "_deleted"
+
+
+class JSONLinesStorage(BaseStorage):
+    """
+    Хранилище в формате JSON Lines: журнал, в который только дописываются строки.
+    Добавление вакансии - одна строка с записью, удаление - строка-надгробие с URL.
+    Когда доля мусора в журнале превышает порог, журнал переписывается в фоне,
+    а чтение идет из индекса в памяти и не ждет окончания перезаписи.
+    """
+
+    def __init__(self, filename: str = "vacancies.jsonl", compact_ratio: float = 0.5, compact_min_lines: int = 1000):
+        """
+        :param filename: файл журнала
+        :param compact_ratio: доля мусорных строк, после которой журнал переписывается
+        :param compact_min_lines: маленькие журналы не переписываются
+        """
+        self._filename = filename
+        self.compact_ratio = compact_ratio
+        self.compact_min_lines = compact_min_lines
+
+        self._lock = threading.RLock()
+        self._index: Dict[str, Dict] = {}
+        self._lines = 0
+        # Строки, дописанные во время перезаписи журнала; None - перезапись не идет
+        self._pending: Optional[List[str]] = None
+        self._compaction: Optional[threading.Thread] = None
+
+        self._replay()
+        self._file = open(self._filename, "a", encoding="utf-8")
+        if self._ends_with_partial_line():
+            # Новые записи не должны склеиться с обрывком последней строки
+            self._file.write("\n")
+            self._file.flush()
+
+    @classmethod
+    def migrate_from_json(cls, json_filename: str, filename: str = "vacancies.jsonl", **kwargs) -> "JSONLinesStorage":
+        """
+        Переносит вакансии из файла JSONStorage в журнал
+        :param json_filename: файл в формате JSONStorage
+        :param filename: файл журнала
+        :return: хранилище с перенесенными вакансиями
+        """
+        storage = cls(filename, **kwargs)
+        storage.add_vacancies(JSONStorage(json_filename).get_vacancies())
+        return storage
+
+    def add_vacancy(self, vacancy: Dict) -> None:
+        self.add_vacancies([vacancy])
+
+    def add_vacancies(self, vacancies: Iterable[Dict]) -> int:
+        """
+        Дописывает новые вакансии в журнал одной записью
+        :param vacancies: вакансии (можно передать генератор)
+        :return: количество добавленных вакансий (дубликаты по URL пропускаются)
+        """
+        with self._lock:
+            lines = []
+            for vacancy in vacancies:
+                if vacancy["url"] not in self._index:
+                    self._index[vacancy["url"]] = vacancy
+                    lines.append(json.dumps(vacancy, ensure_ascii=False) + "\n")
+            self._append(lines)
+            return len(lines)
+
+    def get_vacancies(self) -> List[Dict]:
+        with self._lock:
+            return list(self._index.values())
+
+    def get_vacancy(self, url: str) -> Optional[Dict]:
+        with self._lock:
+            return self._index.get(url)
+
+    def delete_vacancy(self, url: str) -> bool:
+        with self._lock:
+            if self._index.pop(url, None) is None:
+                return False
+            self._append([json.dumps({"url": url, TOMBSTONE_KEY: True}, ensure_ascii=False) + "\n"])
+            self._maybe_compact()
+            return True
+
+    def delete_vacancies(self, urls: Iterable[str]) -> int:
+        """
+        Удаляет пачку вакансий одной дозаписью меток удаления
+        :param urls: ссылки на вакансии
+        :return: количество удаленных вакансий
+        """
+        with self._lock:
+            lines = [
+                json.dumps({"url": url, TOMBSTONE_KEY: True}, ensure_ascii=False) + "\n"
+                for url in dict.fromkeys(urls)
+                if self._index.pop(url, None) is not None
+            ]
+            if lines:
+                self._append(lines)
+                self._maybe_compact()
+            return len(lines)
+
+    def garbage_ratio(self) -> float:
+        with self._lock:
+            if not self._lines:
+                return 0.0
+            return (self._lines - len(self._index)) / self._lines
+
+    def compact(self) -> None:
+        """
+        Переписывает журнал, оставляя только живые записи
+        """
+        with self._lock:
+            if self._pending is not None:
+                return
+            snapshot = list(self._index.values())
+            self._pending = []
+
+        # Основная запись идет без блокировки: чтение и добавление в это время продолжаются
+        tmp_file = f"{self._filename}.compact"
+        try:
+            with open(tmp_file, "w", encoding="utf-8") as file:
+                for vacancy in snapshot:
+                    file.write(json.dumps(vacancy, ensure_ascii=False) + "\n")
+
+                with self._lock:
+                    # Дописываем то, что успело попасть в старый журнал, и подменяем его
+                    file.writelines(self._pending)
+                    file.close()
+                    self._file.close()
+                    os.replace(tmp_file, self._filename)
+                    self._file = open(self._filename, "a", encoding="utf-8")
+                    self._lines = len(snapshot) + len(self._pending)
+        finally:
+            with self._lock:
+                self._pending = None
+
+    def close(self) -> None:
+        compaction = self._compaction
+        if compaction is not None:
+            compaction.join()
+        with self._lock:
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def _append(self, lines: List[str]) -> None:
+        if not lines:
+            return
+        self._file.writelines(lines)
+        self._file.flush()
+        self._lines += len(lines)
+        if self._pending is not None:
+            self._pending.extend(lines)
+
+    def _maybe_compact(self) -> None:
+        if self._lines < self.compact_min_lines or self.garbage_ratio() <= self.compact_ratio:
+            return
+        if self._compaction is not None and self._compaction.is_alive():
+            return
+        self._compaction = threading.Thread(target=self.compact, daemon=True)
+        self._compaction.start()
+
+    def _ends_with_partial_line(self) -> bool:
+        with open(self._filename, "rb") as file:
+            file.seek(0, os.SEEK_END)
+            if file.tell() == 0:
+                return False
+            file.seek(-1, os.SEEK_END)
+            return file.read(1) != b"\n"
+
+    def _replay(self) -> None:
+        # Восстанавливаем индекс, проигрывая журнал от начала до конца
+        try:
+            with open(self._filename, "r", encoding="utf-8") as file:
+                for line in file:
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        # Недописанная строка после аварийного завершения
+                        continue
+                    self._lines += 1
+                    if entry.get(TOMBSTONE_KEY):
+                        self._index.pop(entry["url"], None)
+                    else:
+                        self._index[entry["url"]] = entry
+        except FileNotFoundError:
+            pass
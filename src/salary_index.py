@@ -0,0 +1,89 @@
+from bisect import bisect_left, bisect_right
+from typing import Dict, Iterable, List, Optional, Tuple
+
+
+class SalaryIndex:
+    """
+    Отсортированный индекс зарплат: пары (зарплата, id записи) по возрастанию.
+    Выборка по диапазону - два бинарных поиска и срез, топ по зарплате - срез с конца.
+    Записи без зарплаты хранятся отдельно в порядке добавления.
+    Индекс целиком строится через build() одной сортировкой, add() - для изменений после этого.
+    """
+
+    def __init__(self):
+        self._entries: List[Tuple[float, str]] = []
+        # Зарплаты отдельным списком, параллельным _entries, чтобы искать границы диапазона
+        self._salaries: List[float] = []
+        self._values: Dict[str, float] = {}
+        self._unsalaried: Dict[str, None] = {}
+
+    def __len__(self) -> int:
+        return len(self._values) + len(self._unsalaried)
+
+    @classmethod
+    def build(cls, records: Iterable) -> "SalaryIndex":
+        """
+        Строит индекс по парам (id записи, зарплата): пары сортируются один раз,
+        а не вставляются по одной
+        """
+        index = cls()
+        for record_id, salary in records:
+            # Повторный id заменяет прежнюю зарплату, как при add()
+            index._unsalaried.pop(record_id, None)
+            if salary is None:
+                index._values.pop(record_id, None)
+                index._unsalaried[record_id] = None
+            else:
+                index._values[record_id] = salary
+        index._entries = sorted((salary, record_id) for record_id, salary in index._values.items())
+        index._salaries = [salary for salary, _ in index._entries]
+        return index
+
+    def add(self, record_id: str, salary: Optional[float]) -> None:
+        self.remove(record_id)
+        if salary is None:
+            self._unsalaried[record_id] = None
+            return
+        entry = (salary, record_id)
+        position = bisect_left(self._entries, entry)
+        self._entries.insert(position, entry)
+        self._salaries.insert(position, salary)
+        self._values[record_id] = salary
+
+    def remove(self, record_id: str) -> None:
+        if record_id in self._unsalaried:
+            del self._unsalaried[record_id]
+            return
+        salary = self._values.pop(record_id, None)
+        if salary is None:
+            return
+        position = bisect_left(self._entries, (salary, record_id))
+        del self._entries[position]
+        del self._salaries[position]
+
+    def get(self, record_id: str) -> Optional[float]:
+        return self._values.get(record_id)
+
+    def range(self, min_salary: Optional[float] = None, max_salary: Optional[float] = None) -> List[str]:
+        """
+        Возвращает id записей с зарплатой в диапазоне (границы включаются)
+        :return: id по возрастанию зарплаты
+        """
+        start = 0 if min_salary is None else bisect_left(self._salaries, min_salary)
+        end = len(self._salaries) if max_salary is None else bisect_right(self._salaries, max_salary)
+        return [record_id for _, record_id in self._entries[start:end]]
+
+    def top(self, n: int) -> List[str]:
+        """
+        Возвращает id n записей с самой высокой зарплатой; если записей с зарплатой
+        не хватает, список дополняется записями без зарплаты
+        """
+        if n <= 0:
+            return []
+        result = [record_id for _, record_id in reversed(self._entries[-n:])]
+        if len(result) < n:
+            for record_id in self._unsalaried:
+                if len(result) == n:
+                    break
+                result.append(record_id)
+        return result
@@ -0,0 +1,247 @@
+import heapq
+import json
+import os
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+from itertools import chain, islice
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Set, Tuple, Union
+
+from src.base_storage import BaseStorage
+from src.file_lock import atomic_write_json, file_lock
+from src.helpers import record_salary, salary_sort_key
+from src.json_storage import JSONStorage
+
+# Файл с параметрами шардирования: открыть каталог с другими параметрами значило бы искать
+# вакансии не в тех шардах
+METADATA_FILE = "shards.json"
+
+# Хранилища шардов внутри процесса-исполнителя: JSONStorage держит разобранные записи
+# и индексы, пока файл шарда не изменился, поэтому повторные запросы не читают файл заново
+_shards: Dict[str, JSONStorage] = {}
+
+
+def _shard(filename: str) -> JSONStorage:
+    storage = _shards.get(filename)
+    if storage is None:
+        storage = _shards[filename] = JSONStorage(filename)
+    return storage
+
+
+# Функции, выполняемые в процессах пула, объявлены на уровне модуля, чтобы их можно было передать в процесс
+def _add_to_shard(filename: str, vacancies: List[Dict]) -> int:
+    return _shard(filename).add_vacancies(vacancies)
+
+
+def _existing_in_shard(filename: str, urls: List[str]) -> List[str]:
+    return list(_shard(filename).existing_urls(urls))
+
+
+def _delete_from_shard(filename: str, urls: List[str]) -> int:
+    return _shard(filename).delete_vacancies(urls)
+
+
+def _filter_shard(
+    filename: str, keyword: Optional[str], min_salary: Optional[int], max_salary: Optional[int]
+) -> List[Tuple[float, Dict]]:
+    # Каждый шард отдает результаты упорядоченными, вместе с ключом порядка для слияния:
+    # при поиске по словам - счетом релевантности из индекса (со знаком минус), по зарплате - самой зарплатой
+    storage = _shard(filename)
+    if keyword:
+        return [(-score, vacancy) for score, vacancy in storage.search_vacancies(keyword, min_salary, max_salary)]
+    vacancies = storage.filter_vacancies(None, min_salary, max_salary)
+    results = [(record_salary(vacancy) or 0.0, vacancy) for vacancy in vacancies]
+    # Большой шард, читаемый потоком, отдает записи в порядке хранения, а heapq.merge ждет
+    # отсортированные списки. Ответ индекса уже отсортирован, и для него сортировка линейна
+    results.sort(key=lambda item: item[0])
+    return results
+
+
+def _top_of_shard(filename: str, n: int) -> List[Dict]:
+    return _shard(filename).top_by_salary(n)
+
+
+class ShardedStorage(BaseStorage):
+    """
+    Хранилище из N независимых файлов JSONStorage. Вакансия попадает в шард по ключу:
+    хешу URL, региону или результату своей функции. Запись в разные шарды и поиск
+    по шардам выполняются параллельно в пуле процессов, результаты объединяются,
+    а топ по зарплате собирается k-путевым слиянием отсортированных топов шардов.
+    """
+
+    def __init__(
+        self,
+        directory: str = "vacancies_shards",
+        shards: int = 8,
+        partition: Union[str, Callable[[Dict], object]] = "url",
+        max_workers: Optional[int] = None,
+    ):
+        """
+        :param directory: каталог с файлами шардов
+        :param shards: количество шардов; у существующего каталога менять нельзя
+        :param partition: "url", "area" или функция, возвращающая ключ шарда по записи;
+                          у существующего каталога менять нельзя, функцию нужно передавать ту же
+        :param max_workers: размер пула процессов (по умолчанию - по числу ядер, не больше числа шардов)
+        """
+        if shards < 1:
+            raise ValueError("Количество шардов должно быть положительным")
+        if isinstance(partition, str) and partition not in ("url", "area"):
+            raise ValueError(f"Неизвестный ключ шардирования: {partition}")
+
+        self._directory = directory
+        self._partition = partition
+        self.max_workers = max_workers or min(shards, os.cpu_count() or 1)
+        self._executor: Optional[ProcessPoolExecutor] = None
+
+        os.makedirs(directory, exist_ok=True)
+        self._check_metadata(shards)
+        self._filenames = [os.path.join(directory, f"shard_{i:03d}.json") for i in range(shards)]
+        for filename in self._filenames:
+            # Создаем пустые файлы шардов заранее
+            _shard(filename)
+
+    def add_vacancy(self, vacancy: Dict) -> None:
+        _add_to_shard(self._filenames[self._shard_index(vacancy)], [vacancy])
+
+    def add_vacancies(self, vacancies: Iterable[Dict]) -> int:
+        """
+        Раскладывает вакансии по шардам и записывает шарды параллельно
+        :param vacancies: вакансии (можно передать генератор)
+        :return: количество добавленных вакансий (дубликаты по URL пропускаются)
+        """
+        vacancies = list(vacancies)
+        if self._partition != "url" and vacancies:
+            # Шард выбирается не по URL: та же вакансия с другим регионом попала бы в другой шард,
+            # поэтому дубликаты ищем во всех шардах
+            existing = self.existing_urls(vacancy["url"] for vacancy in vacancies)
+            unique: Dict[str, Dict] = {}
+            for vacancy in vacancies:
+                if vacancy["url"] not in existing:
+                    unique.setdefault(vacancy["url"], vacancy)
+            vacancies = list(unique.values())
+
+        groups: Dict[int, List[Dict]] = {}
+        for vacancy in vacancies:
+            groups.setdefault(self._shard_index(vacancy), []).append(vacancy)
+        filenames = [self._filenames[i] for i in groups]
+        return sum(self._map(_add_to_shard, filenames, list(groups.values())))
+
+    def get_vacancies(self) -> List[Dict]:
+        return list(self.iter_vacancies())
+
+    def iter_vacancies(self) -> Iterator[Dict]:
+        return chain.from_iterable(_shard(filename).iter_vacancies() for filename in self._filenames)
+
+    def get_vacancy(self, url: str) -> Optional[Dict]:
+        if self._partition == "url":
+            return _shard(self._filenames[self._url_shard(url)]).get_vacancy(url)
+        for filename in self._filenames:
+            vacancy = _shard(filename).get_vacancy(url)
+            if vacancy is not None:
+                return vacancy
+        return None
+
+    def existing_urls(self, urls: Iterable[str]) -> Set[str]:
+        urls = list(urls)
+        if not urls:
+            return set()
+        found = self._map(_existing_in_shard, self._filenames, [urls] * len(self._filenames))
+        return set(chain.from_iterable(found))
+
+    def delete_vacancy(self, url: str) -> bool:
+        return self.delete_vacancies([url]) > 0
+
+    def delete_vacancies(self, urls: Iterable[str]) -> int:
+        urls = list(urls)
+        if self._partition == "url":
+            groups: Dict[int, List[str]] = {}
+            for url in urls:
+                groups.setdefault(self._url_shard(url), []).append(url)
+            filenames = [self._filenames[i] for i in groups]
+            return sum(self._map(_delete_from_shard, filenames, list(groups.values())))
+        # Шард определяется не по URL - вакансию ищем во всех шардах
+        return sum(self._map(_delete_from_shard, self._filenames, [urls] * len(self._filenames)))
+
+    def filter_vacancies(
+        self,
+        keyword: Optional[str] = None,
+        min_salary: Optional[int] = None,
+        max_salary: Optional[int] = None,
+    ) -> List[Dict]:
+        """
+        Фильтрует шарды параллельно, каждый по своим индексам, и сливает упорядоченные
+        результаты шардов через кучу, как в top_by_salary
+        :return: подходящие вакансии: при поиске по словам - по убыванию релевантности,
+                 по зарплате - по возрастанию зарплаты
+        """
+        if not keyword and min_salary is None and max_salary is None:
+            return self.get_vacancies()
+        count = len(self._filenames)
+        results = self._map(
+            _filter_shard, self._filenames, [keyword] * count, [min_salary] * count, [max_salary] * count
+        )
+        return [vacancy for _, vacancy in heapq.merge(*results, key=lambda item: item[0])]
+
+    def top_by_salary(self, n: int) -> List[Dict]:
+        """
+        Каждый шард отдает свои n лучших вакансий по убыванию зарплаты,
+        общий топ берется слиянием этих списков через кучу
+        """
+        tops = self._map(_top_of_shard, self._filenames, [n] * len(self._filenames))
+        return list(islice(heapq.merge(*tops, key=salary_sort_key, reverse=True), n))
+
+    def close(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def _shard_index(self, vacancy: Dict) -> int:
+        if self._partition == "url":
+            return self._url_shard(vacancy["url"])
+        if callable(self._partition):
+            key = self._partition(vacancy)
+        else:
+            key = vacancy.get("area")
+        if isinstance(key, int):
+            return key % len(self._filenames)
+        # crc32, а не hash(): встроенный hash строк меняется от запуска к запуску
+        return zlib.crc32(str(key).encode("utf-8")) % len(self._filenames)
+
+    def _check_metadata(self, shards: int) -> None:
+        if callable(self._partition):
+            partition = f"{self._partition.__module__}.{getattr(self._partition, '__qualname__', '')}"
+        else:
+            partition = self._partition
+        metadata = {"shards": shards, "partition": partition}
+
+        filename = os.path.join(self._directory, METADATA_FILE)
+        with file_lock(filename):
+            try:
+                with open(filename, "r", encoding="utf-8") as file:
+                    stored = json.load(file)
+            except FileNotFoundError:
+                atomic_write_json(filename, metadata, ensure_ascii=False)
+                return
+            except json.JSONDecodeError as e:
+                raise ValueError(f"{filename} поврежден ({e})") from e
+
+        if stored != metadata:
+            raise ValueError(
+                f"Каталог {self._directory} создан с параметрами {stored}, а открывается с {metadata}"
+            )
+
+    def _url_shard(self, url: str) -> int:
+        return zlib.crc32(url.encode("utf-8")) % len(self._filenames)
+
+    def _map(self, function: Callable, *args: List) -> List:
+        # Одну задачу нет смысла отправлять в другой процесс
+        if self.max_workers <= 1 or len(args[0]) <= 1:
+            return [function(*task) for task in zip(*args)]
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+        return list(self._executor.map(function, *args))
@@ -0,0 +1,276 @@
+import heapq
+import json
+import math
+import mmap
+import os
+import shutil
+import struct
+import tempfile
+from typing import IO, Any, Dict, Iterable, Iterator, List, Optional
+
+from src.base_storage import BaseStorage
+from src.file_lock import atomic_write_file
+from src.helpers import record_salary
+
+# Формат снимка:
+#   заголовок: сигнатура, версия, количество записей, смещение кучи строк;
+#   таблица записей фиксированной ширины: маска присутствующих полей, ссылки (смещение, длина)
+#   на строки в куче, числовые колонки зарплаты и признак gross;
+#   куча строк: UTF-8 без разделителей.
+MAGIC = b"VSNP"
+VERSION = 1
+HEADER = struct.Struct("<4sHxxQQ")
+# Поля записи хранилища в порядке to_record(); маска хранит, какие из них были в записи
+FIELDS = (
+    "name", "url", "salary", "description", "salary_from", "salary_to", "currency", "gross", "salary_mid", "area",
+)
+STRING_FIELDS = ("name", "url", "salary", "description", "currency", "area")
+NUMBER_FIELDS = ("salary_from", "salary_to", "salary_mid")
+# Маска, 7 ссылок на строки (поля STRING_FIELDS и JSON с остальными полями), 3 числа, gross
+RECORD = struct.Struct("<H" + "QI" * 7 + "dddb" + "x")
+# Смещение колонки salary_mid внутри записи: по ней сортируем, не разбирая запись целиком
+SALARY_MID = struct.Struct("<d")
+SALARY_MID_OFFSET = 2 + 12 * 7 + 8 * 2
+BITS = {key: 1 << i for i, key in enumerate(FIELDS)}
+NONE_LENGTH = 0xFFFFFFFF
+NAN = float("nan")
+WRITE_CHUNK = 1024 * 1024
+
+
+class Snapshot:
+    """
+    Двоичный снимок хранилища, открытый через mmap. Открытие читает только заголовок,
+    запись декодируется при обращении к ней, поэтому с диска подгружаются лишь
+    страницы прочитанных записей и их строк.
+    """
+
+    def __init__(self, filename: str):
+        """
+        :param filename: файл снимка, созданный Snapshot.write
+        """
+        self._filename = filename
+        with open(filename, "rb") as file:
+            self._mmap = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            if len(self._mmap) < HEADER.size:
+                raise ValueError(f"{filename}: не снимок хранилища")
+            magic, version, self._count, self._heap = HEADER.unpack_from(self._mmap, 0)
+            if magic != MAGIC:
+                raise ValueError(f"{filename}: не снимок хранилища")
+            if version != VERSION:
+                raise ValueError(f"{filename}: неподдерживаемая версия снимка {version}")
+            if self._heap != HEADER.size + self._count * RECORD.size or self._heap > len(self._mmap):
+                raise ValueError(f"{filename}: снимок поврежден")
+        except ValueError:
+            self._mmap.close()
+            raise
+
+    @staticmethod
+    def write(filename: str, records: Iterable[Dict]) -> int:
+        """
+        Сохраняет записи хранилища в снимок (атомарно, через временный файл).
+        Записи обрабатываются потоком: строки таблицы сразу пишутся в файл снимка, куча строк -
+        во временный файл рядом с ним и копируется за таблицу в конце, а заголовок дописывается
+        последним, когда известно количество записей. В памяти держатся только буферы
+        по WRITE_CHUNK байт, а не вся таблица и куча
+        :param filename: файл снимка
+        :param records: записи (например, storage.iter_vacancies())
+        :return: количество записей
+        """
+        count = 0
+
+        def write_snapshot(file: IO) -> None:
+            nonlocal count
+            with tempfile.TemporaryFile(dir=os.path.dirname(os.path.abspath(filename))) as heap:
+                # Место под заголовок; сам заголовок пишется после таблицы и кучи
+                file.write(bytes(HEADER.size))
+                count = Snapshot._write_table(file, heap, records)
+                heap.seek(0)
+                shutil.copyfileobj(heap, file)
+                file.seek(0)
+                file.write(HEADER.pack(MAGIC, VERSION, count, HEADER.size + count * RECORD.size))
+
+        atomic_write_file(filename, write_snapshot)
+        return count
+
+    @staticmethod
+    def _write_table(table: IO, heap: IO, records: Iterable[Dict]) -> int:
+        # Пишет строки таблицы в table, а строки записей - в heap; возвращает количество записей.
+        # Байты копятся в небольших буферах и пишутся блоками по WRITE_CHUNK, а не по одной строке
+        count = 0
+        heap_size = 0
+        rows = bytearray()
+        strings_data = bytearray()
+        pack = RECORD.pack
+
+        for record in records:
+            mask, extra = 0, {}
+            for key, value in record.items():
+                bit = BITS.get(key)
+                if bit is not None and _fits(key, value):
+                    mask |= bit
+                else:
+                    extra[key] = value
+
+            refs: List[int] = []
+            strings = [record[key] if mask & BITS[key] else None for key in STRING_FIELDS]
+            strings.append(json.dumps(extra, ensure_ascii=False) if extra else None)
+            for value in strings:
+                if value is None:
+                    refs += (0, NONE_LENGTH)
+                else:
+                    data = value.encode("utf-8")
+                    refs += (heap_size, len(data))
+                    strings_data += data
+                    heap_size += len(data)
+
+            numbers = [_to_float(record[key]) if mask & BITS[key] else NAN for key in NUMBER_FIELDS]
+            if not mask & BITS["salary_mid"]:
+                # salary_mid заполняется и у записей старого формата: колонка служит ключом сортировки
+                numbers[2] = _to_float(record_salary(record))
+            gross = record["gross"] if mask & BITS["gross"] else None
+
+            rows += pack(mask, *refs, *numbers, -1 if gross is None else int(gross))
+            count += 1
+            if len(strings_data) >= WRITE_CHUNK or len(rows) >= WRITE_CHUNK:
+                table.write(rows)
+                heap.write(strings_data)
+                rows.clear()
+                strings_data.clear()
+
+        table.write(rows)
+        heap.write(strings_data)
+        return count
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __getitem__(self, i: int) -> Dict:
+        if i < 0:
+            i += self._count
+        if not 0 <= i < self._count:
+            raise IndexError("индекс записи вне снимка")
+        return self._decode(RECORD.unpack_from(self._mmap, HEADER.size + i * RECORD.size))
+
+    def __iter__(self) -> Iterator[Dict]:
+        for i in range(self._count):
+            yield self._decode(RECORD.unpack_from(self._mmap, HEADER.size + i * RECORD.size))
+
+    def salary(self, i: int) -> Optional[float]:
+        """
+        Числовая зарплата записи без декодирования строк
+        """
+        if i < 0:
+            i += self._count
+        if not 0 <= i < self._count:
+            raise IndexError("индекс записи вне снимка")
+        return self._salary(i)
+
+    def top_by_salary(self, n: int) -> List[Dict]:
+        """
+        Возвращает n записей с самой высокой зарплатой. Перебирается только колонка
+        зарплат, строки декодируются лишь у выбранных записей
+        """
+        salaries = (self._salary(i) for i in range(self._count))
+        top = heapq.nlargest(n, enumerate(salaries), key=lambda item: -math.inf if item[1] is None else item[1])
+        return [self[i] for i, _ in top]
+
+    def filter_by_salary(self, min_salary: Optional[float] = None, max_salary: Optional[float] = None) -> List[Dict]:
+        """
+        Записи с зарплатой в диапазоне (границы включительно); записи без зарплаты не попадают
+        """
+        result = []
+        for i in range(self._count):
+            salary = self._salary(i)
+            if salary is None:
+                continue
+            if min_salary is not None and salary < min_salary:
+                continue
+            if max_salary is not None and salary > max_salary:
+                continue
+            result.append(self[i])
+        return result
+
+    def close(self) -> None:
+        self._mmap.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def _salary(self, i: int) -> Optional[float]:
+        # Без проверки границ: вызывается в циклах по заведомо допустимым номерам
+        value = SALARY_MID.unpack_from(self._mmap, HEADER.size + i * RECORD.size + SALARY_MID_OFFSET)[0]
+        return None if math.isnan(value) else value
+
+    def _string(self, offset: int, length: int) -> Optional[str]:
+        if length == NONE_LENGTH:
+            return None
+        start = self._heap + offset
+        return self._mmap[start:start + length].decode("utf-8")
+
+    def _decode(self, row: tuple) -> Dict:
+        mask = row[0]
+        strings = {key: self._string(row[1 + 2 * j], row[2 + 2 * j]) for j, key in enumerate(STRING_FIELDS)}
+        numbers = dict(zip(NUMBER_FIELDS, row[15:18]))
+        gross = row[18]
+
+        record: Dict[str, Any] = {}
+        for key in FIELDS:
+            if not _has(mask, key):
+                continue
+            if key in strings:
+                record[key] = strings[key]
+            elif key == "gross":
+                record[key] = None if gross < 0 else bool(gross)
+            else:
+                record[key] = _from_float(numbers[key])
+
+        extra = self._string(row[13], row[14])
+        if extra is not None:
+            record.update(json.loads(extra))
+        return record
+
+
+def export_snapshot(storage: BaseStorage, filename: str) -> int:
+    """
+    Сохраняет содержимое хранилища (например, JSONStorage) в снимок
+    :return: количество записей
+    """
+    return Snapshot.write(filename, storage.iter_vacancies())
+
+
+def import_snapshot(filename: str, storage: BaseStorage) -> int:
+    """
+    Загружает записи снимка в хранилище
+    :return: результат storage.add_vacancies
+    """
+    with Snapshot(filename) as snapshot:
+        return storage.add_vacancies(iter(snapshot))
+
+
+def _has(mask: int, key: str) -> bool:
+    return bool(mask & BITS[key])
+
+
+def _fits(key: str, value) -> bool:
+    # Значения неожиданного типа сохраняются вместе с прочими полями в JSON
+    if value is None:
+        return True
+    if key == "gross":
+        return isinstance(value, bool)
+    if key in NUMBER_FIELDS:
+        return isinstance(value, (int, float)) and not isinstance(value, bool)
+    return isinstance(value, str)
+
+
+def _to_float(value) -> float:
+    return NAN if value is None else float(value)
+
+
+def _from_float(value: float):
+    if math.isnan(value):
+        return None
+    return int(value) if value.is_integer() else value
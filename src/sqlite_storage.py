@@ -0,0 +1,220 @@
+import json
+import re
+import sqlite3
+from typing import Dict, Iterable, Iterator, List, Optional, Set
+
+from src.base_storage import BaseStorage
+from src.helpers import record_salary
+from src.text_index import OR_RE, stem
+
+WORD_RE = re.compile(r"\w+")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS vacancies (
+    id INTEGER PRIMARY KEY,
+    url TEXT NOT NULL UNIQUE,
+    name TEXT,
+    description TEXT,
+    salary_value REAL,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_vacancies_salary ON vacancies(salary_value);
+CREATE VIRTUAL TABLE IF NOT EXISTS vacancies_fts USING fts5(
+    name, description, content='vacancies', content_rowid='id'
+);
+CREATE TRIGGER IF NOT EXISTS vacancies_ai AFTER INSERT ON vacancies BEGIN
+    INSERT INTO vacancies_fts(rowid, name, description) VALUES (new.id, new.name, new.description);
+END;
+CREATE TRIGGER IF NOT EXISTS vacancies_ad AFTER DELETE ON vacancies BEGIN
+    INSERT INTO vacancies_fts(vacancies_fts, rowid, name, description)
+    VALUES ('delete', old.id, old.name, old.description);
+END;
+CREATE TRIGGER IF NOT EXISTS vacancies_au AFTER UPDATE ON vacancies BEGIN
+    INSERT INTO vacancies_fts(vacancies_fts, rowid, name, description)
+    VALUES ('delete', old.id, old.name, old.description);
+    INSERT INTO vacancies_fts(rowid, name, description) VALUES (new.id, new.name, new.description);
+END;
+"""
+
+
+class SQLiteStorage(BaseStorage):
+    """
+    Хранилище в локальной базе SQLite.
+    Запись вакансии хранится целиком в колонке data (в том же виде, что и в JSONStorage),
+    а для запросов рядом лежат URL с уникальным индексом, числовая зарплата с индексом
+    и полнотекстовый индекс FTS5 по названию и описанию.
+    Запрос по ключевым словам разбирается как в JSONStorage: слова группы ищутся все сразу,
+    группы через OR/ИЛИ/| - любая из них, от слов запроса отбрасываются окончания.
+    Отличия от JSONStorage: FTS5 индексирует слова целиком, поэтому основа ищется как префикс
+    ("java" находит и "javascript"), ё и е различаются, а результаты упорядочены по bm25
+    (rank FTS5), а не по частоте слов запроса.
+    """
+
+    def __init__(self, filename: str = "vacancies.db"):
+        self._filename = filename
+        self._conn = sqlite3.connect(filename)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+
+    def add_vacancy(self, vacancy: Dict) -> None:
+        self.add_vacancies([vacancy])
+
+    def add_vacancies(self, vacancies: Iterable[Dict]) -> int:
+        """
+        Добавляет пачку вакансий в одной транзакции
+        :param vacancies: вакансии (можно передать генератор)
+        :return: количество добавленных вакансий (дубликаты по URL пропускаются)
+        """
+        with self._conn:
+            cursor = self._conn.executemany(
+                "INSERT OR IGNORE INTO vacancies (url, name, description, salary_value, data) VALUES (?, ?, ?, ?, ?)",
+                (self._to_row(vacancy) for vacancy in vacancies),
+            )
+            return cursor.rowcount
+
+    def upsert_vacancies(self, vacancies: Iterable[Dict]) -> int:
+        """
+        Добавляет новые вакансии и обновляет существующие (по URL) в одной транзакции
+        :param vacancies: вакансии для сохранения
+        :return: количество добавленных или измененных вакансий
+        """
+        with self._conn:
+            cursor = self._conn.executemany(
+                """
+                INSERT INTO vacancies (url, name, description, salary_value, data) VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT(url) DO UPDATE SET
+                    name = excluded.name,
+                    description = excluded.description,
+                    salary_value = excluded.salary_value,
+                    data = excluded.data
+                WHERE data != excluded.data
+                """,
+                (self._to_row(vacancy) for vacancy in vacancies),
+            )
+            return cursor.rowcount
+
+    def get_vacancies(self) -> List[Dict]:
+        rows = self._conn.execute("SELECT data FROM vacancies ORDER BY id")
+        return [json.loads(data) for (data,) in rows]
+
+    def iter_vacancies(self) -> Iterator[Dict]:
+        # Курсор отдает строки по мере чтения, без загрузки всей таблицы
+        for (data,) in self._conn.execute("SELECT data FROM vacancies ORDER BY id"):
+            yield json.loads(data)
+
+    def get_vacancy(self, url: str) -> Optional[Dict]:
+        row = self._conn.execute("SELECT data FROM vacancies WHERE url = ?", (url,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def existing_urls(self, urls: Iterable[str]) -> Set[str]:
+        urls = list(dict.fromkeys(urls))
+        found: Set[str] = set()
+        # Число параметров запроса ограничено (999 в старых версиях SQLite), поэтому URL идут частями
+        for start in range(0, len(urls), 500):
+            chunk = urls[start:start + 500]
+            placeholders = ", ".join("?" * len(chunk))
+            rows = self._conn.execute(f"SELECT url FROM vacancies WHERE url IN ({placeholders})", chunk)
+            found.update(url for (url,) in rows)
+        return found
+
+    def delete_vacancy(self, url: str) -> bool:
+        with self._conn:
+            cursor = self._conn.execute("DELETE FROM vacancies WHERE url = ?", (url,))
+            return cursor.rowcount > 0
+
+    def delete_vacancies(self, urls: Iterable[str]) -> int:
+        with self._conn:
+            cursor = self._conn.executemany("DELETE FROM vacancies WHERE url = ?", ((url,) for url in urls))
+            return cursor.rowcount
+
+    def filter_vacancies(
+        self,
+        keyword: Optional[str] = None,
+        min_salary: Optional[int] = None,
+        max_salary: Optional[int] = None,
+    ) -> List[Dict]:
+        """
+        Фильтрует вакансии по заданным параметрам с помощью индексов
+        :param keyword: ключевые слова для поиска в названии и описании (ищутся все слова)
+        :param min_salary: минимальная зарплата
+        :param max_salary: максимальная зарплата
+        :return: отфильтрованный список вакансий; при поиске по словам - по убыванию релевантности
+        """
+        query = "SELECT v.data FROM vacancies v"
+        conditions = []
+        params: List = []
+
+        if keyword:
+            match = self._match_expression(keyword)
+            # В запросе нет ни одного слова (например, "+++") - искать нечего, как и в JSONStorage
+            if not match:
+                return []
+            query += " JOIN vacancies_fts f ON f.rowid = v.id"
+            conditions.append("vacancies_fts MATCH ?")
+            params.append(match)
+
+        if min_salary is not None:
+            conditions.append("v.salary_value >= ?")
+            params.append(min_salary)
+
+        if max_salary is not None:
+            conditions.append("v.salary_value <= ?")
+            params.append(max_salary)
+
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        # rank - встроенная в FTS5 оценка bm25: чем меньше, тем релевантнее
+        query += " ORDER BY f.rank, v.id" if keyword else " ORDER BY v.id"
+
+        return [json.loads(data) for (data,) in self._conn.execute(query, params)]
+
+    def top_by_salary(self, n: int) -> List[Dict]:
+        """
+        Возвращает n вакансий с самой высокой зарплатой по индексу зарплат
+        :param n: количество вакансий
+        :return: вакансии по убыванию зарплаты, вакансии без зарплаты - в конце
+        """
+        rows = self._conn.execute(
+            "SELECT data FROM vacancies WHERE salary_value IS NOT NULL ORDER BY salary_value DESC LIMIT ?", (n,)
+        ).fetchall()
+        if len(rows) < n:
+            rows += self._conn.execute(
+                "SELECT data FROM vacancies WHERE salary_value IS NULL ORDER BY id LIMIT ?", (n - len(rows),)
+            ).fetchall()
+        return [json.loads(data) for (data,) in rows]
+
+    def close(self) -> None:
+        self._conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    @staticmethod
+    def _match_expression(keyword: str) -> str:
+        """
+        Переводит запрос в выражение FTS5: основа каждого слова - префикс,
+        чтобы "разработчиками" находил "разработчик", группы объединяются через OR
+        :param keyword: запрос в формате InvertedIndex.search
+        :return: выражение для MATCH или пустая строка, если в запросе нет слов
+        """
+        groups = []
+        for group in OR_RE.split(keyword):
+            # ё не заменяем: токенизатор FTS5 хранит ее как есть
+            terms = dict.fromkeys(stem(word) for word in WORD_RE.findall(group.casefold()))
+            if terms:
+                groups.append("(" + " ".join(f'"{term}"*' for term in terms) + ")")
+        return " OR ".join(groups)
+
+    @staticmethod
+    def _to_row(vacancy: Dict) -> tuple:
+        return (
+            vacancy["url"],
+            vacancy.get("name"),
+            vacancy.get("description"),
+            record_salary(vacancy),
+            json.dumps(vacancy, ensure_ascii=False),
+        )
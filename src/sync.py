@@ -0,0 +1,105 @@
+import json
+import os
+from datetime import datetime
+from typing import Dict, Optional
+
+from api.hh_api import HeadHunterAPI
+from src.base_storage import BaseStorage
+from src.vacancy import Vacancy
+
+# Формат дат в ответах hh.ru: 2024-02-16T14:58:28+0300
+HH_DATE_FORMAT = "%Y-%m-%dT%H:%M:%S%z"
+
+
+class IncrementalSync:
+    """
+    Инкрементальная синхронизация: для каждого запроса запоминается дата публикации
+    самой свежей полученной вакансии, и следующий запуск запрашивает только более новые.
+    API отдает не больше 2000 вакансий на запрос, поэтому обрезанная выдача догружается
+    окнами по дате публикации: следующее окно заканчивается (date_to) на самой старой
+    вакансии предыдущего, пока очередное окно не будет получено целиком.
+    Отметка сдвигается, только если все окна получены целиком: при ошибке на странице
+    следующий запуск повторит тот же интервал, иначе пропущенные вакансии уже никогда
+    не были бы запрошены.
+    """
+
+    def __init__(self, api: HeadHunterAPI, storage: BaseStorage, state_file: str = "sync_state.json"):
+        self._api = api
+        self._storage = storage
+        self._state_file = state_file
+        self._state = self._load_state()
+
+    def sync(self, query: str) -> int:
+        """
+        Загружает вакансии, опубликованные после прошлой синхронизации, и сохраняет их
+        :param query: поисковый запрос
+        :return: количество добавленных или обновленных вакансий
+        """
+        filters = {"order_by": "publication_time"}
+        since = self._state.get(query)
+        if since:
+            filters["date_from"] = since
+
+        changed = 0
+        latest: Optional[str] = None
+        while True:
+            result = self._api.search(query, filters=dict(filters))
+            items = [item for item in result.items if isinstance(item, dict)]
+            if items:
+                changed += self._storage.upsert_vacancies(Vacancy.from_hh_item(item).to_record() for item in items)
+                # Окна идут от новых к старым: самая свежая вакансия всегда в первом
+                latest = latest or self._latest_published(items)
+            if result.complete:
+                break
+
+            # Ошибка загрузки: повторять окно бессмысленно, отметку не сдвигаем
+            if result.failed_pages or not result.finished:
+                return changed
+            # Выдача обрезана лимитом: догружаем более старую часть интервала.
+            # Граница включается, поэтому вакансии той же секунды не теряются (upsert их не задвоит)
+            oldest = self._oldest_published(items)
+            date_to = filters.get("date_to")
+            if oldest is None or (date_to and _parse_date(oldest) >= _parse_date(date_to)):
+                # Окно больше не сужается: за одну секунду опубликовано больше, чем отдает API
+                return changed
+            filters["date_to"] = oldest
+
+        if latest and (not since or _parse_date(latest) > _parse_date(since)):
+            self._state[query] = latest
+            self._save_state()
+
+        return changed
+
+    def last_synced(self, query: str) -> Optional[str]:
+        return self._state.get(query)
+
+    @staticmethod
+    def _latest_published(items) -> Optional[str]:
+        # Сравниваем даты, а не строки: у вакансий могут быть разные часовые пояса
+        dates = [item["published_at"] for item in items if item.get("published_at")]
+        return max(dates, key=_parse_date, default=None)
+
+    @staticmethod
+    def _oldest_published(items) -> Optional[str]:
+        dates = [item["published_at"] for item in items if item.get("published_at")]
+        return min(dates, key=_parse_date, default=None)
+
+    def _load_state(self) -> Dict[str, str]:
+        try:
+            with open(self._state_file, "r", encoding="utf-8") as file:
+                state = json.load(file)
+                if isinstance(state, dict):
+                    return state
+                return {}
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+
+    def _save_state(self) -> None:
+        tmp_file = f"{self._state_file}.tmp"
+        with open(tmp_file, "w", encoding="utf-8") as file:
+            json.dump(self._state, file, ensure_ascii=False, indent=4)
+        os.replace(tmp_file, self._state_file)
+
+
+def _parse_date(value: str) -> datetime:
+    return datetime.strptime(value, HH_DATE_FORMAT)
@@ -0,0 +1,193 @@
+import json
+import re
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from src.file_lock import atomic_write_json
+
+WORD_RE = re.compile(r"\w+")
+# Запрос "python OR java" ищет любое из слов, "python django" - оба сразу
+OR_RE = re.compile(r"\s+(?:OR|ИЛИ)\s+|\|")
+CYRILLIC_RE = re.compile(r"[а-я]")
+
+# Упрощенный стемминг: отбрасываем самое длинное из типичных окончаний
+RUSSIAN_ENDINGS = sorted(
+    [
+        "иями", "ями", "ами", "ого", "его", "ому", "ему", "ыми", "ими", "ией", "ешь", "ете", "ите",
+        "ая", "яя", "ое", "ее", "ые", "ие", "ой", "ей", "ий", "ый", "ом", "ем", "ам", "ям", "ах", "ях",
+        "ов", "ев", "ую", "юю", "ия", "ья", "ью", "ть", "ти", "ет", "ют", "ут", "ит", "ат", "ят", "им",
+        "а", "я", "о", "е", "ы", "и", "у", "ю", "ь", "й",
+    ],
+    key=len,
+    reverse=True,
+)
+# Конечное "e" тоже отбрасываем: иначе "service" и "services" (основа "servic") не совпадут
+ENGLISH_ENDINGS = ["ing", "ers", "er", "ed", "es", "s", "e"]
+MIN_STEM = 3
+# Версия формата сохраненного индекса: меняется вместе с правилами стемминга,
+# чтобы индекс, построенный по старым правилам, был перестроен
+INDEX_VERSION = 3
+
+
+def stem(word: str) -> str:
+    endings = RUSSIAN_ENDINGS if CYRILLIC_RE.search(word) else ENGLISH_ENDINGS
+    for ending in endings:
+        if word.endswith(ending) and len(word) - len(ending) >= MIN_STEM:
+            # Двойное "s" - часть основы ("class", "process"), а не окончание множественного числа,
+            # иначе "process" и "processes" дали бы разные основы
+            if ending == "s" and word.endswith("ss"):
+                return word
+            return word[: -len(ending)]
+    return word
+
+
+def tokenize(text: Optional[str]) -> List[str]:
+    """
+    Разбивает текст на основы слов: без учета регистра, ё приравнивается к е
+    :param text: исходный текст
+    :return: список основ в порядке следования
+    """
+    if not text:
+        return []
+    return [stem(word) for word in WORD_RE.findall(text.casefold().replace("ё", "е"))]
+
+
+def matches(query: str, text: Optional[str]) -> bool:
+    """
+    Проверяет текст на соответствие запросу по тем же правилам, что и InvertedIndex.search,
+    но без индекса - для потоковой фильтрации
+    """
+    terms = set(tokenize(text))
+    for group in OR_RE.split(query):
+        group_terms = set(tokenize(group))
+        if group_terms and group_terms <= terms:
+            return True
+    return False
+
+
+def relevance(query: str, text: Optional[str]) -> int:
+    """
+    Счет текста по запросу - тот же, по которому InvertedIndex.search упорядочивает результаты:
+    наибольшая по группам запроса суммарная частота слов группы
+    :return: счет или 0, если текст не подходит под запрос
+    """
+    frequencies: Dict[str, int] = defaultdict(int)
+    for term in tokenize(text):
+        frequencies[term] += 1
+    best = 0
+    for group in OR_RE.split(query):
+        group_terms = set(tokenize(group))
+        if group_terms and all(term in frequencies for term in group_terms):
+            best = max(best, sum(frequencies[term] for term in group_terms))
+    return best
+
+
+class InvertedIndex:
+    """
+    Обратный индекс: основа слова -> {id документа: сколько раз основа в нем встречается}
+    """
+
+    def __init__(self):
+        self._postings: Dict[str, Dict[str, int]] = defaultdict(dict)
+        self._documents: Dict[str, Dict[str, int]] = {}
+        # Порядковый номер добавления документа: при равном счете результаты идут в порядке добавления.
+        # Номера только растут, поэтому удаление документа не требует перенумерации
+        self._order: Dict[str, int] = {}
+        self._next_order = 0
+
+    def __len__(self) -> int:
+        return len(self._documents)
+
+    def add(self, doc_id: str, text: str) -> None:
+        self.remove(doc_id)
+        frequencies: Dict[str, int] = defaultdict(int)
+        for term in tokenize(text):
+            frequencies[term] += 1
+        self._set(doc_id, dict(frequencies))
+
+    def remove(self, doc_id: str) -> None:
+        self._order.pop(doc_id, None)
+        for term in self._documents.pop(doc_id, {}):
+            postings = self._postings[term]
+            postings.pop(doc_id, None)
+            if not postings:
+                del self._postings[term]
+
+    def search(self, query: str) -> List[str]:
+        """
+        Ищет документы по запросу: слова внутри группы объединяются через И, группы - через OR
+        :param query: поисковый запрос
+        :return: id документов по убыванию суммарной частоты найденных слов
+        """
+        return [doc_id for doc_id, _ in self.search_with_scores(query)]
+
+    def search_with_scores(self, query: str) -> List[Tuple[str, int]]:
+        """
+        То же, что search, но вместе со счетом каждого документа (тем же, что дает relevance()),
+        чтобы объединять результаты нескольких индексов без повторного разбора текстов
+        :param query: поисковый запрос
+        :return: пары (id документа, счет) по убыванию счета
+        """
+        scores: Dict[str, int] = {}
+        for group in OR_RE.split(query):
+            terms = set(tokenize(group))
+            if not terms:
+                continue
+            # Начинаем пересечение с самого короткого списка
+            postings = sorted((self._postings.get(term, {}) for term in terms), key=len)
+            matched = set(postings[0])
+            for other in postings[1:]:
+                matched.intersection_update(other)
+            for doc_id in matched:
+                score = sum(posting[doc_id] for posting in postings)
+                scores[doc_id] = max(scores.get(doc_id, 0), score)
+
+        order = self._order
+        return [
+            (doc_id, scores[doc_id]) for doc_id in sorted(scores, key=lambda doc_id: (-scores[doc_id], order[doc_id]))
+        ]
+
+    @classmethod
+    def build(cls, documents: Iterable) -> "InvertedIndex":
+        """
+        Строит индекс по парам (id документа, текст)
+        """
+        index = cls()
+        for doc_id, text in documents:
+            index.add(doc_id, text)
+        return index
+
+    def save(self, filename: str, signature: Optional[List] = None) -> None:
+        """
+        Сохраняет индекс на диск
+        :param filename: файл индекса
+        :param signature: отметка версии данных, по которой индекс был построен
+        """
+        data = {"version": INDEX_VERSION, "signature": signature, "documents": self._documents}
+        atomic_write_json(filename, data, ensure_ascii=False)
+
+    @classmethod
+    def load(cls, filename: str, signature: Optional[List] = None) -> Optional["InvertedIndex"]:
+        """
+        Загружает индекс, если он построен по той же версии данных
+        :return: индекс или None, если файла нет, он устарел или сохранен в другом формате
+        """
+        try:
+            with open(filename, "r", encoding="utf-8") as file:
+                data = json.load(file)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+        if not isinstance(data, dict) or data.get("version") != INDEX_VERSION or data.get("signature") != signature:
+            return None
+
+        index = cls()
+        for doc_id, frequencies in data["documents"].items():
+            index._set(doc_id, frequencies)
+        return index
+
+    def _set(self, doc_id: str, frequencies: Dict[str, int]) -> None:
+        self._documents[doc_id] = frequencies
+        self._order[doc_id] = self._next_order
+        self._next_order += 1
+        for term, count in frequencies.items():
+            self._postings[term][doc_id] = count
@@ -1,13 +1,110 @@
+import re
+from typing import Dict, Optional, Union
+
+# Строка зарплаты в том виде, в каком ее формирует Vacancy: "100000 - 150000 RUB", "до 150000 RUB", "100000 RUB"
+DISPLAY_SALARY_RE = re.compile(r"^(до )?(-?\d+(?:\.\d+)?)(?: - (-?\d+(?:\.\d+)?))? ([A-Z]{3})$")
+
+
 class Vacancy:
-    __slots__ = ("name", "url", "salary", "description", "_salary")
+    __slots__ = (
+        "name", "url", "salary", "description", "_salary", "salary_from", "salary_to", "currency", "gross", "area",
+    )
 
-    def __init__(self, name: str, url: str, salary: str, description: str):
-        self._salary = None
+    def __init__(
+        self,
+        name: Optional[str],
+        url: Optional[str],
+        salary: Union[str, Dict, None],
+        description: Optional[str],
+        area: Optional[str] = None,
+    ):
+        self.area = area
+        self._salary: Optional[float] = None
+        self.salary_from: Optional[float] = None
+        self.salary_to: Optional[float] = None
+        self.currency: Optional[str] = None
+        self.gross: Optional[bool] = None
         self.name = name or "Не указано"
         self.url = url or "Не указано"
         self.salary = self._format_salary(salary)
         self.description = description or "Описание отсутствует"
 
+    @classmethod
+    def from_hh_item(cls, data: dict) -> "Vacancy":
+        """
+        Создает вакансию из элемента выдачи API hh.ru
+        :param data: элемент списка items из ответа API
+        :return: объект вакансии
+        """
+        return cls(
+            name=data.get('name', 'Не указано'),
+            url=data.get('alternate_url', 'Не указано'),
+            salary=data.get('salary', 'Зарплата не указана'),  # Передаем словарь зарплаты
+            description=(data.get('snippet') or {}).get('responsibility', 'Описание отсутствует'),
+            area=(data.get('area') or {}).get('name'),
+        )
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "Vacancy":
+        """
+        Создает вакансию из сохраненной записи, игнорируя дополнительные поля
+        :param data: запись из хранилища
+        :return: объект вакансии
+        """
+        if "salary_from" in data or "salary_to" in data:
+            # Числовые поля сохранены вместе с записью - строку разбирать не нужно
+            salary = {
+                "from": data.get("salary_from"),
+                "to": data.get("salary_to"),
+                "currency": data.get("currency") or "RUB",
+                "gross": data.get("gross"),
+            }
+        else:
+            salary = _parse_display_salary(data.get('salary'))
+
+        return cls(
+            name=data.get('name'),
+            url=data.get('url'),
+            salary=salary,
+            description=data.get('description'),
+            area=data.get('area'),
+        )
+
+    @classmethod
+    def from_record(cls, data: dict) -> "Vacancy":
+        """
+        Быстро восстанавливает вакансию из записи, сохраненной через to_record():
+        строка и числовые поля зарплаты уже нормализованы, поэтому _format_salary не вызывается.
+        Записи старого формата (без salary_mid) разбираются через from_dict
+        :param data: запись из хранилища
+        :return: объект вакансии
+        """
+        if "salary_mid" not in data:
+            return cls.from_dict(data)
+
+        vacancy = object.__new__(cls)
+        vacancy.name = data.get("name") or "Не указано"
+        vacancy.url = data.get("url") or "Не указано"
+        vacancy.salary = data.get("salary") or "Зарплата не указана"
+        vacancy.description = data.get("description") or "Описание отсутствует"
+        vacancy._salary = data["salary_mid"]
+        vacancy.salary_from = data.get("salary_from")
+        vacancy.salary_to = data.get("salary_to")
+        vacancy.currency = data.get("currency")
+        vacancy.gross = data.get("gross")
+        vacancy.area = data.get("area")
+        return vacancy
+
+    @classmethod
+    def from_records(cls, records) -> list:
+        """
+        Восстанавливает список вакансий из записей хранилища
+        :param records: записи (можно передать генератор)
+        :return: список объектов Vacancy
+        """
+        from_record = cls.from_record
+        return [from_record(record) for record in records]
+
     def __eq__(self, other):
         return self.salary == other.salary
 
@@ -26,12 +123,16 @@ class Vacancy:
         return self_numeric_salary < other_numeric_salary
 
 
-    def _format_salary(self, salary: str) -> str:
+    def _format_salary(self, salary: Union[str, Dict, None]) -> str:
         try:
             if isinstance(salary, dict):
                 salary_from = salary.get("from", None)
                 salary_to = salary.get("to", None)
                 currency = salary.get("currency", "RUB")
+                self.salary_from = salary_from or None
+                self.salary_to = salary_to or None
+                self.currency = currency if salary_from or salary_to else None
+                self.gross = salary.get("gross")
 
                 if salary_from and salary_to:
                     self._salary = (salary_from + salary_to) / 2  # Среднее значение
@@ -63,6 +164,8 @@ class Vacancy:
                         try:
                             numeric_value = float(salary_value)
                             self._salary = numeric_value
+                            self.salary_from = numeric_value
+                            self.currency = "RUB"
                             # Форматируем число без десятичных знаков, если оно целое
                             formatted_value = int(numeric_value) if numeric_value.is_integer() else numeric_value
                             return f"{formatted_value} RUB"
@@ -73,6 +176,8 @@ class Vacancy:
                         try:
                             numeric_value = float(salary.replace(' ', ''))
                             self._salary = numeric_value
+                            self.salary_from = numeric_value
+                            self.currency = "RUB"
                             formatted_value = int(numeric_value) if numeric_value.is_integer() else numeric_value
                             return f"{formatted_value} RUB"
                         except ValueError:
@@ -83,6 +188,7 @@ class Vacancy:
                     return "Зарплата не указана"
         except Exception:
             self._salary = None
+            self.salary_from = self.salary_to = self.currency = self.gross = None
             return "Зарплата не указана"
 
     def _extract_numeric_salary(self):
@@ -96,3 +202,44 @@ class Vacancy:
             "salary": self.salary,
             "description": self.description,
         }
+
+    def to_record(self) -> dict:
+        """
+        Запись для хранилища: поля to_dict и числовые поля зарплаты,
+        чтобы при загрузке, сортировке и фильтрации не разбирать строку
+        """
+        record = self.to_dict()
+        record.update(
+            salary_from=self.salary_from,
+            salary_to=self.salary_to,
+            currency=self.currency,
+            gross=self.gross,
+            salary_mid=self._salary,
+            area=self.area,
+        )
+        return record
+
+
+def _parse_display_salary(salary):
+    # Записи, сохраненные до появления числовых полей, содержат только строку зарплаты
+    if not isinstance(salary, str):
+        return salary
+    match = DISPLAY_SALARY_RE.match(salary.strip())
+    if not match:
+        return salary
+
+    up_to, first, second, currency = match.groups()
+    first = _to_number(first)
+    if not first and not second:
+        # Нулевую зарплату словарь hh.ru считает неуказанной, оставляем строку как есть
+        return salary
+    if up_to:
+        return {"to": first, "currency": currency}
+    if second:
+        return {"from": first, "to": _to_number(second), "currency": currency}
+    return {"from": first, "currency": currency}
+
+
+def _to_number(value: str):
+    number = float(value)
+    return int(number) if number.is_integer() else number
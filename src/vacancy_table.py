@@ -0,0 +1,283 @@
+import heapq
+import math
+from array import array
+from itertools import accumulate
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from src.text_index import matches
+from src.vacancy import Vacancy
+
+NAN = float("nan")
+
+
+class StringPool:
+    """
+    Строки, склеенные в одну большую строку, и массив смещений их границ
+    """
+
+    def __init__(self, values: List[str]):
+        self._data = "".join(values)
+        self._offsets = array("q", accumulate((len(value) for value in values), initial=0))
+
+    def __len__(self) -> int:
+        return len(self._offsets) - 1
+
+    def __getitem__(self, i: int) -> str:
+        return self._data[self._offsets[i]:self._offsets[i + 1]]
+
+
+class Categories:
+    """
+    Словарное кодирование повторяющихся значений: в колонке хранятся номера, сами значения - один раз
+    """
+
+    def __init__(self):
+        self.values: List[Optional[str]] = []
+        self.codes: Dict[Optional[str], int] = {}
+        self.column = array("l")
+
+    def append(self, value: Optional[str]) -> None:
+        code = self.codes.get(value)
+        if code is None:
+            code = self.codes[value] = len(self.values)
+            self.values.append(value)
+        self.column.append(code)
+
+    def code(self, value: Optional[str]) -> int:
+        return self.codes.get(value, -1)
+
+    def __getitem__(self, i: int) -> Optional[str]:
+        return self.values[self.column[i]]
+
+
+class VacancyRow:
+    """
+    Легкое представление строки таблицы: значения читаются из колонок по требованию
+    """
+
+    __slots__ = ("_table", "_i")
+
+    def __init__(self, table: "VacancyTable", i: int):
+        self._table = table
+        self._i = i
+
+    def __eq__(self, other):
+        return isinstance(other, VacancyRow) and self._table is other._table and self._i == other._i
+
+    def __repr__(self):
+        return f"VacancyRow({self._i}, {self.url!r})"
+
+    @property
+    def index(self) -> int:
+        return self._i
+
+    @property
+    def name(self) -> str:
+        return self._table._names[self._i]
+
+    @property
+    def url(self) -> str:
+        return self._table._urls[self._i]
+
+    @property
+    def description(self) -> str:
+        return self._table._descriptions[self._i]
+
+    @property
+    def salary(self) -> str:
+        return self._table._salary_display[self._i]
+
+    @property
+    def salary_from(self) -> Optional[float]:
+        return _none_if_nan(self._table._salary_from[self._i])
+
+    @property
+    def salary_to(self) -> Optional[float]:
+        return _none_if_nan(self._table._salary_to[self._i])
+
+    @property
+    def salary_mid(self) -> Optional[float]:
+        return _none_if_nan(self._table._salary_mid[self._i])
+
+    @property
+    def currency(self) -> Optional[str]:
+        return self._table._currency[self._i]
+
+    @property
+    def area(self) -> Optional[str]:
+        return self._table._area[self._i]
+
+    @property
+    def gross(self) -> Optional[bool]:
+        value = self._table._gross[self._i]
+        return None if value < 0 else bool(value)
+
+    def to_record(self) -> Dict:
+        return {
+            "name": self.name,
+            "url": self.url,
+            "salary": self.salary,
+            "description": self.description,
+            "salary_from": self.salary_from,
+            "salary_to": self.salary_to,
+            "currency": self.currency,
+            "gross": self.gross,
+            "salary_mid": self.salary_mid,
+            "area": self.area,
+        }
+
+    def to_vacancy(self) -> Vacancy:
+        return Vacancy.from_record(self.to_record())
+
+
+class VacancyTable:
+    """
+    Поколоночное хранение большого набора вакансий в памяти.
+    Зарплаты лежат в array('d') (NaN - не указана), валюта, регион и строка зарплаты
+    закодированы словарем, названия, ссылки и описания склеены в пулы строк.
+    Вместо миллиона словарей и объектов Vacancy - десяток плоских массивов.
+    """
+
+    def __init__(self):
+        self._names = StringPool([])
+        self._urls = StringPool([])
+        self._descriptions = StringPool([])
+        self._salary_display = Categories()
+        self._salary_from = array("d")
+        self._salary_to = array("d")
+        self._salary_mid = array("d")
+        self._currency = Categories()
+        self._area = Categories()
+        self._gross = array("b")
+
+    @classmethod
+    def from_records(cls, records: Iterable[Dict], text_columns: bool = True) -> "VacancyTable":
+        """
+        Строит таблицу из записей хранилища за один проход
+        :param records: записи (например, storage.iter_vacancies())
+        :param text_columns: строить ли колонки названий, ссылок, описаний и строк зарплаты.
+                             Без них таблица занимает в разы меньше памяти, но годится только для
+                             числовых колонок и категорий: текстовые поля строк и поиск по словам недоступны
+        :return: таблица вакансий
+        """
+        table = cls()
+        names: List[str] = []
+        urls: List[str] = []
+        descriptions: List[str] = []
+
+        for record in records:
+            if "salary_mid" not in record:
+                # Запись старого формата: числовые поля получаем через Vacancy
+                record = Vacancy.from_dict(record).to_record()
+            if text_columns:
+                names.append(record.get("name") or "")
+                urls.append(record.get("url") or "")
+                descriptions.append(record.get("description") or "")
+                table._salary_display.append(record.get("salary"))
+            table._salary_from.append(_nan_if_none(record.get("salary_from")))
+            table._salary_to.append(_nan_if_none(record.get("salary_to")))
+            table._salary_mid.append(_nan_if_none(record.get("salary_mid")))
+            table._currency.append(record.get("currency"))
+            table._area.append(record.get("area"))
+            gross = record.get("gross")
+            table._gross.append(-1 if gross is None else int(bool(gross)))
+
+        table._names = StringPool(names)
+        table._urls = StringPool(urls)
+        table._descriptions = StringPool(descriptions)
+        return table
+
+    @classmethod
+    def from_vacancies(cls, vacancies: Iterable[Vacancy]) -> "VacancyTable":
+        return cls.from_records(vacancy.to_record() for vacancy in vacancies)
+
+    def __len__(self) -> int:
+        return len(self._salary_mid)
+
+    def __getitem__(self, i: int) -> VacancyRow:
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError("индекс строки вне таблицы")
+        return VacancyRow(self, i)
+
+    def __iter__(self) -> Iterator[VacancyRow]:
+        return (VacancyRow(self, i) for i in range(len(self)))
+
+    def filter(
+        self,
+        min_salary: Optional[float] = None,
+        max_salary: Optional[float] = None,
+        currency: Optional[str] = None,
+        area: Optional[str] = None,
+        keyword: Optional[str] = None,
+    ) -> List[VacancyRow]:
+        """
+        Отбирает строки по условиям. Условия проверяются по колонкам: сравниваются числа
+        и номера категорий, строки читаются только для поиска по словам
+        :return: подходящие строки в порядке таблицы
+        """
+        # Чистый Python без numpy: каждое условие - один проход по плоскому массиву
+        # уже отобранных номеров строк, поэтому следующие условия проверяют все меньше строк
+        rows: Iterable[int] = range(len(self))
+        if min_salary is not None:
+            # NaN не проходит ни одно сравнение, поэтому вакансии без зарплаты отсеиваются сами
+            mids = self._salary_mid
+            rows = [i for i in rows if mids[i] >= min_salary]
+        if max_salary is not None:
+            mids = self._salary_mid
+            rows = [i for i in rows if mids[i] <= max_salary]
+        if currency is not None:
+            code, column = self._currency.code(currency), self._currency.column
+            rows = [i for i in rows if column[i] == code]
+        if area is not None:
+            code, column = self._area.code(area), self._area.column
+            rows = [i for i in rows if column[i] == code]
+        if keyword:
+            rows = [i for i in rows if matches(keyword, f"{self._names[i]} {self._descriptions[i]}")]
+        return [VacancyRow(self, i) for i in rows]
+
+    def sort_by_salary(self, reverse: bool = True) -> List[VacancyRow]:
+        """
+        Сортирует строки по зарплате; строки без зарплаты всегда в конце
+        """
+        mids = self._salary_mid
+        salaried = [i for i in range(len(self)) if not math.isnan(mids[i])]
+        unsalaried = [i for i in range(len(self)) if math.isnan(mids[i])]
+        salaried.sort(key=mids.__getitem__, reverse=reverse)
+        return [VacancyRow(self, i) for i in salaried + unsalaried]
+
+    def top_by_salary(self, n: int) -> List[VacancyRow]:
+        """
+        Возвращает n строк с самой высокой зарплатой (куча размера n)
+        """
+        mids = self._salary_mid
+        rows = heapq.nlargest(n, range(len(self)), key=lambda i: -math.inf if math.isnan(mids[i]) else mids[i])
+        return [VacancyRow(self, i) for i in rows]
+
+    def salary_column(self, kind: str = "mid") -> array:
+        """
+        Колонка зарплат без копирования: "from", "to" или "mid", NaN - зарплата не указана
+        """
+        return {"from": self._salary_from, "to": self._salary_to, "mid": self._salary_mid}[kind]
+
+    def category_column(self, name: str) -> Tuple[array, List[Optional[str]]]:
+        """
+        Закодированная колонка "currency" или "area": номера значений по строкам и список значений
+        """
+        categories = {"currency": self._currency, "area": self._area}[name]
+        return categories.column, categories.values
+
+    def to_records(self) -> List[Dict]:
+        return [row.to_record() for row in self]
+
+    def to_vacancies(self) -> List[Vacancy]:
+        return [row.to_vacancy() for row in self]
+
+
+def _nan_if_none(value) -> float:
+    return NAN if value is None else float(value)
+
+
+def _none_if_nan(value: float) -> Optional[float]:
+    return None if math.isnan(value) else value
@@ -1,10 +1,24 @@
+import asyncio
+import gc
+import json
+import os
+import tempfile
+import threading
+import time
 import unittest
+import weakref
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 from unittest.mock import MagicMock, patch
+from urllib.parse import parse_qs, urlparse
 import logging
 
 import requests
 
+from api.async_hh_api import AsyncHeadHunterAPI
 from api.hh_api import HeadHunterAPI
+from api.rate_limiter import RateLimiter
+from api.response_cache import ResponseCache
 
 
 class TestHeadHunterAPI(unittest.TestCase):
@@ -13,7 +27,7 @@ class TestHeadHunterAPI(unittest.TestCase):
         # Настроим логирование для тестирования
         logging.basicConfig(level=logging.ERROR)
 
-    @patch("requests.get")
+    @patch("requests.Session.get")
     def test_get_vacancies(self, mock_get):
         # Создаём мок ответа
         mock_response = MagicMock()
@@ -38,14 +52,13 @@ class TestHeadHunterAPI(unittest.TestCase):
         mock_get.assert_called_once_with(
             self.api.base_url,
             params={"text": "python", "per_page": 100, "area": 1},
-            headers=self.api.headers,
         )
 
         # Проверяем результат
         self.assertEqual(len(result), 1)
         self.assertEqual(result[0]["name"], "Тестовая вакансия")
 
-    @patch("requests.get")
+    @patch("requests.Session.get")
     def test_get_vacancies_success(self, mock_get):
         # Успешный случай
         mock_response = MagicMock()
@@ -65,7 +78,7 @@ class TestHeadHunterAPI(unittest.TestCase):
         result = self.api.get_vacancies("python")
         self.assertEqual(len(result), 1)
 
-    @patch("requests.get")
+    @patch("requests.Session.get")
     def test_get_vacancies_error(self, mock_get):
         # Случай с ошибкой статуса
         mock_response = MagicMock()
@@ -75,7 +88,7 @@ class TestHeadHunterAPI(unittest.TestCase):
         result = self.api.get_vacancies("python")
         self.assertEqual(result, [])  # Проверяем пустой список
 
-    @patch("requests.get")
+    @patch("requests.Session.get")
     def test_get_vacancies_invalid_response(self, mock_get):
         # Случай с некорректным форматом ответа
         mock_response = MagicMock()
@@ -86,7 +99,7 @@ class TestHeadHunterAPI(unittest.TestCase):
         result = self.api.get_vacancies("python")
         self.assertEqual(result, [])  # Проверяем пустой список
 
-    @patch("requests.get")
+    @patch("requests.Session.get")
     def test_get_vacancies_no_items(self, mock_get):
         # Случай без вакансий в ответе
         mock_response = MagicMock()
@@ -97,10 +110,404 @@ class TestHeadHunterAPI(unittest.TestCase):
         result = self.api.get_vacancies("python")
         self.assertEqual(result, [])  # Проверяем пустой список
 
-    @patch("requests.get")
+    @patch("requests.Session.get")
     def test_get_vacancies_network_error(self, mock_get):
         # Случай с сетевой ошибкой
         mock_get.side_effect = requests.exceptions.RequestException("Network error")
 
         result = self.api.get_vacancies("python")
         self.assertEqual(result, [])  # Проверяем пустой список
+
+    @patch("requests.Session.get")
+    def test_get_vacancies_all_pages(self, mock_get):
+        # Выдача из трех страниц: первая сообщает общее количество страниц
+        def make_response(page):
+            response = MagicMock()
+            response.status_code = 200
+            response.json.return_value = {
+                "items": [{"name": f"Вакансия {page}-{i}"} for i in range(2)],
+                "pages": 3,
+                "found": 6,
+            }
+            return response
+
+        mock_get.side_effect = lambda url, params: make_response(params.get("page", 0))
+
+        result = self.api.search("python")
+
+        self.assertEqual(mock_get.call_count, 3)
+        self.assertEqual(
+            [item["name"] for item in result.items],
+            ["Вакансия 0-0", "Вакансия 0-1", "Вакансия 1-0", "Вакансия 1-1", "Вакансия 2-0", "Вакансия 2-1"],
+        )
+        self.assertEqual(result.found, 6)
+        self.assertEqual(result.failed_pages, [])
+        self.assertTrue(result.complete)
+
+    @patch("requests.Session.get")
+    def test_get_vacancies_page_cap(self, mock_get):
+        # Ограничение на количество страниц
+        mock_response = MagicMock()
+        mock_response.status_code = 200
+        mock_response.json.return_value = {"items": [{"name": "Вакансия"}], "pages": 50}
+        mock_get.return_value = mock_response
+
+        result = self.api.search("python", max_pages=4)
+
+        self.assertEqual(mock_get.call_count, 4)
+        self.assertEqual(len(result.items), 4)
+        requested_pages = sorted(c.kwargs["params"].get("page", 0) for c in mock_get.call_args_list)
+        self.assertEqual(requested_pages, [0, 1, 2, 3])
+        # Страниц больше лимита: выдача получена не целиком
+        self.assertTrue(result.truncated)
+        self.assertFalse(result.complete)
+
+    @patch("requests.Session.get")
+    def test_get_vacancies_failed_page_skipped(self, mock_get):
+        # Ошибка на одной из страниц не теряет остальные
+        def make_response(url, params):
+            if params.get("page") == 1:
+                raise requests.exceptions.RequestException("Network error")
+            response = MagicMock()
+            response.status_code = 200
+            response.json.return_value = {"items": [{"name": "Вакансия"}], "pages": 3}
+            return response
+
+        mock_get.side_effect = make_response
+
+        result = self.api.search("python")
+        self.assertEqual(len(result.items), 2)
+        self.assertEqual(result.failed_pages, [1])
+        self.assertFalse(result.complete)
+
+    @patch("requests.Session.get")
+    def test_iter_vacancies_is_lazy(self, mock_get):
+        def make_response(url, params):
+            page = params.get("page", 0)
+            response = MagicMock(status_code=200)
+            response.json.return_value = {"items": [{"page": page, "i": i} for i in range(3)], "pages": 10}
+            return response
+
+        mock_get.side_effect = make_response
+        api = HeadHunterAPI(max_workers=2)
+
+        vacancies = api.iter_vacancies("python")
+        self.assertEqual(next(vacancies), {"page": 0, "i": 0})
+        # Пока отдается первая страница, заранее запрошено не больше max_workers следующих
+        self.assertLessEqual(mock_get.call_count, 1 + 2)
+
+        rest = list(vacancies)
+        self.assertEqual(len(rest), 29)
+        self.assertEqual([item["page"] for item in rest[1::3]], list(range(10)))
+        self.assertEqual(mock_get.call_count, 10)
+
+    @patch("requests.Session.get")
+    def test_get_vacancies_filters(self, mock_get):
+        mock_response = MagicMock(status_code=200)
+        mock_response.json.return_value = {"items": []}
+        mock_get.return_value = mock_response
+
+        self.api.get_vacancies("python", filters={"date_from": "2024-02-16T14:58:28+0300"})
+
+        mock_get.assert_called_once_with(
+            self.api.base_url,
+            params={"text": "python", "per_page": 100, "area": 1, "date_from": "2024-02-16T14:58:28+0300"},
+        )
+
+    def test_session_defaults(self):
+        # Заголовки клиента становятся заголовками сессии по умолчанию
+        for name, value in self.api.headers.items():
+            self.assertEqual(self.api.session.headers[name], value)
+        self.assertIn("gzip", self.api.session.headers["Accept-Encoding"])
+
+        adapter = self.api.session.get_adapter(self.api.base_url)
+        self.assertEqual(adapter._pool_maxsize, self.api.pool_size)
+
+    def test_context_manager_closes_session(self):
+        with patch("requests.Session.close") as mock_close:
+            with HeadHunterAPI():
+                pass
+        mock_close.assert_called_once()
+
+    @patch("time.sleep")
+    @patch("requests.Session.get")
+    def test_get_vacancies_retries_throttled(self, mock_get, mock_sleep):
+        # 429 с Retry-After, затем 503 и успешный ответ
+        throttled = MagicMock(status_code=429, headers={"Retry-After": "2"})
+        unavailable = MagicMock(status_code=503, headers={})
+        success = MagicMock(status_code=200)
+        success.json.return_value = {"items": [{"name": "Вакансия"}]}
+        mock_get.side_effect = [throttled, unavailable, success]
+
+        result = self.api.get_vacancies("python")
+
+        self.assertEqual(len(result), 1)
+        self.assertEqual(mock_get.call_count, 3)
+        self.assertEqual(mock_sleep.call_args_list[0].args, (2.0,))
+        self.assertEqual(self.api.rate_limiter.stats()["retried"], 2)
+
+    @patch("time.sleep")
+    @patch("requests.Session.get")
+    def test_get_vacancies_retries_exhausted(self, mock_get, mock_sleep):
+        mock_get.return_value = MagicMock(status_code=429, headers={})
+        mock_get.return_value.raise_for_status.side_effect = requests.HTTPError("429")
+
+        result = self.api.get_vacancies("python")
+
+        self.assertEqual(result, [])
+        self.assertEqual(mock_get.call_count, self.api.rate_limiter.max_retries + 1)
+
+    @patch("time.sleep")
+    @patch("requests.Session.get")
+    def test_retry_after_too_long_gives_up(self, mock_get, mock_sleep):
+        mock_get.return_value = MagicMock(status_code=429, headers={"Retry-After": "3600"})
+        mock_get.return_value.raise_for_status.side_effect = requests.HTTPError("429")
+
+        self.assertEqual(self.api.get_vacancies("python"), [])
+        self.assertEqual(mock_get.call_count, 1)
+        mock_sleep.assert_not_called()
+
+
+class TestRateLimiter(unittest.TestCase):
+    def test_burst_then_rate(self):
+        limiter = RateLimiter(rate=50, burst=2)
+        start = time.monotonic()
+        for _ in range(7):
+            limiter.acquire()
+        elapsed = time.monotonic() - start
+
+        # Два запроса проходят сразу, остальные пять - с интервалом 1/50 с
+        self.assertGreaterEqual(elapsed, 5 / 50 * 0.9)
+        self.assertEqual(limiter.stats(), {"requests": 7, "throttled": 5, "retried": 0})
+
+    def test_shared_between_threads(self):
+        limiter = RateLimiter(rate=100, burst=1)
+        start = time.monotonic()
+        threads = [threading.Thread(target=lambda: [limiter.acquire() for _ in range(5)]) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertGreaterEqual(time.monotonic() - start, 19 / 100 * 0.9)
+        self.assertEqual(limiter.stats()["requests"], 20)
+
+    def test_backoff(self):
+        limiter = RateLimiter(backoff_base=1, backoff_max=10)
+        self.assertEqual(limiter.backoff(0, "3"), 3.0)
+        for attempt in range(6):
+            delay = limiter.backoff(attempt)
+            expected = min(10, 2 ** attempt)
+            self.assertGreaterEqual(delay, expected / 2)
+            self.assertLessEqual(delay, expected)
+        self.assertEqual(limiter.stats()["retried"], 7)
+
+    def test_retry_after_http_date(self):
+        limiter = RateLimiter(backoff_max=120)
+        retry_at = formatdate(time.time() + 60, usegmt=True)
+        self.assertAlmostEqual(limiter.backoff(0, retry_at), 60, delta=2)
+
+    def test_retry_after_not_capped(self):
+        limiter = RateLimiter(backoff_max=10, max_retry_after=120)
+        self.assertEqual(limiter.backoff(0, "60"), 60.0)
+        self.assertIsNone(limiter.backoff(0, "600"))
+        self.assertEqual(limiter.stats()["retried"], 1)
+
+
+class TestResponseCache(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.cache = ResponseCache(self.temp_dir.name, ttl=60)
+        self.url = "https://api.hh.ru/vacancies"
+        self.params = {"text": "python", "per_page": 100, "area": 1}
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_put_and_get(self):
+        self.cache.put(self.url, self.params, b'{"items": []}', etag='"abc"')
+        entry = self.cache.get(self.url, {"area": "1", "per_page": "100", "text": "python"})
+
+        self.assertEqual(entry.body, b'{"items": []}')
+        self.assertEqual(entry.etag, '"abc"')
+        self.assertTrue(self.cache.is_fresh(entry))
+        self.assertIsNone(self.cache.get(self.url, dict(self.params, page=1)))
+
+    def test_persisted_between_instances(self):
+        self.cache.put(self.url, self.params, b'{"items": []}')
+        self.cache.flush()
+        cache = ResponseCache(self.temp_dir.name)
+        self.assertEqual(cache.get(self.url, self.params).body, b'{"items": []}')
+
+    def test_index_saved_in_batches(self):
+        cache = ResponseCache(self.temp_dir.name, save_every=3, save_interval=3600)
+        with patch.object(cache, "_save_index", wraps=cache._save_index) as save:
+            cache.put(self.url, {"page": 0}, b"{}")
+            cache.put(self.url, {"page": 1}, b"{}")
+            save.assert_not_called()
+            cache.get(self.url, {"page": 0})
+            save.assert_called_once()
+
+    def test_access_time_persisted(self):
+        self.cache.put(self.url, {"page": 0}, b"{}")
+        self.cache.put(self.url, {"page": 1}, b"{}")
+        self.cache.get(self.url, {"page": 0})
+        self.cache.close()
+
+        with open(os.path.join(self.temp_dir.name, "index.json"), encoding="utf-8") as file:
+            index = json.load(file)
+        accessed = {key: meta["accessed"] for key, meta in index.items()}
+        first, second = ResponseCache.make_key(self.url, {"page": 0}), ResponseCache.make_key(self.url, {"page": 1})
+        self.assertGreater(accessed[first], accessed[second])
+
+    def test_expired_without_validators_dropped(self):
+        cache = ResponseCache(self.temp_dir.name, ttl=0)
+        cache.put(self.url, self.params, b"{}")
+        self.assertIsNone(cache.get(self.url, self.params))
+
+        cache.put(self.url, self.params, b"{}", last_modified="Wed, 21 Oct 2015 07:28:00 GMT")
+        entry = cache.get(self.url, self.params)
+        self.assertFalse(cache.is_fresh(entry))
+
+    def test_lru_eviction(self):
+        body = os.urandom(1000)
+        cache = ResponseCache(self.temp_dir.name, max_bytes=2500)
+        cache.put(self.url, {"page": 0}, body)
+        cache.put(self.url, {"page": 1}, body)
+        # Обращение к первой странице делает вытесняемой вторую
+        cache.get(self.url, {"page": 0})
+        cache.put(self.url, {"page": 2}, body)
+
+        self.assertIsNotNone(cache.get(self.url, {"page": 0}))
+        self.assertIsNone(cache.get(self.url, {"page": 1}))
+        self.assertIsNotNone(cache.get(self.url, {"page": 2}))
+        cache.flush()
+        self.assertEqual(len(os.listdir(self.temp_dir.name)), 3)  # два ответа и индекс
+
+    def test_running_total_size(self):
+        cache = ResponseCache(self.temp_dir.name, max_bytes=2500)
+        for page in range(5):
+            cache.put(self.url, {"page": page}, os.urandom(1000))
+        cache.put(self.url, {"page": 4}, os.urandom(500))
+        self.assertEqual(cache._total, sum(meta["size"] for meta in cache._index.values()))
+        self.assertLessEqual(cache._total, 2500)
+        self.assertEqual(len(cache._index), 2)
+
+    def test_lru_order_restored_after_reload(self):
+        body = os.urandom(1000)
+        cache = ResponseCache(self.temp_dir.name, max_bytes=2500)
+        cache.put(self.url, {"page": 0}, body)
+        cache.put(self.url, {"page": 1}, body)
+        cache.get(self.url, {"page": 0})
+        cache.close()
+
+        cache = ResponseCache(self.temp_dir.name, max_bytes=2500)
+        cache.put(self.url, {"page": 2}, body)
+        self.assertIsNone(cache.get(self.url, {"page": 1}))
+        self.assertIsNotNone(cache.get(self.url, {"page": 0}))
+
+    def test_released_after_flush(self):
+        cache = ResponseCache(self.temp_dir.name)
+        cache.put(self.url, self.params, b"{}")
+        cache.flush()
+        ref = weakref.ref(cache)
+        del cache
+        gc.collect()
+        self.assertIsNone(ref())
+
+    @patch("requests.Session.get")
+    def test_api_uses_cache(self, mock_get):
+        response = MagicMock(status_code=200, headers={"ETag": '"v1"'})
+        response.json.return_value = {"items": [{"name": "Вакансия"}]}
+        response.content = json.dumps(response.json.return_value).encode("utf-8")
+        mock_get.return_value = response
+
+        api = HeadHunterAPI(cache=self.cache)
+        self.assertEqual(api.get_vacancies("python"), [{"name": "Вакансия"}])
+        self.assertEqual(api.get_vacancies("python"), [{"name": "Вакансия"}])
+        mock_get.assert_called_once()
+
+    @patch("requests.Session.get")
+    def test_api_revalidates_stale_entry(self, mock_get):
+        cache = ResponseCache(self.temp_dir.name, ttl=0)
+        cache.put(self.url, self.params, '{"items": [{"name": "Вакансия"}]}'.encode("utf-8"), etag='"v1"')
+        mock_get.return_value = MagicMock(status_code=304, headers={})
+
+        api = HeadHunterAPI(cache=cache)
+        self.assertEqual(api.get_vacancies("python"), [{"name": "Вакансия"}])
+        self.assertEqual(mock_get.call_args.kwargs["headers"], {"If-None-Match": '"v1"'})
+
+
+class SlowVacanciesHandler(BaseHTTPRequestHandler):
+    # Имитация API: каждый ответ задерживается, чтобы была видна параллельность
+    delay = 0.1
+
+    def do_GET(self):
+        time.sleep(self.delay)
+        text = parse_qs(urlparse(self.path).query).get("text", [""])[0]
+        body = json.dumps({"items": [{"name": text}], "pages": 1}).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class TestAsyncHeadHunterAPI(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.server = ThreadingHTTPServer(("127.0.0.1", 0), SlowVacanciesHandler)
+        cls.server_thread = threading.Thread(target=cls.server.serve_forever, daemon=True)
+        cls.server_thread.start()
+        cls.url = f"http://127.0.0.1:{cls.server.server_address[1]}/vacancies"
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def _gather(self, queries, concurrency):
+        async def run():
+            async with AsyncHeadHunterAPI(concurrency=concurrency) as api:
+                api.client.base_url = self.url
+                return await api.gather_vacancies(queries)
+
+        start = time.perf_counter()
+        result = asyncio.run(run())
+        return result, time.perf_counter() - start
+
+    def test_get_vacancies(self):
+        async def run():
+            async with AsyncHeadHunterAPI() as api:
+                api.client.base_url = self.url
+                return await api.get_vacancies("python")
+
+        result = asyncio.run(run())
+        self.assertEqual(result, [{"name": "python"}])
+
+    def test_parallel_searches_keep_own_results(self):
+        # Итоги поиска возвращаются каждому вызову, а не хранятся в общем клиенте
+        async def run():
+            async with AsyncHeadHunterAPI(concurrency=4) as api:
+                api.client.base_url = self.url
+                return await asyncio.gather(*(api.search(f"q{i}") for i in range(4)))
+
+        results = asyncio.run(run())
+        self.assertEqual([result.items[0]["name"] for result in results], ["q0", "q1", "q2", "q3"])
+        self.assertEqual(len({id(result) for result in results}), 4)
+        self.assertTrue(all(result.complete for result in results))
+
+    def test_gather_keeps_query_order(self):
+        queries = [f"запрос {i}" for i in range(5)]
+        result, _ = self._gather(queries, concurrency=5)
+        self.assertEqual([items[0]["name"] for items in result], queries)
+
+    def test_gather_scales_with_concurrency(self):
+        queries = [f"q{i}" for i in range(8)]
+        _, sequential = self._gather(queries, concurrency=1)
+        _, parallel = self._gather(queries, concurrency=8)
+        self.assertGreater(sequential, 8 * SlowVacanciesHandler.delay)
+        self.assertLess(parallel, sequential / 3)
@@ -1,19 +1,45 @@
+import gc
 import io
+import json
+import multiprocessing
 import os
 import sys
+import tempfile
+import threading
+import time
 import unittest
+import weakref
 from io import StringIO
 from typing import Dict, List
+from unittest.mock import MagicMock, call, patch
 
 
 from src.helpers import (
+    filter_records,
     format_salary,
+    parse_salary_value,
     print_vacancies,
+    record_salary,
     sort_vacancies_by_salary,
+    top_vacancies_by_salary,
 )
 from src.json_storage import JSONStorage
+from src.jsonl_storage import JSONLinesStorage
+from src.salary_index import SalaryIndex
+from src.sqlite_storage import SQLiteStorage
+from src.text_index import InvertedIndex, relevance, tokenize
 from src.vacancy import Vacancy
 from src.base_storage import BaseStorage
+from src.file_lock import atomic_write_json
+from src.buffered_storage import BufferedStorage
+from src.snapshot import Snapshot, export_snapshot, import_snapshot
+from src.sharded_storage import ShardedStorage
+from src.enrichment import VacancyEnricher, detail_to_record, strip_html
+from src.sync import IncrementalSync
+from api.hh_api import SearchResult
+from src.vacancy_table import VacancyTable
+from src import analytics, sharded_storage
+from src.analytics import SalaryAnalytics
 
 
 class TestJSONStorage(unittest.TestCase):
@@ -37,9 +63,10 @@ class TestJSONStorage(unittest.TestCase):
             }
 
         def tearDown(self):
-            # Удаляем файл после тестов
-            if os.path.exists(self.temp_file):
-                os.remove(self.temp_file)
+            # Удаляем файл и файл блокировки после тестов
+            for filename in (self.temp_file, f"{self.temp_file}.lock"):
+                if os.path.exists(filename):
+                    os.remove(filename)
 
         def test_add_vacancy(self):
             self.storage.add_vacancy(self.test_vacancy)
@@ -383,7 +410,7 @@ class TestBaseStorage(unittest.TestCase):
 
         # def delete_vacancy(self, vacancy_id: int):
         #     self.deleted_ids.append(vacancy_id)
-        def delete_vacancy(self, vacancy_id: int):
+        def delete_vacancy(self, vacancy_id):
             # Находим вакансию по ID и удаляем её
             for i, vacancy in enumerate(self.data):
                 if vacancy['id'] == vacancy_id:
@@ -519,4 +546,1481 @@ class TestBaseStorage(unittest.TestCase):
     def test_abstract_methods(self):
         # Проверяем, что нельзя создать экземпляр абстрактного класса
         with self.assertRaises(TypeError):
-            BaseStorage()
\ No newline at end of file
+            BaseStorage()
+
+
+class TestUpsertVacancies(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.temp_file = os.path.join(self.temp_dir.name, "test_upsert_vacancies.json")
+        self.storage = JSONStorage(self.temp_file)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_upsert(self):
+        first = {"name": "Вакансия", "url": "https://test.com", "salary": "100000 RUB", "description": "Описание"}
+        second = {"name": "Вторая", "url": "https://test2.com", "salary": "150000 RUB", "description": "Описание"}
+        self.assertEqual(self.storage.upsert_vacancies([first, second]), 2)
+
+        updated = dict(first, salary="120000 RUB")
+        self.assertEqual(self.storage.upsert_vacancies([updated, second]), 1)
+        self.assertEqual(self.storage.get_vacancies(), [updated, second])
+
+    def test_upsert_unchanged_keeps_file(self):
+        vacancy = {"name": "Вакансия", "url": "https://test.com", "salary": "100000 RUB", "description": "Описание"}
+        self.storage.upsert_vacancies([vacancy])
+        mtime = os.stat(self.temp_file).st_mtime_ns
+
+        self.assertEqual(self.storage.upsert_vacancies([vacancy]), 0)
+        self.assertEqual(os.stat(self.temp_file).st_mtime_ns, mtime)
+
+    def test_default_upsert(self):
+        # Хранилище без своего upsert_vacancies пользуется реализацией BaseStorage
+        class ListStorage(BaseStorage):
+            def __init__(self):
+                self.data = []
+
+            def add_vacancy(self, vacancy):
+                self.data.append(vacancy)
+
+            def get_vacancies(self):
+                return list(self.data)
+
+            def delete_vacancy(self, url):
+                before = len(self.data)
+                self.data = [vacancy for vacancy in self.data if vacancy["url"] != url]
+                return len(self.data) < before
+
+        storage = ListStorage()
+        first = {"name": "Вакансия", "url": "https://test.com", "salary": "100000 RUB"}
+        second = {"name": "Вторая", "url": "https://test2.com", "salary": "150000 RUB"}
+        self.assertEqual(storage.upsert_vacancies([first, second]), 2)
+
+        updated = dict(first, salary="120000 RUB")
+        self.assertEqual(storage.upsert_vacancies([updated, second]), 1)
+        self.assertEqual(storage.get_vacancies(), [second, updated])
+
+
+class TestIncrementalSync(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.storage = JSONStorage(os.path.join(self.temp_dir.name, "vacancies.json"))
+        self.state_file = os.path.join(self.temp_dir.name, "sync_state.json")
+        self.api = MagicMock()
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    @staticmethod
+    def make_item(vacancy_id, published_at, salary_from=100000):
+        return {
+            "id": vacancy_id,
+            "name": f"Вакансия {vacancy_id}",
+            "alternate_url": f"https://hh.ru/vacancy/{vacancy_id}",
+            "salary": {"from": salary_from, "to": None, "currency": "RUR"},
+            "snippet": {"responsibility": "Описание"},
+            "published_at": published_at,
+        }
+
+    @staticmethod
+    def make_result(items, found=None, failed_pages=None, truncated=False):
+        return SearchResult(
+            items=items,
+            found=len(items) if found is None else found,
+            failed_pages=failed_pages or [],
+            truncated=truncated,
+            finished=True,
+        )
+
+    def test_first_sync_fetches_everything(self):
+        self.api.search.return_value = self.make_result(
+            [
+                self.make_item("1", "2024-02-16T14:58:28+0300"),
+                self.make_item("2", "2024-02-16T15:10:00+0300"),
+            ]
+        )
+        sync = IncrementalSync(self.api, self.storage, self.state_file)
+
+        self.assertEqual(sync.sync("python"), 2)
+        self.api.search.assert_called_once_with("python", filters={"order_by": "publication_time"})
+        self.assertEqual(sync.last_synced("python"), "2024-02-16T15:10:00+0300")
+
+    def test_next_sync_requests_only_newer(self):
+        self.api.search.return_value = self.make_result([self.make_item("1", "2024-02-16T14:58:28+0300")])
+        IncrementalSync(self.api, self.storage, self.state_file).sync("python")
+
+        # Новый экземпляр берет отметку из файла состояния
+        self.api.search.reset_mock()
+        self.api.search.return_value = self.make_result(
+            [
+                self.make_item("1", "2024-02-16T14:58:28+0300", salary_from=120000),
+                self.make_item("3", "2024-02-16T13:00:00+0000"),
+            ]
+        )
+        sync = IncrementalSync(self.api, self.storage, self.state_file)
+        self.assertEqual(sync.sync("python"), 2)
+
+        self.api.search.assert_called_once_with(
+            "python", filters={"order_by": "publication_time", "date_from": "2024-02-16T14:58:28+0300"}
+        )
+        # 13:00 UTC позже, чем 14:58 по Москве
+        self.assertEqual(sync.last_synced("python"), "2024-02-16T13:00:00+0000")
+
+        vacancies = self.storage.get_vacancies()
+        self.assertEqual(len(vacancies), 2)
+        self.assertEqual(vacancies[0]["salary"], "120000 RUR")
+
+    def test_nothing_new(self):
+        self.api.search.return_value = self.make_result([])
+        sync = IncrementalSync(self.api, self.storage, self.state_file)
+        self.assertEqual(sync.sync("python"), 0)
+        self.assertIsNone(sync.last_synced("python"))
+
+    def test_failed_page_keeps_mark(self):
+        self.api.search.return_value = self.make_result([self.make_item("1", "2024-02-16T14:58:28+0300")])
+        sync = IncrementalSync(self.api, self.storage, self.state_file)
+        sync.sync("python")
+
+        # Одна из страниц не загрузилась: полученное сохраняем, но отметку не сдвигаем
+        self.api.search.return_value = self.make_result(
+            [self.make_item("2", "2024-02-16T16:00:00+0300")], found=300, failed_pages=[1]
+        )
+        self.assertEqual(sync.sync("python"), 1)
+        self.assertEqual(sync.last_synced("python"), "2024-02-16T14:58:28+0300")
+        self.assertEqual(len(self.storage.get_vacancies()), 2)
+
+        # Состояние на диске тоже не изменилось
+        sync = IncrementalSync(self.api, self.storage, self.state_file)
+        self.assertEqual(sync.last_synced("python"), "2024-02-16T14:58:28+0300")
+
+    def test_capped_result_loads_older_windows(self):
+        # Найдено больше, чем API отдает на один запрос: остаток догружается окнами по date_to
+        self.api.search.side_effect = [
+            self.make_result(
+                [self.make_item("1", "2024-02-16T15:00:00+0300"), self.make_item("2", "2024-02-16T14:00:00+0300")],
+                found=2500,
+                truncated=True,
+            ),
+            self.make_result(
+                [self.make_item("2", "2024-02-16T14:00:00+0300"), self.make_item("3", "2024-02-16T13:00:00+0300")]
+            ),
+        ]
+        sync = IncrementalSync(self.api, self.storage, self.state_file)
+
+        self.assertEqual(sync.sync("python"), 3)
+        self.assertEqual(
+            self.api.search.call_args_list,
+            [
+                call("python", filters={"order_by": "publication_time"}),
+                call("python", filters={"order_by": "publication_time", "date_to": "2024-02-16T14:00:00+0300"}),
+            ],
+        )
+        # Все окна получены целиком: отметка сдвигается на самую свежую вакансию
+        self.assertEqual(sync.last_synced("python"), "2024-02-16T15:00:00+0300")
+        self.assertEqual(len(self.storage.get_vacancies()), 3)
+
+    def test_capped_window_that_cannot_shrink_keeps_mark(self):
+        # Вся обрезанная выдача опубликована в одну секунду: окно не сужается, отметку не сдвигаем
+        self.api.search.return_value = self.make_result(
+            [self.make_item("1", "2024-02-16T14:58:28+0300")], found=2500, truncated=True
+        )
+        sync = IncrementalSync(self.api, self.storage, self.state_file)
+
+        self.assertEqual(sync.sync("python"), 1)
+        self.assertEqual(self.api.search.call_count, 2)
+        self.assertIsNone(sync.last_synced("python"))
+
+    def test_from_hh_item(self):
+        vacancy = Vacancy.from_hh_item(self.make_item("1", "2024-02-16T14:58:28+0300"))
+        self.assertEqual(vacancy.url, "https://hh.ru/vacancy/1")
+        self.assertEqual(vacancy.salary, "100000 RUR")
+        self.assertEqual(vacancy.description, "Описание")
+
+
+class TestVacancyEnricher(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.storage = JSONStorage(os.path.join(self.temp_dir.name, "vacancies.json"))
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    @staticmethod
+    def make_detail(vacancy_id):
+        return {
+            "id": vacancy_id,
+            "name": f"Вакансия {vacancy_id}",
+            "alternate_url": f"https://hh.ru/vacancy/{vacancy_id}",
+            "salary": {"from": 100000, "to": 200000, "currency": "RUR"},
+            "description": "<p>Пишем <strong>код</strong> &amp; тесты</p>",
+            "key_skills": [{"name": "Python"}, {"name": "SQL"}],
+            "experience": {"id": "between1And3", "name": "От 1 года до 3 лет"},
+            "schedule": {"id": "remote", "name": "Удаленная работа"},
+        }
+
+    def test_strip_html(self):
+        self.assertEqual(strip_html("<p>Пишем <b>код</b>&nbsp;и&lt;тесты&gt;</p>"), "Пишем код и<тесты>")
+        self.assertEqual(strip_html(None), "")
+
+    def test_detail_to_record(self):
+        record = detail_to_record(self.make_detail("1"))
+        self.assertEqual(record["description"], "Пишем код & тесты")
+        self.assertEqual(record["salary"], "100000 - 200000 RUR")
+        self.assertEqual(record["key_skills"], ["Python", "SQL"])
+        self.assertEqual(record["experience"], "От 1 года до 3 лет")
+        self.assertEqual(record["schedule"], "Удаленная работа")
+        self.assertEqual(Vacancy.from_dict(record).description, "Пишем код & тесты")
+
+    def test_enrich_streams_in_batches(self):
+        api = MagicMock()
+        # Вакансия 3 не загрузилась
+        api.get_vacancy.side_effect = lambda vacancy_id: None if vacancy_id == "3" else self.make_detail(vacancy_id)
+        enricher = VacancyEnricher(api, self.storage, max_workers=2, batch_size=2)
+
+        with patch.object(self.storage, "upsert_vacancies", wraps=self.storage.upsert_vacancies) as upsert:
+            saved = enricher.enrich(str(i) for i in range(1, 7))
+
+        self.assertEqual(saved, 5)
+        self.assertTrue(all(len(call.args[0]) <= 3 for call in upsert.call_args_list))
+        urls = {v["url"] for v in self.storage.get_vacancies()}
+        self.assertEqual(urls, {f"https://hh.ru/vacancy/{i}" for i in (1, 2, 4, 5, 6)})
+
+    def test_enrich_bounded_in_flight(self):
+        lock = threading.Lock()
+        state = {"running": 0, "peak": 0}
+
+        def get_vacancy(vacancy_id):
+            with lock:
+                state["running"] += 1
+                state["peak"] = max(state["peak"], state["running"])
+            time.sleep(0.01)
+            with lock:
+                state["running"] -= 1
+            return self.make_detail(vacancy_id)
+
+        api = MagicMock()
+        api.get_vacancy.side_effect = get_vacancy
+        enricher = VacancyEnricher(api, self.storage, max_workers=3)
+
+        self.assertEqual(enricher.enrich(str(i) for i in range(20)), 20)
+        self.assertLessEqual(state["peak"], 3)
+
+    def test_enrich_skips_unchanged(self):
+        # Ответ API мог быть взят из кэша, но сравнивать нужно с тем, что сохранено в хранилище
+        self.storage.add_vacancies([detail_to_record(self.make_detail("1"))])
+        api = MagicMock()
+        api.get_vacancy.side_effect = self.make_detail
+        enricher = VacancyEnricher(api, self.storage)
+
+        self.assertEqual(enricher.enrich(["1", "2"]), 1)
+        self.assertEqual(len(self.storage.get_vacancies()), 2)
+
+    def test_enrich_survives_unexpected_error(self):
+        def get_vacancy(vacancy_id):
+            if vacancy_id == "2":
+                raise ValueError("битый ответ")
+            return self.make_detail(vacancy_id)
+
+        api = MagicMock()
+        api.get_vacancy.side_effect = get_vacancy
+        enricher = VacancyEnricher(api, self.storage, max_workers=2)
+
+        self.assertEqual(enricher.enrich(["1", "2", "3"]), 2)
+
+
+class TestAddVacancies(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.temp_file = os.path.join(self.temp_dir.name, "vacancies.json")
+        self.storage = JSONStorage(self.temp_file)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    @staticmethod
+    def make_vacancy(i):
+        return {"name": f"Вакансия {i}", "url": f"https://test{i}.com", "salary": "100000 RUB", "description": "desc"}
+
+    def test_add_vacancies(self):
+        self.storage.add_vacancy(self.make_vacancy(0))
+        # Дубликаты и внутри пачки, и с уже сохраненными записями пропускаются
+        added = self.storage.add_vacancies(self.make_vacancy(i % 4) for i in range(8))
+
+        self.assertEqual(added, 3)
+        self.assertEqual(
+            [v["url"] for v in self.storage.get_vacancies()],
+            [f"https://test{i}.com" for i in range(4)],
+        )
+        self.assertFalse(os.path.exists(self.temp_file + ".tmp"))
+
+    def test_add_vacancies_single_write(self):
+        with patch.object(self.storage, "_write", wraps=self.storage._write) as write:
+            self.storage.add_vacancies(self.make_vacancy(i) for i in range(100))
+        write.assert_called_once()
+        self.assertEqual(len(self.storage.get_vacancies()), 100)
+
+    def test_base_storage_default(self):
+        storage = TestBaseStorage.MockStorage()
+        vacancies = [dict(self.make_vacancy(i), id=i) for i in range(3)]
+        self.assertEqual(storage.add_vacancies(vacancies), 3)
+        self.assertEqual(storage.get_vacancies(), vacancies)
+
+
+class TestJSONStorageIndex(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.storage = JSONStorage(os.path.join(self.temp_dir.name, "vacancies.json"))
+        self.vacancies = [
+            {"name": f"Вакансия {i}", "url": f"https://test{i}.com", "salary": "100000 RUB", "description": "desc"}
+            for i in range(4)
+        ]
+        self.storage.add_vacancies(self.vacancies)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_get_vacancy(self):
+        self.assertEqual(self.storage.get_vacancy("https://test2.com"), self.vacancies[2])
+        self.assertIsNone(self.storage.get_vacancy("https://unknown.com"))
+
+    def test_delete_keeps_order(self):
+        self.assertTrue(self.storage.delete_vacancy("https://test1.com"))
+        self.assertIsNone(self.storage.get_vacancy("https://test1.com"))
+        self.assertEqual(self.storage.get_vacancies(), [self.vacancies[0], self.vacancies[2], self.vacancies[3]])
+
+    def test_sees_changes_from_other_instance(self):
+        other = JSONStorage(self.storage._filename)
+        other.delete_vacancy("https://test0.com")
+        self.assertIsNone(self.storage.get_vacancy("https://test0.com"))
+        self.assertEqual(len(self.storage.get_vacancies()), 3)
+
+    def test_record_without_url_kept(self):
+        # Запись без URL, добавленная в файл вручную, не ломает чтение и не теряется при записи
+        manual = {"name": "Без ссылки", "salary": "100000 RUB"}
+        with open(self.storage._filename, "w", encoding="utf-8") as file:
+            json.dump(self.vacancies[:2] + [manual], file, ensure_ascii=False)
+
+        self.assertEqual(self.storage.get_vacancies(), self.vacancies[:2] + [manual])
+        self.assertEqual(self.storage.get_vacancy("https://test1.com"), self.vacancies[1])
+
+        self.storage.add_vacancy(self.vacancies[2])
+        with open(self.storage._filename, "r", encoding="utf-8") as file:
+            self.assertIn(manual, json.load(file))
+
+
+class TestJSONLinesStorage(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.filename = os.path.join(self.temp_dir.name, "vacancies.jsonl")
+        self.storage = JSONLinesStorage(self.filename, compact_min_lines=10)
+
+    def tearDown(self):
+        self.storage.close()
+        self.temp_dir.cleanup()
+
+    @staticmethod
+    def make_vacancy(i):
+        return {"name": f"Вакансия {i}", "url": f"https://test{i}.com", "salary": "100000 RUB", "description": "desc"}
+
+    def read_lines(self):
+        with open(self.filename, encoding="utf-8") as file:
+            return file.readlines()
+
+    def test_add_appends(self):
+        self.storage.add_vacancy(self.make_vacancy(0))
+        self.storage.add_vacancy(self.make_vacancy(0))
+        self.assertEqual(self.storage.add_vacancies(self.make_vacancy(i) for i in range(3)), 2)
+
+        self.assertEqual(len(self.read_lines()), 3)
+        self.assertEqual(self.storage.get_vacancy("https://test1.com"), self.make_vacancy(1))
+
+    def test_delete_and_reload(self):
+        self.storage.add_vacancies(self.make_vacancy(i) for i in range(3))
+        self.assertTrue(self.storage.delete_vacancy("https://test1.com"))
+        self.assertFalse(self.storage.delete_vacancy("https://test1.com"))
+        self.storage.close()
+
+        self.storage = JSONLinesStorage(self.filename)
+        self.assertEqual(self.storage.get_vacancies(), [self.make_vacancy(0), self.make_vacancy(2)])
+        self.assertEqual(len(self.read_lines()), 4)
+
+    def test_partial_last_line_ignored(self):
+        self.storage.add_vacancy(self.make_vacancy(0))
+        self.storage.close()
+        with open(self.filename, "a", encoding="utf-8") as file:
+            file.write('{"url": "https://broken')
+
+        self.storage = JSONLinesStorage(self.filename)
+        self.storage.add_vacancy(self.make_vacancy(1))
+        self.storage.close()
+
+        self.storage = JSONLinesStorage(self.filename)
+        self.assertEqual(self.storage.get_vacancies(), [self.make_vacancy(0), self.make_vacancy(1)])
+
+    def test_compaction(self):
+        self.storage.add_vacancies(self.make_vacancy(i) for i in range(10))
+        # Фоновая перезапись запускается, когда мусора становится больше половины: 8 из 14 строк
+        for i in range(3):
+            self.storage.delete_vacancy(f"https://test{i}.com")
+        self.assertIsNone(self.storage._compaction)
+        self.storage.delete_vacancy("https://test3.com")
+        self.storage.close()
+
+        self.assertEqual(len(self.read_lines()), 6)
+        self.storage = JSONLinesStorage(self.filename)
+        self.assertEqual(self.storage.get_vacancies(), [self.make_vacancy(i) for i in range(4, 10)])
+        self.assertEqual(self.storage.garbage_ratio(), 0)
+
+    def test_writes_during_compaction_kept(self):
+        self.storage.add_vacancies(self.make_vacancy(i) for i in range(4))
+        self.storage.delete_vacancy("https://test0.com")
+
+        original_dumps = json.dumps
+
+        def slow_dumps(*args, **kwargs):
+            # Пока перезапись пишет снимок, в журнал добавляются новые записи
+            if not self.storage.get_vacancy("https://test9.com"):
+                self.storage.add_vacancy(self.make_vacancy(9))
+                self.storage.delete_vacancy("https://test1.com")
+            return original_dumps(*args, **kwargs)
+
+        with patch("src.jsonl_storage.json.dumps", side_effect=slow_dumps):
+            self.storage.compact()
+        self.storage.close()
+
+        self.storage = JSONLinesStorage(self.filename)
+        self.assertEqual(
+            [v["url"] for v in self.storage.get_vacancies()],
+            ["https://test2.com", "https://test3.com", "https://test9.com"],
+        )
+
+    def test_migrate_from_json(self):
+        json_file = os.path.join(self.temp_dir.name, "vacancies.json")
+        JSONStorage(json_file).add_vacancies(self.make_vacancy(i) for i in range(3))
+
+        self.storage.close()
+        self.storage = JSONLinesStorage.migrate_from_json(json_file, self.filename)
+        self.assertEqual(self.storage.get_vacancies(), [self.make_vacancy(i) for i in range(3)])
+        self.assertEqual(len(self.read_lines()), 3)
+
+
+class TestSQLiteStorage(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.storage = SQLiteStorage(os.path.join(self.temp_dir.name, "vacancies.db"))
+        self.vacancies = [
+            {"name": "Python разработчик", "url": "https://test0.com", "salary": "100000 - 150000 RUB",
+             "description": "Разработка сервисов на Django"},
+            {"name": "Java Developer", "url": "https://test1.com", "salary": "до 200000 RUB",
+             "description": "Backend на Spring"},
+            {"name": "Тестировщик", "url": "https://test2.com", "salary": "Зарплата не указана",
+             "description": "Тестирование сервисов на Python"},
+        ]
+        self.storage.add_vacancies(self.vacancies)
+
+    def tearDown(self):
+        self.storage.close()
+        self.temp_dir.cleanup()
+
+    def test_add_and_get(self):
+        self.assertEqual(self.storage.add_vacancies(self.vacancies), 0)
+        self.storage.add_vacancy({"name": "Новая", "url": "https://test3.com", "salary": "", "description": ""})
+        self.assertEqual(len(self.storage.get_vacancies()), 4)
+        self.assertEqual(self.storage.get_vacancies()[:3], self.vacancies)
+        self.assertEqual(self.storage.get_vacancy("https://test1.com"), self.vacancies[1])
+        self.assertEqual(
+            self.storage.existing_urls(["https://test1.com", "https://nope", "https://test3.com"]),
+            {"https://test1.com", "https://test3.com"},
+        )
+
+    def test_upsert(self):
+        updated = dict(self.vacancies[0], description="Разработка на FastAPI")
+        self.assertEqual(self.storage.upsert_vacancies([updated, self.vacancies[1]]), 1)
+        self.assertEqual(self.storage.get_vacancy("https://test0.com"), updated)
+        self.assertEqual(self.storage.filter_vacancies(keyword="fastapi"), [updated])
+        self.assertEqual(self.storage.filter_vacancies(keyword="django"), [])
+
+    def test_delete(self):
+        self.assertTrue(self.storage.delete_vacancy("https://test0.com"))
+        self.assertFalse(self.storage.delete_vacancy("https://test0.com"))
+        self.assertEqual(self.storage.filter_vacancies(keyword="разработчик"), [])
+
+    def test_filter_keyword(self):
+        self.assertCountEqual(self.storage.filter_vacancies(keyword="PYTHON"), [self.vacancies[0], self.vacancies[2]])
+        self.assertEqual(self.storage.filter_vacancies(keyword="сервисов тестирование"), [self.vacancies[2]])
+        self.assertEqual(self.storage.filter_vacancies(keyword="разраб"), [self.vacancies[0]])
+        # В запросе нет слов - ничего не найдено, а не все вакансии
+        self.assertEqual(self.storage.filter_vacancies(keyword="+++"), [])
+
+    def test_filter_keyword_stems_and_groups(self):
+        # Окончания слов запроса отбрасываются, как в JSONStorage
+        self.assertEqual(self.storage.filter_vacancies(keyword="разработчиками"), [self.vacancies[0]])
+        self.assertEqual(self.storage.filter_vacancies(keyword="сервис тестированию"), [self.vacancies[2]])
+        self.assertCountEqual(
+            self.storage.filter_vacancies(keyword="django OR spring"), [self.vacancies[0], self.vacancies[1]]
+        )
+        self.assertCountEqual(
+            self.storage.filter_vacancies(keyword="spring | тестировщик"), [self.vacancies[1], self.vacancies[2]]
+        )
+
+    def test_filter_keyword_ranked(self):
+        frequent = {"name": "Python Python", "url": "https://test3.com", "salary": "",
+                    "description": "Python, только Python"}
+        self.storage.add_vacancy(frequent)
+        # Чаще всего слово встречается в новой вакансии: по bm25 она первая, хотя добавлена последней
+        self.assertEqual(self.storage.filter_vacancies(keyword="python")[0], frequent)
+
+    def test_filter_salary(self):
+        self.assertEqual(self.storage.filter_vacancies(min_salary=130000), [self.vacancies[1]])
+        self.assertEqual(self.storage.filter_vacancies(max_salary=130000), [self.vacancies[0]])
+        self.assertEqual(
+            self.storage.filter_vacancies(keyword="python", min_salary=100000, max_salary=200000),
+            [self.vacancies[0]],
+        )
+
+    def test_persisted(self):
+        self.storage.close()
+        self.storage = SQLiteStorage(os.path.join(self.temp_dir.name, "vacancies.db"))
+        self.assertEqual(self.storage.get_vacancies(), self.vacancies)
+
+
+class TestParseSalaryValue(unittest.TestCase):
+    def test_parse_salary_value(self):
+        self.assertEqual(parse_salary_value("100000 - 150000 RUB"), 125000)
+        self.assertEqual(parse_salary_value("до 150000 RUB"), 150000)
+        self.assertEqual(parse_salary_value("200000.5 RUB"), 200000.5)
+        self.assertEqual(parse_salary_value("-200000 RUB"), -200000)
+        self.assertIsNone(parse_salary_value("Зарплата не указана"))
+        self.assertIsNone(parse_salary_value(None))
+
+
+class TestInvertedIndex(unittest.TestCase):
+    def setUp(self):
+        self.index = InvertedIndex.build(
+            [
+                ("1", "Python-разработчик. Разрабатываем сервисы на Python и Django"),
+                ("2", "Java разработчики в команду"),
+                ("3", "Тестировщик ПО, автотесты на Python"),
+            ]
+        )
+
+    def test_tokenize(self):
+        self.assertEqual(tokenize("Разработчики, РАЗРАБОТЧИК разработчика"), ["разработчик"] * 3)
+        self.assertEqual(tokenize("Ёлка и елки"), ["елк", "и", "елк"])
+        self.assertEqual(tokenize("Developers developer"), ["develop", "develop"])
+        self.assertEqual(tokenize(None), [])
+
+    def test_search_and(self):
+        self.assertEqual(self.index.search("python разработчики"), ["1"])
+        self.assertEqual(self.index.search("golang"), [])
+
+    def test_search_ranked_by_frequency(self):
+        self.assertEqual(self.index.search("PYTHON"), ["1", "3"])
+
+    def test_search_or(self):
+        self.assertEqual(self.index.search("java OR тестировщик"), ["2", "3"])
+        self.assertEqual(self.index.search("django | java"), ["1", "2"])
+
+    def test_remove(self):
+        self.index.remove("1")
+        self.assertEqual(self.index.search("python"), ["3"])
+        self.assertEqual(len(self.index), 2)
+
+    def test_save_and_load(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            filename = os.path.join(temp_dir, "index.json")
+            self.index.save(filename, [1, 2])
+            self.assertIsNone(InvertedIndex.load(filename, [1, 3]))
+            self.assertEqual(InvertedIndex.load(filename, [1, 2]).search("python"), ["1", "3"])
+
+    def test_singular_and_plural(self):
+        self.assertEqual(tokenize("service services"), ["servic", "servic"])
+        self.assertEqual(tokenize("database databases"), ["databas", "databas"])
+        # Двойное s остается частью основы
+        self.assertEqual(tokenize("process processes class classes"), ["process", "process", "class", "class"])
+        index = InvertedIndex.build([("1", "Backend service"), ("2", "Микро services")])
+        self.assertEqual(index.search("services"), ["1", "2"])
+        self.assertEqual(index.search("service"), ["1", "2"])
+
+    def test_search_with_scores(self):
+        index = InvertedIndex.build([("1", "python java"), ("2", "python python"), ("3", "java")])
+        self.assertEqual(index.search_with_scores("python"), [("2", 2), ("1", 1)])
+        self.assertEqual(index.search_with_scores("python OR java"), [("2", 2), ("1", 1), ("3", 1)])
+        self.assertEqual([score for _, score in index.search_with_scores("python")],
+                         [relevance("python", "python python"), relevance("python", "python java")])
+
+    def test_readded_document_goes_last(self):
+        self.index.add("1", "python")
+        self.assertEqual(self.index.search("python"), ["3", "1"])
+
+
+class TestJSONStorageKeywordSearch(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.filename = os.path.join(self.temp_dir.name, "vacancies.json")
+        self.storage = JSONStorage(self.filename)
+        self.vacancies = [
+            {"name": "Python разработчик", "url": "https://test0.com", "salary": "100000 RUB",
+             "description": "Разработка сервисов"},
+            {"name": "Java Developer", "url": "https://test1.com", "salary": "200000 RUB",
+             "description": "Пишем на Java и немного на Python"},
+        ]
+        self.storage.add_vacancies(self.vacancies)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_search_name_and_description(self):
+        self.assertEqual(self.storage.filter_vacancies(keyword="python"), self.vacancies)
+        self.assertEqual(self.storage.filter_vacancies(keyword="сервис"), [self.vacancies[0]])
+        self.assertEqual(self.storage.filter_vacancies(keyword="java python"), [self.vacancies[1]])
+        self.assertEqual(self.storage.filter_vacancies(keyword="python", min_salary=150000), [self.vacancies[1]])
+
+    def test_search_vacancies_with_scores(self):
+        extra = {"name": "Python Python", "url": "https://test2.com", "salary": "", "description": ""}
+        self.storage.add_vacancy(extra)
+        expected = [(2, extra), (1, self.vacancies[0]), (1, self.vacancies[1])]
+        self.assertEqual(self.storage.search_vacancies("python"), expected)
+        # Потоковый режим считает те же оценки по тексту записей
+        self.assertEqual(JSONStorage(self.filename, stream_threshold=0).search_vacancies("python"), expected)
+        self.assertEqual(self.storage.search_vacancies("python", min_salary=150000), [(1, self.vacancies[1])])
+
+    def test_index_updated_incrementally(self):
+        self.storage.filter_vacancies(keyword="python")
+        new = {"name": "Go разработчик", "url": "https://test2.com", "salary": "", "description": "Сервисы на Go"}
+        with patch.object(InvertedIndex, "build") as build:
+            self.storage.add_vacancy(new)
+            self.storage.delete_vacancy("https://test0.com")
+            self.assertEqual(self.storage.filter_vacancies(keyword="сервисы"), [new])
+        build.assert_not_called()
+
+    def test_index_persisted(self):
+        self.storage.filter_vacancies(keyword="python")
+        storage = JSONStorage(self.filename)
+        with patch.object(InvertedIndex, "build") as build:
+            self.assertEqual(storage.filter_vacancies(keyword="java"), [self.vacancies[1]])
+        build.assert_not_called()
+
+    def test_index_saved_in_batches(self):
+        storage = JSONStorage(self.filename, index_save_every=3)
+        storage.filter_vacancies(keyword="python")
+        index_mtime = os.stat(f"{self.filename}.idx").st_mtime_ns
+        new = [
+            {"name": f"Python {i}", "url": f"https://new{i}.com", "salary": "", "description": ""} for i in range(3)
+        ]
+
+        # Первые изменения индекс на диске не перезаписывают
+        storage.add_vacancy(new[0])
+        storage.add_vacancy(new[1])
+        self.assertEqual(os.stat(f"{self.filename}.idx").st_mtime_ns, index_mtime)
+        storage.add_vacancy(new[2])
+        self.assertNotEqual(os.stat(f"{self.filename}.idx").st_mtime_ns, index_mtime)
+
+        # Остаток сохраняется при закрытии, и новый экземпляр не перестраивает индекс
+        storage.delete_vacancy("https://new0.com")
+        storage.close()
+        with patch.object(InvertedIndex, "build") as build:
+            self.assertEqual(len(JSONStorage(self.filename).filter_vacancies(keyword="python")), 4)
+        build.assert_not_called()
+
+    def test_released_without_unsaved_changes(self):
+        storage = JSONStorage(self.filename, index_save_every=3)
+        storage.filter_vacancies(keyword="python")
+        storage.add_vacancy({"name": "Python", "url": "https://new.com", "salary": "", "description": ""})
+        # Пока есть несохраненные изменения индекса, хранилище удерживает хук завершения программы
+        ref = weakref.ref(storage)
+        storage.flush()
+        del storage
+        gc.collect()
+        self.assertIsNone(ref())
+
+    def test_index_rebuilt_after_external_change(self):
+        self.storage.filter_vacancies(keyword="python")
+        other = JSONStorage(self.filename)
+        other.add_vacancy({"name": "Python тимлид", "url": "https://test2.com", "salary": "", "description": ""})
+
+        self.assertEqual(len(self.storage.filter_vacancies(keyword="python")), 3)
+
+
+class TestSalaryIndex(unittest.TestCase):
+    def setUp(self):
+        self.index = SalaryIndex()
+        for record_id, salary in [("a", 100000), ("b", None), ("c", 250000), ("d", 150000), ("e", 100000)]:
+            self.index.add(record_id, salary)
+
+    def test_range(self):
+        self.assertEqual(self.index.range(100000, 150000), ["a", "e", "d"])
+        self.assertEqual(self.index.range(min_salary=150001), ["c"])
+        self.assertEqual(self.index.range(max_salary=99999), [])
+        self.assertEqual(self.index.range(), ["a", "e", "d", "c"])
+
+    def test_top(self):
+        self.assertEqual(self.index.top(2), ["c", "d"])
+        self.assertEqual(self.index.top(10), ["c", "d", "e", "a", "b"])
+        self.assertEqual(self.index.top(0), [])
+
+    def test_update_and_remove(self):
+        self.index.add("a", 300000)
+        self.index.add("b", 50000)
+        self.index.remove("c")
+        self.index.remove("unknown")
+        self.assertEqual(self.index.top(2), ["a", "d"])
+        self.assertEqual(self.index.range(max_salary=100000), ["b", "e"])
+        self.assertEqual(len(self.index), 4)
+
+    def test_build_matches_incremental(self):
+        records = [("a", 100000), ("b", None), ("c", 250000), ("d", 150000), ("e", 100000), ("c", None)]
+        built = SalaryIndex.build(records)
+        self.index.add("c", None)
+        self.assertEqual(built.top(10), self.index.top(10))
+        self.assertEqual(built.range(), self.index.range())
+        self.assertEqual(len(built), 5)
+
+        # После построения индекс обновляется как обычно
+        built.add("f", 120000)
+        self.assertEqual(built.range(100000, 150000), ["a", "e", "f", "d"])
+
+
+class TestJSONStorageSalaryQueries(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.storage = JSONStorage(os.path.join(self.temp_dir.name, "vacancies.json"))
+        self.vacancies = [
+            {"name": "Python", "url": "https://test0.com", "salary": "100000 - 150000 RUB", "description": ""},
+            {"name": "Java", "url": "https://test1.com", "salary": "Зарплата не указана", "description": ""},
+            {"name": "Go", "url": "https://test2.com", "salary": "до 200000 RUB", "description": ""},
+            {"name": "JS", "url": "https://test3.com", "salary": "90000 RUB", "description": ""},
+        ]
+        self.storage.add_vacancies(self.vacancies)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_filter_salary_range(self):
+        # Вилка 100000 - 150000 считается по середине, а не склейкой цифр
+        self.assertEqual(self.storage.filter_vacancies(min_salary=100000, max_salary=200000),
+                         [self.vacancies[0], self.vacancies[2]])
+        self.assertEqual(self.storage.filter_vacancies(max_salary=100000), [self.vacancies[3]])
+
+    def test_top_by_salary(self):
+        self.assertEqual(self.storage.top_by_salary(2), [self.vacancies[2], self.vacancies[0]])
+        self.assertEqual(self.storage.top_by_salary(10)[-1], self.vacancies[1])
+
+    def test_index_maintained(self):
+        self.storage.top_by_salary(1)
+        new = {"name": "Rust", "url": "https://test4.com", "salary": "300000 RUB", "description": ""}
+        self.storage.add_vacancy(new)
+        self.storage.delete_vacancy("https://test2.com")
+        self.assertEqual(self.storage.top_by_salary(2), [new, self.vacancies[0]])
+
+    def test_base_storage_default(self):
+        storage = TestBaseStorage.MockStorage()
+        for i, vacancy in enumerate(self.vacancies):
+            storage.add_vacancy(dict(vacancy, id=i))
+        self.assertEqual([v["name"] for v in storage.top_by_salary(4)], ["Go", "Python", "JS", "Java"])
+
+    def test_sqlite_top_by_salary(self):
+        with SQLiteStorage(os.path.join(self.temp_dir.name, "vacancies.db")) as storage:
+            storage.add_vacancies(self.vacancies)
+            self.assertEqual(storage.top_by_salary(2), [self.vacancies[2], self.vacancies[0]])
+            self.assertEqual(storage.top_by_salary(10)[-1], self.vacancies[1])
+
+
+class TestStructuredSalary(unittest.TestCase):
+    def test_to_record(self):
+        vacancy = Vacancy("Test", "url", {"from": 100000, "to": 150000, "currency": "RUR", "gross": True}, "desc")
+        record = vacancy.to_record()
+        self.assertEqual(record["salary"], "100000 - 150000 RUR")
+        self.assertEqual(record["salary_from"], 100000)
+        self.assertEqual(record["salary_to"], 150000)
+        self.assertEqual(record["currency"], "RUR")
+        self.assertTrue(record["gross"])
+        self.assertEqual(record["salary_mid"], 125000)
+
+    def test_to_record_without_salary(self):
+        record = Vacancy("Test", "url", None, "desc").to_record()
+        self.assertEqual(
+            [record[key] for key in ("salary_from", "salary_to", "currency", "gross", "salary_mid")],
+            [None] * 5,
+        )
+
+    def test_from_dict_uses_numeric_fields(self):
+        record = Vacancy("Test", "url", {"to": 150000, "currency": "USD"}, "desc").to_record()
+        with patch("src.vacancy._parse_display_salary") as parse:
+            vacancy = Vacancy.from_dict(record)
+        parse.assert_not_called()
+        self.assertEqual(vacancy.salary, "до 150000 USD")
+        self.assertEqual(vacancy._extract_numeric_salary(), 150000)
+
+    def test_from_dict_legacy_record(self):
+        # Записи старого формата: вилка раньше превращалась в "Зарплата не указана"
+        for salary, expected in [
+            ("100000 - 150000 RUB", 125000),
+            ("до 150000 RUR", 150000),
+            ("200000.5 RUB", 200000.5),
+            ("100000", 100000),
+            ("Зарплата не указана", None),
+        ]:
+            vacancy = Vacancy.from_dict({"name": "Test", "url": "url", "salary": salary, "description": "desc"})
+            self.assertEqual(vacancy._extract_numeric_salary(), expected)
+        legacy = Vacancy.from_dict({"name": "Test", "url": "url", "salary": "100000 - 150000 RUB", "description": ""})
+        self.assertEqual(legacy.salary, "100000 - 150000 RUB")
+
+    def test_storage_uses_salary_mid(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            storage = JSONStorage(os.path.join(temp_dir, "vacancies.json"))
+            storage.add_vacancies(
+                Vacancy(f"Вакансия {i}", f"url{i}", {"from": 1000 * i, "to": 3000 * i}, "desc").to_record()
+                for i in range(1, 5)
+            )
+            with patch("src.helpers.parse_salary_value") as parse:
+                top = storage.top_by_salary(2)
+                in_range = storage.filter_vacancies(min_salary=4000, max_salary=6000)
+            parse.assert_not_called()
+            self.assertEqual([v["url"] for v in top], ["url4", "url3"])
+            self.assertEqual([v["url"] for v in in_range], ["url2", "url3"])
+
+
+class TestTopVacanciesBySalary(unittest.TestCase):
+    def setUp(self):
+        self.vacancies = [
+            Vacancy("Python Dev", "url1", {"from": 150000, "to": 250000}, "Python"),
+            Vacancy("Java Dev", "url2", "150000", "Java"),
+            Vacancy("No Salary", "url3", "", "No Salary"),
+            Vacancy("JS Dev", "url4", {"to": 180000}, "JS"),
+        ]
+
+    def test_top_vacancies(self):
+        top = top_vacancies_by_salary(self.vacancies, 2)
+        self.assertEqual([v.name for v in top], ["Python Dev", "JS Dev"])
+        self.assertEqual([v.name for v in top_vacancies_by_salary(self.vacancies, 10)][-1], "No Salary")
+        self.assertEqual(top_vacancies_by_salary(self.vacancies, 0), [])
+
+    def test_top_from_records_stream(self):
+        records = (v.to_record() for v in self.vacancies)
+        top = top_vacancies_by_salary(records, 3)
+        self.assertEqual([v["url"] for v in top], ["url1", "url4", "url2"])
+
+    def test_no_string_parsing(self):
+        with patch("src.helpers.parse_salary_value") as parse:
+            sorted_vacancies = sort_vacancies_by_salary(self.vacancies)
+        parse.assert_not_called()
+        self.assertEqual([v.url for v in sorted_vacancies], ["url1", "url4", "url2", "url3"])
+
+
+class TestStreamingRead(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.filename = os.path.join(self.temp_dir.name, "vacancies.json")
+        self.storage = JSONStorage(self.filename)
+        self.vacancies = [
+            Vacancy(f"Python разработчик {i}", f"https://test{i}.com", {"from": 1000 * i}, "Описание [с] {скобками}")
+            .to_record()
+            for i in range(1, 51)
+        ]
+        self.storage.add_vacancies(self.vacancies)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_iter_vacancies(self):
+        for chunk_size in (1, 10, 1000, 1 << 20):
+            self.assertEqual(list(self.storage.iter_vacancies(chunk_size)), self.vacancies)
+
+    def test_iter_is_lazy(self):
+        vacancies = self.storage.iter_vacancies(chunk_size=100)
+        with patch("json.load") as load:
+            self.assertEqual(next(vacancies), self.vacancies[0])
+        load.assert_not_called()
+        vacancies.close()
+
+    def test_iter_empty_and_corrupted(self):
+        self.assertEqual(list(JSONStorage(os.path.join(self.temp_dir.name, "empty.json")).iter_vacancies()), [])
+        with open(self.filename, "w", encoding="utf-8") as file:
+            file.write('[{"url": "a"}, {"url": "b')
+        with patch("sys.stdout", new=StringIO()):
+            self.assertEqual(list(self.storage.iter_vacancies(chunk_size=4)), [{"url": "a"}])
+
+    def test_filter_records(self):
+        stream = self.storage.iter_vacancies()
+        result = list(filter_records(stream, keyword="разработчики", min_salary=10000, max_salary=12000))
+        self.assertEqual([v["url"] for v in result], [f"https://test{i}.com" for i in (10, 11, 12)])
+        self.assertEqual(list(filter_records(self.vacancies, keyword="java OR golang")), [])
+
+    def test_top_from_stream(self):
+        top = top_vacancies_by_salary(self.storage.iter_vacancies(), 2)
+        self.assertEqual([v["url"] for v in top], ["https://test50.com", "https://test49.com"])
+
+    def test_large_file_filtered_as_stream(self):
+        # Файл больше порога: записи не загружаются в память, а читаются потоком
+        storage = JSONStorage(self.filename, stream_threshold=0)
+        with patch("json.load") as load:
+            result = storage.filter_vacancies(keyword="разработчик", min_salary=49000)
+            top = storage.top_by_salary(2)
+        load.assert_not_called()
+        self.assertEqual(result, self.vacancies[-2:])
+        self.assertEqual(top, [self.vacancies[-1], self.vacancies[-2]])
+        self.assertEqual(storage._index, {})
+
+    def test_base_storage_filter(self):
+        with JSONLinesStorage(os.path.join(self.temp_dir.name, "vacancies.jsonl")) as storage:
+            storage.add_vacancies(self.vacancies)
+            self.assertEqual(storage.filter_vacancies(min_salary=49000), self.vacancies[-2:])
+            self.assertEqual(storage.top_by_salary(1), [self.vacancies[-1]])
+
+    def test_sqlite_iter(self):
+        with SQLiteStorage(os.path.join(self.temp_dir.name, "vacancies.db")) as storage:
+            storage.add_vacancies(self.vacancies)
+            self.assertEqual(list(storage.iter_vacancies()), self.vacancies)
+
+
+class TestVacancyTable(unittest.TestCase):
+    def setUp(self):
+        self.vacancies = [
+            Vacancy(
+                "Python разработчик", "https://a.com", {"from": 100000, "to": 200000, "currency": "RUR"}, "Django",
+                area="Москва",
+            ),
+            Vacancy(
+                "Java разработчик", "https://b.com", {"from": 3000, "currency": "USD", "gross": True}, "Spring",
+                area="Минск",
+            ),
+            Vacancy("Стажер", "https://c.com", None, "Обучение python", area="Москва"),
+            Vacancy("Тимлид", "https://d.com", {"to": 250000, "currency": "RUR"}, "", area="Казань"),
+        ]
+        self.table = VacancyTable.from_vacancies(self.vacancies)
+
+    def test_round_trip(self):
+        self.assertEqual(len(self.table), 4)
+        self.assertEqual(self.table.to_records(), [v.to_record() for v in self.vacancies])
+        self.assertEqual([v.to_dict() for v in self.table.to_vacancies()], [v.to_dict() for v in self.vacancies])
+
+    def test_row_view(self):
+        row = self.table[1]
+        self.assertEqual(
+            (row.name, row.url, row.currency, row.area), ("Java разработчик", "https://b.com", "USD", "Минск")
+        )
+        self.assertEqual(row.salary_from, 3000)
+        self.assertIsNone(row.salary_to)
+        self.assertTrue(row.gross)
+        self.assertIsNone(self.table[2].salary_mid)
+        self.assertEqual(self.table[-1].url, "https://d.com")
+        with self.assertRaises(IndexError):
+            self.table[4]
+
+    def test_filter(self):
+        def urls(rows):
+            return [row.url for row in rows]
+
+        self.assertEqual(urls(self.table.filter(min_salary=100000)), ["https://a.com", "https://d.com"])
+        self.assertEqual(urls(self.table.filter(max_salary=5000)), ["https://b.com"])
+        self.assertEqual(urls(self.table.filter(area="Москва")), ["https://a.com", "https://c.com"])
+        self.assertEqual(urls(self.table.filter(currency="RUR", area="Москва")), ["https://a.com"])
+        self.assertEqual(urls(self.table.filter(keyword="python")), ["https://a.com", "https://c.com"])
+        self.assertEqual(self.table.filter(area="Сочи"), [])
+
+    def test_sort_and_top(self):
+        self.assertEqual(
+            [row.url for row in self.table.sort_by_salary()],
+            ["https://d.com", "https://a.com", "https://b.com", "https://c.com"],
+        )
+        self.assertEqual([row.url for row in self.table.sort_by_salary(reverse=False)][-1], "https://c.com")
+        self.assertEqual([row.url for row in self.table.top_by_salary(2)], ["https://d.com", "https://a.com"])
+
+    def test_old_format_records(self):
+        table = VacancyTable.from_records([{"name": "A", "url": "u", "salary": "100 - 200 RUB", "description": "d"}])
+        self.assertEqual(table[0].salary_mid, 150)
+        self.assertEqual(table[0].currency, "RUB")
+
+    def test_without_text_columns(self):
+        table = VacancyTable.from_records(self.table.to_records(), text_columns=False)
+        self.assertEqual(len(table), len(self.table))
+        self.assertEqual([row.salary_mid for row in table], [row.salary_mid for row in self.table])
+        self.assertEqual(table.category_column("area"), self.table.category_column("area"))
+        self.assertEqual(len(table._names), 0)
+        self.assertEqual(len(table._descriptions), 0)
+
+
+@unittest.skipUnless(analytics.np is not None, "numpy не установлен")
+class TestSalaryAnalytics(unittest.TestCase):
+    def setUp(self):
+        self.records = [
+            Vacancy(
+                f"Вакансия {i}", f"https://test{i}.com", {"from": i * 1000, "currency": "RUR"}, "",
+                area="Москва" if i % 2 else "Казань",
+            ).to_record()
+            for i in range(1, 11)
+        ]
+        self.records.append(Vacancy("Без зарплаты", "https://none.com", None, "", area="Москва").to_record())
+        usd = {"from": 3000, "to": 5000, "currency": "USD"}
+        self.records.append(Vacancy("В долларах", "https://usd.com", usd, "").to_record())
+        self.analytics = SalaryAnalytics.from_records(self.records)
+
+    def test_counts(self):
+        self.assertEqual(len(self.analytics), 12)
+        self.assertEqual(self.analytics.with_salary, 11)
+
+    def test_percentiles(self):
+        self.assertEqual(self.analytics.percentiles((0, 50, 100), currency="RUR"), {0: 1000, 50: 5500, 100: 10000})
+        self.assertEqual(self.analytics.percentiles(currency="EUR"), {})
+
+    def test_median_by(self):
+        self.assertEqual(self.analytics.median_by("currency"), {"RUR": 5500, "USD": 4000})
+        self.assertEqual(self.analytics.median_by("area", currency="RUR"), {"Москва": 5000, "Казань": 6000})
+
+    def test_histogram(self):
+        counts, edges = self.analytics.histogram(bins=3, currency="RUR")
+        self.assertEqual(counts, [3, 3, 4])
+        self.assertEqual(edges, [1000, 4000, 7000, 10000])
+
+
+class TestSalaryAnalyticsWithoutNumpy(unittest.TestCase):
+    def test_informative_error(self):
+        with patch.object(analytics, "np", None):
+            with self.assertRaisesRegex(ImportError, "numpy"):
+                SalaryAnalytics.from_records([])
+
+
+class TestVacancyFromRecord(unittest.TestCase):
+    def test_matches_from_dict(self):
+        salaries = (
+            {"from": 100000, "to": 150000, "currency": "RUR"},
+            {"to": 3000, "currency": "USD", "gross": True},
+            None,
+        )
+        for salary in salaries:
+            record = Vacancy("Python", "https://a.com", salary, "Описание", area="Москва").to_record()
+            fast, slow = Vacancy.from_record(record), Vacancy.from_dict(record)
+            for field in Vacancy.__slots__:
+                self.assertEqual(getattr(fast, field), getattr(slow, field), field)
+
+    def test_skips_format_salary(self):
+        record = Vacancy("Python", "https://a.com", {"from": 100000, "currency": "RUR"}, "").to_record()
+        with patch.object(Vacancy, "_format_salary") as format_salary:
+            vacancy = Vacancy.from_record(record)
+        format_salary.assert_not_called()
+        self.assertEqual(vacancy._extract_numeric_salary(), 100000)
+        self.assertFalse(hasattr(vacancy, "__dict__"))
+
+    def test_old_format_falls_back(self):
+        vacancy = Vacancy.from_record({"name": "A", "url": "u", "salary": "до 150000 RUB", "description": "d"})
+        self.assertEqual((vacancy.salary_to, vacancy._salary), (150000, 150000))
+
+    def test_from_records(self):
+        records = (
+            Vacancy(f"V{i}", f"https://{i}.com", {"from": i, "currency": "RUR"}, "").to_record() for i in range(1, 4)
+        )
+        self.assertEqual(
+            [v.url for v in Vacancy.from_records(records)], ["https://1.com", "https://2.com", "https://3.com"]
+        )
+
+
+def _ingest_worker(filename: str, worker: int, count: int) -> None:
+    storage = JSONStorage(filename)
+    for i in range(count):
+        storage.add_vacancy(
+            {"name": f"V{worker}-{i}", "url": f"https://{worker}-{i}.com", "salary": "", "description": ""}
+        )
+
+
+class TestJSONStorageLocking(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.filename = os.path.join(self.temp_dir.name, "vacancies.json")
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_parallel_processes_do_not_lose_writes(self):
+        processes = [
+            multiprocessing.Process(target=_ingest_worker, args=(self.filename, worker, 15)) for worker in range(4)
+        ]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join()
+
+        urls = {vacancy["url"] for vacancy in JSONStorage(self.filename).get_vacancies()}
+        self.assertEqual(urls, {f"https://{worker}-{i}.com" for worker in range(4) for i in range(15)})
+
+    def test_corrupted_file_is_not_overwritten(self):
+        with open(self.filename, "w", encoding="utf-8") as file:
+            file.write('[{"url": "a"}, {"url": "b')
+        storage = JSONStorage(self.filename)
+        with self.assertRaisesRegex(ValueError, "поврежден"):
+            storage.add_vacancies([{"url": "c"}])
+        with patch("sys.stdout", new=StringIO()) as stdout:
+            storage.add_vacancy({"url": "c"})
+            self.assertEqual(storage.get_vacancies(), [])
+        self.assertIn("поврежден", stdout.getvalue())
+        with open(self.filename, encoding="utf-8") as file:
+            self.assertEqual(file.read(), '[{"url": "a"}, {"url": "b')
+
+    def test_atomic_write_fsyncs_and_cleans_up(self):
+        with patch("os.fsync") as fsync:
+            atomic_write_json(self.filename, [1, 2])
+        fsync.assert_called_once()
+        with open(self.filename, encoding="utf-8") as file:
+            self.assertEqual(json.load(file), [1, 2])
+        with self.assertRaises(TypeError):
+            atomic_write_json(self.filename, [object()])
+        self.assertEqual(os.listdir(self.temp_dir.name), ["vacancies.json"])
+
+
+def _vacancy(i: int, salary: int) -> Dict:
+    salary_data = {"from": salary, "currency": "RUR"}
+    return Vacancy(f"Вакансия {i}", f"https://test{i}.com", salary_data, "Описание").to_record()
+
+
+class TestBufferedStorage(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.inner = JSONStorage(os.path.join(self.temp_dir.name, "vacancies.json"))
+        self.inner.add_vacancies([_vacancy(1, 1000), _vacancy(2, 2000)])
+        self.storage = BufferedStorage(self.inner, max_pending=10, max_delay=None)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_read_your_writes(self):
+        self.storage.add_vacancy(_vacancy(3, 3000))
+        self.storage.delete_vacancy("https://test1.com")
+        self.assertEqual(len(self.inner.get_vacancies()), 2)
+        self.assertEqual([v["url"] for v in self.storage.get_vacancies()], ["https://test2.com", "https://test3.com"])
+        self.assertEqual([v["url"] for v in self.storage.filter_vacancies(min_salary=2500)], ["https://test3.com"])
+        self.assertEqual([v["url"] for v in self.storage.top_by_salary(1)], ["https://test3.com"])
+
+    def test_group_commit_on_flush(self):
+        with patch.object(self.inner, "_write", wraps=self.inner._write) as write:
+            for i in range(3, 8):
+                self.storage.add_vacancy(_vacancy(i, i * 1000))
+            self.storage.delete_vacancy("https://test2.com")
+            write.assert_not_called()
+            self.storage.flush()
+        self.assertEqual(write.call_count, 2)
+        self.assertEqual(len(self.storage), 0)
+        self.assertEqual(len(self.inner.get_vacancies()), 6)
+
+    def test_flush_on_size_threshold(self):
+        self.storage.add_vacancies(_vacancy(i, i) for i in range(3, 13))
+        self.assertEqual(len(self.storage), 0)
+        self.assertEqual(len(self.inner.get_vacancies()), 12)
+
+    def test_flush_on_delay(self):
+        storage = BufferedStorage(self.inner, max_delay=0.05)
+        storage.add_vacancy(_vacancy(3, 3000))
+        time.sleep(0.1)
+        # Срок истек: следующая операция сбрасывает буфер в потоке вызывающего кода
+        storage.add_vacancy(_vacancy(4, 4000))
+        self.assertEqual(len(storage), 0)
+        self.assertIsNotNone(self.inner.get_vacancy("https://test3.com"))
+        self.assertIsNotNone(self.inner.get_vacancy("https://test4.com"))
+
+    def test_sqlite_storage(self):
+        # SQLiteStorage работает только в своем потоке: сброс не должен уходить в другой поток
+        with SQLiteStorage(os.path.join(self.temp_dir.name, "vacancies.db")) as inner:
+            with BufferedStorage(inner, max_delay=0.01) as storage:
+                storage.add_vacancy(_vacancy(1, 1000))
+                time.sleep(0.05)
+                storage.add_vacancy(_vacancy(2, 2000))
+                self.assertEqual(len(inner.get_vacancies()), 2)
+            self.assertEqual(len(inner.get_vacancies()), 2)
+
+    def test_existing_vacancies_not_counted(self):
+        self.assertEqual(self.storage.add_vacancies([_vacancy(1, 1000), _vacancy(3, 3000), _vacancy(3, 3000)]), 1)
+        self.assertEqual(len(self.storage), 1)
+
+    def test_delete_returns_bool(self):
+        self.storage.add_vacancy(_vacancy(3, 3000))
+        self.assertIs(self.storage.delete_vacancy("https://test1.com"), True)
+        self.assertIs(self.storage.delete_vacancy("https://test3.com"), True)
+        self.assertIs(self.storage.delete_vacancy("https://test1.com"), False)
+        self.assertIs(self.storage.delete_vacancy("https://nope"), False)
+        self.assertIsNone(self.storage.get_vacancy("https://test1.com"))
+
+    def test_failed_flush_keeps_buffer(self):
+        self.storage.add_vacancy(_vacancy(3, 3000))
+        with patch.object(self.inner, "add_vacancies", side_effect=OSError("диск заполнен")):
+            with self.assertRaises(OSError):
+                self.storage.flush()
+        self.assertEqual(len(self.storage), 1)
+        self.storage.flush()
+        self.assertIsNotNone(self.inner.get_vacancy("https://test3.com"))
+
+    def test_failed_storage_write_keeps_buffer(self):
+        # JSONStorage сообщает об ошибке записи пачки исключением, и буфер не теряется
+        self.storage.add_vacancy(_vacancy(3, 3000))
+        self.storage.delete_vacancy("https://test1.com")
+        with patch("src.json_storage.atomic_write_json", side_effect=OSError("диск заполнен")):
+            with self.assertRaises(OSError):
+                self.storage.flush()
+        self.assertEqual(len(self.storage), 2)
+        self.storage.flush()
+        self.assertEqual([v["url"] for v in self.inner.get_vacancies()], ["https://test2.com", "https://test3.com"])
+
+    def test_indexed_reads_flush_buffer(self):
+        self.storage.add_vacancy(dict(_vacancy(3, 3000), description="Python, Python и еще раз Python"))
+        self.storage.add_vacancy(dict(_vacancy(4, 4000), description="Python"))
+        with patch.object(self.inner, "iter_vacancies") as iter_vacancies:
+            found = self.storage.filter_vacancies(keyword="python")
+            top = self.storage.top_by_salary(1)
+        iter_vacancies.assert_not_called()
+        self.assertEqual(len(self.storage), 0)
+        # Порядок по релевантности из индекса хранилища
+        self.assertEqual([v["url"] for v in found], ["https://test3.com", "https://test4.com"])
+        self.assertEqual([v["url"] for v in top], ["https://test4.com"])
+
+    def test_existence_checked_per_batch(self):
+        with patch.object(self.inner, "get_vacancy") as get_vacancy:
+            with patch.object(self.inner, "existing_urls", wraps=self.inner.existing_urls) as existing_urls:
+                self.assertEqual(self.storage.add_vacancies(_vacancy(i, i) for i in range(1, 9)), 6)
+        get_vacancy.assert_not_called()
+        existing_urls.assert_called_once()
+
+    def test_delete_then_add_replaces(self):
+        with BufferedStorage(self.inner) as storage:
+            storage.delete_vacancy("https://test1.com")
+            storage.add_vacancy(dict(_vacancy(1, 1000), name="Новая"))
+            self.assertEqual(storage.get_vacancies()[-1]["name"], "Новая")
+        self.assertEqual(self.inner.get_vacancy("https://test1.com")["name"], "Новая")
+
+    def test_delete_vacancies_single_write(self):
+        with patch.object(self.inner, "_write", wraps=self.inner._write) as write:
+            urls = ["https://test1.com", "https://test2.com", "https://nope"]
+            self.assertEqual(self.inner.delete_vacancies(urls), 2)
+        write.assert_called_once()
+
+
+class TestJSONStorageReadCache(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.filename = os.path.join(self.temp_dir.name, "vacancies.json")
+        self.storage = JSONStorage(self.filename)
+        self.storage.add_vacancies([_vacancy(i, i * 1000) for i in range(1, 6)])
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_repeated_reads_do_not_reparse(self):
+        with patch.object(self.storage, "_read", wraps=self.storage._read) as read:
+            self.storage.get_vacancies()
+            self.storage.filter_vacancies(keyword="вакансия", min_salary=2000)
+            self.storage.top_by_salary(2)
+            self.storage.get_vacancy("https://test1.com")
+        read.assert_not_called()
+
+    def test_own_writes_update_cache(self):
+        with patch.object(self.storage, "_read", wraps=self.storage._read) as read:
+            self.storage.add_vacancy(_vacancy(6, 6000))
+            self.storage.delete_vacancy("https://test1.com")
+            self.assertEqual([v["url"] for v in self.storage.top_by_salary(1)], ["https://test6.com"])
+            self.assertEqual(len(self.storage.get_vacancies()), 5)
+        read.assert_not_called()
+
+    def test_external_change_reloads(self):
+        self.storage.filter_vacancies(min_salary=1)
+        JSONStorage(self.filename).add_vacancy(_vacancy(7, 7000))
+        self.assertEqual([v["url"] for v in self.storage.filter_vacancies(min_salary=6500)], ["https://test7.com"])
+        self.assertEqual(len(self.storage.get_vacancies()), 6)
+
+    def test_failed_write_drops_cache(self):
+        with patch("src.json_storage.atomic_write_json", side_effect=OSError("диск заполнен")):
+            with patch("sys.stdout", new=StringIO()):
+                self.storage.add_vacancy(_vacancy(8, 8000))
+        self.assertIsNone(self.storage.get_vacancy("https://test8.com"))
+
+    def test_failed_batch_not_half_applied(self):
+        # Вакансия без url на середине пачки: уже примененные записи не должны остаться в кэше
+        self.storage.filter_vacancies(keyword="вакансия", min_salary=1)
+        batch = [_vacancy(8, 8000), {"name": "Без ссылки"}, _vacancy(9, 9000)]
+        for method in (self.storage.add_vacancies, self.storage.upsert_vacancies):
+            with self.assertRaises(KeyError):
+                method(batch)
+            self.assertIsNone(self.storage.get_vacancy("https://test8.com"))
+            self.assertEqual(len(self.storage.filter_vacancies(keyword="вакансия")), 5)
+            self.assertEqual([v["url"] for v in self.storage.top_by_salary(1)], ["https://test5.com"])
+        with self.assertRaises(TypeError):
+            self.storage.delete_vacancies(["https://test1.com", ["не строка"]])
+        self.assertIsNotNone(self.storage.get_vacancy("https://test1.com"))
+        self.assertEqual(len(self.storage.filter_vacancies(min_salary=1)), 5)
+
+
+class TestSnapshot(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.storage = JSONStorage(os.path.join(self.temp_dir.name, "vacancies.json"))
+        self.records = [_vacancy(i, i * 1000) for i in range(1, 6)]
+        self.records.append(Vacancy("Без зарплаты", "https://none.com", None, "", area="Москва").to_record())
+        self.records.append(
+            {"name": "Старый формат", "url": "https://old.com", "salary": "100 - 200 RUB", "description": "d"}
+        )
+        self.records.append(dict(_vacancy(9, 9500.5), key_skills=["Python", "SQL"], experience="1–3 года"))
+        self.storage.add_vacancies(self.records)
+        self.filename = os.path.join(self.temp_dir.name, "vacancies.snap")
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_round_trip(self):
+        self.assertEqual(export_snapshot(self.storage, self.filename), len(self.records))
+        with Snapshot(self.filename) as snapshot:
+            self.assertEqual(len(snapshot), len(self.records))
+            self.assertEqual(list(snapshot), self.records)
+            self.assertEqual(snapshot[-1], self.records[-1])
+
+        target = JSONStorage(os.path.join(self.temp_dir.name, "imported.json"))
+        self.assertEqual(import_snapshot(self.filename, target), len(self.records))
+        self.assertEqual(target.get_vacancies(), self.records)
+
+    def test_salary_queries(self):
+        Snapshot.write(self.filename, self.records)
+        with Snapshot(self.filename) as snapshot:
+            self.assertEqual(snapshot.salary(6), 150)
+            self.assertIsNone(snapshot.salary(5))
+            self.assertEqual(snapshot.salary(-1), snapshot.salary(len(snapshot) - 1))
+            with self.assertRaises(IndexError):
+                snapshot.salary(len(snapshot))
+            top = snapshot.top_by_salary(2)
+            self.assertEqual([v["url"] for v in top], ["https://test9.com", "https://test5.com"])
+            in_range = snapshot.filter_by_salary(100, 1000)
+            self.assertEqual([v["url"] for v in in_range], ["https://test1.com", "https://old.com"])
+
+    def test_lazy_access(self):
+        Snapshot.write(self.filename, self.records)
+        with Snapshot(self.filename) as snapshot:
+            with patch.object(Snapshot, "_decode", wraps=snapshot._decode) as decode:
+                snapshot[2]
+            decode.assert_called_once()
+
+    def test_failed_write_keeps_old_snapshot(self):
+        Snapshot.write(self.filename, self.records[:2])
+        files = sorted(os.listdir(self.temp_dir.name))
+
+        def broken_records():
+            yield from self.records
+            raise OSError("хранилище недоступно")
+
+        with self.assertRaises(OSError):
+            Snapshot.write(self.filename, broken_records())
+        # Старый снимок цел, временные файлы таблицы и кучи удалены
+        self.assertEqual(sorted(os.listdir(self.temp_dir.name)), files)
+        with Snapshot(self.filename) as snapshot:
+            self.assertEqual(list(snapshot), self.records[:2])
+
+    def test_invalid_file(self):
+        with open(self.filename, "wb") as file:
+            file.write(b"[]")
+        with self.assertRaisesRegex(ValueError, "не снимок"):
+            Snapshot(self.filename)
+        Snapshot.write(self.filename, [])
+        with Snapshot(self.filename) as snapshot:
+            self.assertEqual(list(snapshot), [])
+            with self.assertRaises(IndexError):
+                snapshot[0]
+
+
+class TestShardedStorage(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.directory = os.path.join(self.temp_dir.name, "shards")
+        self.records = [dict(_vacancy(i, i * 1000), area="Москва" if i % 3 else "Казань") for i in range(1, 21)]
+        self.records.append(Vacancy("Без зарплаты", "https://none.com", None, "Описание").to_record())
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def check_storage(self, storage):
+        self.assertEqual(storage.add_vacancies(self.records), 21)
+        self.assertEqual(storage.add_vacancies(self.records[:5]), 0)
+        self.assertEqual(sorted(v["url"] for v in storage.get_vacancies()), sorted(v["url"] for v in self.records))
+        top = storage.top_by_salary(3)
+        self.assertEqual([v["url"] for v in top], ["https://test20.com", "https://test19.com", "https://test18.com"])
+        self.assertEqual(storage.top_by_salary(30)[-1]["url"], "https://none.com")
+        # Результаты шардов сливаются в общий порядок: по зарплате - по возрастанию
+        in_range = storage.filter_vacancies(min_salary=5000, max_salary=9000)
+        self.assertEqual([v["url"] for v in in_range], [f"https://test{i}.com" for i in range(5, 10)])
+        self.assertEqual(len(storage.filter_vacancies(keyword="вакансия")), 20)
+        self.assertEqual(storage.get_vacancy("https://test7.com")["name"], "Вакансия 7")
+        self.assertTrue(storage.delete_vacancy("https://test20.com"))
+        self.assertEqual(storage.delete_vacancies(["https://test19.com", "https://nope.com"]), 1)
+        self.assertEqual(storage.top_by_salary(1)[0]["url"], "https://test18.com")
+
+    def test_process_pool(self):
+        with ShardedStorage(self.directory, shards=4, max_workers=2) as storage:
+            self.check_storage(storage)
+
+    def test_partition_by_area(self):
+        with ShardedStorage(self.directory, shards=4, partition="area", max_workers=1) as storage:
+            self.check_storage(storage)
+            shard_areas = [
+                {v["area"] for v in JSONStorage(filename).get_vacancies()} for filename in storage._filenames
+            ]
+        # Все вакансии одного региона лежат в одном шарде
+        for area in ("Москва", "Казань", None):
+            self.assertEqual(sum(area in areas for areas in shard_areas), 1)
+
+    def test_custom_partition_and_reopen(self):
+        def partition(vacancy):
+            return len(vacancy["url"])
+
+        with ShardedStorage(self.directory, shards=3, partition=partition, max_workers=1) as storage:
+            storage.add_vacancies(self.records)
+        files = sorted(os.listdir(self.directory))
+        shard_files = [f for f in files if f.startswith("shard_") and f.endswith(".json")]
+        self.assertEqual(shard_files, ["shard_000.json", "shard_001.json", "shard_002.json"])
+        with ShardedStorage(self.directory, shards=3, partition=partition, max_workers=1) as storage:
+            self.assertEqual(len(storage.get_vacancies()), 21)
+
+    def test_reopen_with_other_parameters(self):
+        ShardedStorage(self.directory, shards=3, partition="area", max_workers=1)
+        # Вакансии искались бы не в тех шардах
+        with self.assertRaises(ValueError):
+            ShardedStorage(self.directory, shards=3, max_workers=1)
+        with self.assertRaises(ValueError):
+            ShardedStorage(self.directory, shards=4, partition="area", max_workers=1)
+
+    def test_no_duplicates_across_shards(self):
+        with ShardedStorage(self.directory, shards=4, partition="area", max_workers=1) as storage:
+            storage.add_vacancies(self.records)
+            # Регион вакансии сменился: с ключом по региону она попала бы в другой шард
+            moved = [dict(vacancy, area="Сочи") for vacancy in self.records[:3]]
+            self.assertEqual(storage.add_vacancies(moved + moved), 0)
+            self.assertEqual(len(storage.get_vacancies()), 21)
+
+    def test_keyword_results_ranked_across_shards(self):
+        records = [
+            dict(_vacancy(i, i * 1000), name="Python " * (i % 4 + 1), url=f"https://python{i}.com") for i in range(8)
+        ]
+        with ShardedStorage(self.directory, shards=3, max_workers=1) as storage:
+            storage.add_vacancies(records)
+            counts = [v["name"].count("Python") for v in storage.filter_vacancies(keyword="python")]
+        self.assertEqual(counts, sorted(counts, reverse=True))
+        self.assertEqual(len(counts), 8)
+
+    def test_keyword_scores_taken_from_index(self):
+        with ShardedStorage(self.directory, shards=3, max_workers=1) as storage:
+            storage.add_vacancies(self.records)
+            with patch("src.json_storage.relevance") as score_text:
+                self.assertEqual(len(storage.filter_vacancies(keyword="вакансия")), 20)
+            score_text.assert_not_called()
+
+    def test_streamed_shards_merged_in_order(self):
+        records = [
+            dict(_vacancy(i, (i * 7919) % 50 * 1000 + 1000), name="Python " * (i % 4 + 1), url=f"https://p{i}.com")
+            for i in range(30)
+        ]
+        with ShardedStorage(self.directory, shards=3, max_workers=1) as storage:
+            storage.add_vacancies(records)
+            # Шарды как большие файлы: читаются потоком и отдают записи в порядке хранения
+            for filename in storage._filenames:
+                sharded_storage._shards[filename] = JSONStorage(filename, stream_threshold=0)
+            salaries = [record_salary(v) for v in storage.filter_vacancies(min_salary=1)]
+            counts = [v["name"].count("Python") for v in storage.filter_vacancies(keyword="python")]
+        self.assertEqual(salaries, sorted(salaries))
+        self.assertEqual(len(salaries), 30)
+        self.assertEqual(counts, sorted(counts, reverse=True))
+
+    def test_invalid_partition(self):
+        with self.assertRaises(ValueError):
+            ShardedStorage(self.directory, partition="salary")